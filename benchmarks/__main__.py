@@ -0,0 +1,42 @@
+"""
+Run the benchmark suites and print (or write) the results as JSON, so runs can be compared.
+
+    python -m benchmarks [--output FILE] [--quick] [suite ...]
+"""
+import argparse
+import asyncio
+
+from . import batching, executors, iterators, locks, pool, queues, timer_wheel, tracing, wait_for
+from .common import dump
+
+SUITES = {
+    "wait_for": (wait_for.run, {"calls": 500, "in_flight": 1000}),
+    "timer_wheel": (timer_wheel.run, {"concurrency": 10000}),
+    "pool": (pool.run, {"acquirers": 1000, "rounds": 5}),
+    "queue": (queues.run, {"items": 20000}),
+    "executor": (executors.run, {"calls": 1000}),
+    "locks": (locks.run, {"waiters": 1000, "rounds": 2}),
+    "aiter": (iterators.run, {"items": 10000}),
+    "batching": (batching.run, {"seconds": 0.5}),
+    "tracing": (tracing.run, {"calls": 500}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("suites", nargs="*", help="one of %s, all of them by default" % ", ".join(sorted(SUITES)))
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations, for smoke testing")
+    args = parser.parse_args()
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error("unknown suite: %s" % ", ".join(sorted(unknown)))
+    results = {}
+    for name in args.suites or SUITES:
+        run, quick_kwargs = SUITES[name]
+        results[name] = asyncio.run(run(**quick_kwargs) if args.quick else run())
+    dump(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-batching from a queue fed at a fixed rate (50k items/sec by default): collect_batch() compared with the usual
+hand-written loop of wait_for2.wait_for(queue.get(), remaining) calls against a shrinking per-batch budget.
+
+Reports the sustained rate, the mean batch size, the process time spent per item and the p99 delay of an item
+between being put in the queue and its batch being returned.
+"""
+import asyncio
+import time
+
+import wait_for2
+from wait_for2.batching import collect_batch
+
+from .common import percentile
+
+
+async def _wait_for_batch(queue, max_items, max_wait):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_wait
+    items = []
+    while len(items) < max_items:
+        try:
+            items.append(queue.get_nowait())
+            continue
+        except asyncio.QueueEmpty:
+            pass
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            items.append(await wait_for2.wait_for(queue.get(), remaining, race_handler=lambda r, e: items.append(r)))
+        except asyncio.TimeoutError:
+            break
+    return items
+
+
+async def _drive(collect, rate, seconds, max_items, max_wait):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    async def producer():
+        # Catches up with the rate after each sleep, which may take longer than requested.
+        first = time.perf_counter()
+        produced = 0
+        while produced < rate * seconds:
+            now = time.perf_counter()
+            for _ in range(min(int((now - first) * rate), int(rate * seconds)) - produced):
+                queue.put_nowait(now)
+                produced += 1
+            await asyncio.sleep(0.001)
+
+    delays = []
+    batches = 0
+    task = loop.create_task(producer())
+    cpu = time.process_time()
+    start = time.perf_counter()
+    while not task.done() or not queue.empty():
+        batch = await collect(queue, max_items, max_wait)
+        now = time.perf_counter()
+        batches += 1
+        delays.extend(now - t for t in batch)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu
+    delays.sort()
+    return {
+        "items": len(delays),
+        "items_per_sec": len(delays) / elapsed,
+        "mean_batch": len(delays) / batches,
+        "cpu_usec_per_item": cpu / max(1, len(delays)) * 1e6,
+        "p99_delay_msec": percentile(delays, 0.99) * 1e3 if delays else 0.0,
+    }
+
+
+async def run(rate=50000, seconds=3.0, max_items=500, max_wait=0.01):
+    return {
+        "wait_for_per_item": await _drive(_wait_for_batch, rate, seconds, max_items, max_wait),
+        "collect_batch": await _drive(collect_batch, rate, seconds, max_items, max_wait),
+    }
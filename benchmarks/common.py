@@ -0,0 +1,112 @@
+"""
+Measurement helpers shared by the benchmark suites.
+"""
+import asyncio
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+
+def environment():
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+    }
+
+
+def dump(results, output=None):
+    data = json.dumps({"environment": environment(), "results": results}, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(data + "\n")
+    else:
+        print(data)
+
+
+def percentile(ordered, q):
+    """Return the `q` quantile of the sorted list `ordered`."""
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def measure_calls(call, calls, warmup=100, alloc_calls=200):
+    """
+    Await `call()` sequentially and report the throughput and latency percentiles in microseconds, then the memory
+    allocated per call in `alloc_calls` more calls traced with tracemalloc (separately, as tracing slows them down).
+    The number of calls made in total, the `warmup` calls included, is reported as total_calls.
+    """
+    for _ in range(warmup):
+        await call()
+    latencies = [0.0] * calls
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for i in range(calls):
+        t = perf_counter()
+        await call()
+        latencies[i] = perf_counter() - t
+    elapsed = perf_counter() - start
+    latencies.sort()
+    results = {
+        "calls_per_sec": calls / elapsed,
+        "p50_usec": percentile(latencies, 0.5) * 1e6,
+        "p99_usec": percentile(latencies, 0.99) * 1e6,
+        "total_calls": warmup + calls + alloc_calls,
+    }
+    if alloc_calls:
+        results.update(await measure_allocations(call, alloc_calls))
+    return results
+
+
+async def measure_allocations(call, calls):
+    """
+    Report the memory allocated by `call()` per call with tracemalloc. It tracks the blocks that are alive, not a
+    running total, so blocks allocated and freed during the call only show up in the peak. The traces are cleared
+    before each call:
+        - alloc_peak_bytes_per_call: the most bytes allocated by the call alive at the same time
+        - alloc_bytes_per_call, alloc_blocks_per_call: the bytes and blocks allocated by the call still alive when
+          it returned (e.g. reference cycles left to the garbage collector, caches filled, or leaks)
+    """
+    peak_bytes = alive_bytes = alive_blocks = 0
+    tracemalloc.start()
+    try:
+        for _ in range(calls):
+            tracemalloc.clear_traces()
+            await call()
+            current, peak = tracemalloc.get_traced_memory()
+            traces = tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+            peak_bytes += peak
+            alive_bytes += current
+            alive_blocks += len(traces.traces)
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_bytes_per_call": peak_bytes / calls,
+        "alloc_bytes_per_call": alive_bytes / calls,
+        "alloc_blocks_per_call": alive_blocks / calls,
+    }
+
+
+async def measure_in_flight(start, count):
+    """
+    Keep `count` calls started with `start()` in flight and report the memory retained per call. The coroutines
+    are wrapped in tasks, which are included in the figures.
+    """
+    loop = asyncio.get_running_loop()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tasks = [loop.create_task(start()) for _ in range(count)]
+        await asyncio.sleep(0)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {
+        "bytes_per_call": sum(s.size_diff for s in stats) / count,
+        "blocks_per_call": sum(s.count_diff for s in stats) / count,
+    }
@@ -0,0 +1,28 @@
+"""
+Thread-pool dispatch overhead of wait_for_executor compared with plain loop.run_in_executor, with and without
+wrapping it in wait_for2.wait_for.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import wait_for2
+
+from .common import measure_calls
+
+
+def _noop():
+    pass
+
+
+async def run(calls=20000, workers=4):
+    loop = asyncio.get_running_loop()
+    results = {}
+    with ThreadPoolExecutor(workers) as executor:
+        results["run_in_executor"] = await measure_calls(lambda: loop.run_in_executor(executor, _noop), calls)
+        results["wait_for_run_in_executor"] = await measure_calls(
+            lambda: wait_for2.wait_for(loop.run_in_executor(executor, _noop), 10.0), calls
+        )
+        results["wait_for_executor"] = await measure_calls(
+            lambda: wait_for2.wait_for_executor(executor, _noop, timeout=10.0), calls
+        )
+    return results
@@ -0,0 +1,49 @@
+"""
+Items per second of aiter_timeout() compared with wait_for2.wait_for(it.__anext__(), t) called for each item.
+
+The stream alternates between items that are ready and items that need a loop iteration.
+"""
+import asyncio
+import time
+
+import wait_for2
+from wait_for2.iterators import aiter_timeout
+
+
+async def _stream(items):
+    for i in range(items):
+        if i % 2:
+            await asyncio.sleep(0)
+        yield i
+
+
+async def _wait_for_anext(items):
+    it = _stream(items)
+    received = 0
+    while True:
+        try:
+            await wait_for2.wait_for(it.__anext__(), 1.0)
+        except StopAsyncIteration:
+            return received
+        received += 1
+
+
+async def _aiter_timeout(items):
+    received = 0
+    async for _ in aiter_timeout(_stream(items), 1.0):
+        received += 1
+    return received
+
+
+async def _measure(consume, items):
+    start = time.perf_counter()
+    received = await consume(items)
+    elapsed = time.perf_counter() - start
+    return {"items": received, "items_per_sec": received / elapsed}
+
+
+async def run(items=100000):
+    return {
+        "wait_for_anext": await _measure(_wait_for_anext, items),
+        "aiter_timeout": await _measure(_aiter_timeout, items),
+    }
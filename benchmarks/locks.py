@@ -0,0 +1,61 @@
+"""
+Throughput and fairness of Semaphore.acquire(timeout) with thousands of contending waiters, compared with
+wait_for2.wait_for(asyncio.Semaphore.acquire(), t) and a race_handler releasing the permits won while cancelled.
+
+Fairness is the fraction of grants that overtook an earlier request (0.0 is strict FIFO).
+"""
+import asyncio
+import time
+from itertools import count
+
+import wait_for2
+from wait_for2.locks import Semaphore
+
+
+async def _drive(sem, acquire, waiters, rounds, permits):
+    loop = asyncio.get_running_loop()
+    requests = count()
+    granted = []
+
+    async def worker():
+        for _ in range(rounds):
+            request = next(requests)
+            await acquire(sem)
+            granted.append(request)
+            await asyncio.sleep(0)
+            sem.release()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(loop.create_task(worker()) for _ in range(waiters)))
+    elapsed = time.perf_counter() - start
+    overtaking = 0
+    highest = -1
+    for request in granted:
+        if request < highest:
+            overtaking += 1
+        else:
+            highest = request
+    return {
+        "acquires": len(granted),
+        "acquires_per_sec": len(granted) / elapsed,
+        "overtaking_ratio": overtaking / len(granted),
+        "permits_left": sem._value,
+        "expected_permits": permits,
+    }
+
+
+async def _wait_for_acquire(sem):
+    await wait_for2.wait_for(sem.acquire(), 10.0, race_handler=lambda r, e: e or sem.release())
+
+
+async def _acquire(sem):
+    await sem.acquire(10.0)
+
+
+async def run(waiters=10000, rounds=5, permits=10):
+    return {
+        "wait_for_asyncio_semaphore": await _drive(
+            asyncio.Semaphore(permits), _wait_for_acquire, waiters, rounds, permits
+        ),
+        "semaphore": await _drive(Semaphore(permits), _acquire, waiters, rounds, permits),
+    }
@@ -0,0 +1,50 @@
+"""
+Consumer throughput of Queue.get(timeout) and Queue.get_batch() compared with wait_for2.wait_for(queue.get(), t).
+
+A producer keeps the queue fed in chunks, so the consumers alternate between taking available items and waiting.
+"""
+import asyncio
+import time
+
+import wait_for2
+from wait_for2.queues import Queue
+
+
+async def _consume(queue, items, chunk, consumer):
+    received = 0
+
+    async def producer():
+        for i in range(0, items, chunk):
+            for j in range(chunk):
+                queue.put_nowait(j)
+            await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    task = asyncio.get_running_loop().create_task(producer())
+    while received < items:
+        received += await consumer(queue)
+    elapsed = time.perf_counter() - start
+    await task
+    return {"items": received, "items_per_sec": received / elapsed}
+
+
+async def _wait_for_get(queue):
+    await wait_for2.wait_for(queue.get(), 1.0, race_handler=lambda r, e: e or queue.put_nowait(r))
+    return 1
+
+
+async def _get(queue):
+    await queue.get(1.0)
+    return 1
+
+
+async def _get_batch(queue):
+    return len(await queue.get_batch(100, 1.0))
+
+
+async def run(items=200000, chunk=50):
+    return {
+        "wait_for_get": await _consume(asyncio.Queue(), items, chunk, _wait_for_get),
+        "get": await _consume(Queue(), items, chunk, _get),
+        "get_batch": await _consume(Queue(), items, chunk, _get_batch),
+    }
@@ -0,0 +1,39 @@
+"""
+Compare the loop.call_later() timeout path of wait_for with the TimerWheel backend.
+
+Many concurrent waits are started with a long timeout on futures that complete shortly after, which is the common
+case of a timeout that is almost always cancelled. Reports the size of the loop's timer heap while they are in
+flight and after they completed, as well as the per-call cost.
+"""
+import asyncio
+import time
+
+from wait_for2.impl import wait_for
+from wait_for2.wheel import TimerWheel
+
+
+async def _run(concurrency, scheduler_factory):
+    loop = asyncio.get_running_loop()
+    scheduler = scheduler_factory(loop)
+    futures = [loop.create_future() for _ in range(concurrency)]
+    start = time.perf_counter()
+    tasks = [loop.create_task(wait_for(f, 30.0, scheduler=scheduler)) for f in futures]
+    await asyncio.sleep(0)
+    in_flight_heap = len(loop._scheduled)
+    for f in futures:
+        f.set_result(None)
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    return {
+        "calls": concurrency,
+        "heap_in_flight": in_flight_heap,
+        "heap_after": len(loop._scheduled),
+        "usec_per_call": elapsed / concurrency * 1e6,
+    }
+
+
+async def run(concurrency=100000):
+    return {
+        "call_later": await _run(concurrency, lambda loop: loop),
+        "timer_wheel": await _run(concurrency, TimerWheel),
+    }
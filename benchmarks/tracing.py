@@ -0,0 +1,26 @@
+"""
+Per-call overhead of recording the path of wait_for calls into an installed TraceBuffer, compared with the same
+calls without tracing. Both use the library's implementation (wait_for2.impl).
+"""
+import asyncio
+
+import wait_for2
+from wait_for2.impl import wait_for
+
+from .common import measure_calls
+from .wait_for import CASES
+
+
+async def run(calls=5000):
+    loop = asyncio.get_running_loop()
+    results = {}
+    for case_name, case in CASES.items():
+        results[case_name] = case_results = {}
+        case_results["untraced"] = await measure_calls(lambda: case(wait_for, loop), calls)
+        buffer = wait_for2.install_tracing(loop=loop)
+        try:
+            traced = case_results["traced"] = await measure_calls(lambda: case(wait_for, loop), calls)
+        finally:
+            wait_for2.uninstall_tracing(loop=loop)
+        case_results["records_per_call"] = (len(buffer) + buffer.dropped()) / traced["total_calls"]
+    return results
@@ -0,0 +1,91 @@
+"""
+Per-call overhead of wait_for2 compared with the builtin asyncio.wait_for.
+
+The "wait_for2" implementation is the public wait_for2.wait_for, which delegates to asyncio.wait_for on Python 3.12+
+when no race_handler is passed. The "wait_for2.impl" implementation is always the library's own.
+"""
+import asyncio
+import sys
+
+import wait_for2
+from wait_for2.impl import wait_for as impl_wait_for
+
+from .common import measure_calls, measure_in_flight
+
+IMPLEMENTATIONS = {
+    "asyncio": asyncio.wait_for,
+    "wait_for2": wait_for2.wait_for,
+    "wait_for2.impl": impl_wait_for,
+}
+
+
+def _discard(result, is_exception):
+    pass
+
+
+async def _no_timeout(wait_for, loop):
+    fut = loop.create_future()
+    loop.call_soon(fut.set_result, None)
+    await wait_for(fut, None)
+
+
+async def _completes(wait_for, loop):
+    await wait_for(asyncio.sleep(0), 10.0)
+
+
+async def _times_out(wait_for, loop):
+    try:
+        await wait_for(loop.create_future(), 1e-6)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def _cancelled(wait_for, loop):
+    task = loop.create_task(wait_for(loop.create_future(), 10.0))
+    await asyncio.sleep(0)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def _race(wait_for, loop):
+    # the inner future completes right when the waiting is cancelled, the result goes to the race_handler
+    fut = loop.create_future()
+    task = loop.create_task(wait_for(fut, 10.0, race_handler=_discard))
+    await asyncio.sleep(0)
+    fut.set_result(None)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+CASES = {
+    "no_timeout": _no_timeout,
+    "completes_before_timeout": _completes,
+    "times_out": _times_out,
+    "cancelled": _cancelled,
+    "race_handler": _race,
+}
+
+
+async def run(calls=5000, in_flight=100000):
+    loop = asyncio.get_running_loop()
+    results = {"delegates_to_builtin": sys.version_info >= (3, 12)}
+    for case_name, case in CASES.items():
+        results[case_name] = case_results = {}
+        for impl_name, wait_for in IMPLEMENTATIONS.items():
+            if case is _race and wait_for is asyncio.wait_for:
+                continue  # the builtin has no race_handler
+            case_results[impl_name] = await measure_calls(lambda: case(wait_for, loop), calls)
+
+    async def bare():
+        await loop.create_future()
+
+    results["in_flight"] = memory = {"bare_await": await measure_in_flight(bare, in_flight)}
+    for impl_name, wait_for in IMPLEMENTATIONS.items():
+        memory[impl_name] = await measure_in_flight(lambda: wait_for(loop.create_future(), 10.0), in_flight)
+    return results
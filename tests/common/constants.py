@@ -9,6 +9,7 @@ GT_PY312 = sys.version_info >= (3, 12)
 BUILTIN_PROPAGATES_CUSTOM_CANCEL = _GT_PY311
 BUILTIN_PREFERS_TIMEOUT_OVER_RESULT = _LT_PY3910
 BUILTIN_PREFERS_TIMEOUT_OVER_EXCEPTION = _LT_PY39
+TASK_TRACKS_CANCELLATION = _GT_PY311
 
 BUILTIN_WAIT_FOR_BEHAVIOUR = {
     "no timeout                 ": "cancelled bound",
@@ -0,0 +1,21 @@
+import asyncio
+
+
+async def result_at_cancel(result, delay=0.0):
+    # WARNING: this should not be something to do normally, but this reliably produces a race condition state.
+    try:
+        while True:
+            await asyncio.sleep(0.1)
+    except asyncio.CancelledError:
+        await asyncio.sleep(delay)
+        return result
+
+
+async def exception_at_cancel(error, delay=0.0):
+    # WARNING: this should not be something to do normally, but this reliably produces a race condition state.
+    try:
+        while True:
+            await asyncio.sleep(0.1)
+    except asyncio.CancelledError:
+        await asyncio.sleep(delay)
+        raise error
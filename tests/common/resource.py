@@ -41,7 +41,7 @@ class ResourceWorkerWaitForTester(object):
         self.cancel_after_task = int(task_num * cancel_after_task_percent)
         self.wait_for_timeout = wait_for_timeout
 
-    async def run(self, use_special_raise=False, **wait_for_kwargs):
+    async def run(self, use_special_raise=False, drain=None, **wait_for_kwargs):
         # Create a bunch of parallel tasks that will await using the wait_for impl being tested with different timings.
         tasks = []
         for i in range(self.task_num):
@@ -67,6 +67,8 @@ class ResourceWorkerWaitForTester(object):
             assert time.perf_counter() - cancel_start < self.CANCELLATION_TIME_LIMIT, "cancellation was slow"
         finally:
             assert all(task.done() for task in tasks), "Tasks were not terminated!"
+        if drain is not None:
+            await drain()  # let the deferred race handlers finish
         if not use_special_raise:
             for task in tasks:
                 if not task.cancelled() and isinstance(task.exception(), ResourceError):
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+
+
+def test_latency_sketch():
+    sketch = wait_for2.LatencySketch(accuracy=0.01, half_life=10**9)
+    assert sketch.quantile(0.5) is None
+    for i in range(1, 1001):
+        sketch.record(i / 1000.0)
+    assert sketch.count == 1000
+    assert sketch.quantile(0.5) == pytest.approx(0.5, rel=0.02)
+    assert sketch.quantile(0.99) == pytest.approx(0.99, rel=0.02)
+    size = len(sketch.counts)
+    sketch.record(0)
+    sketch.record(10**9)  # clamped, the sketch does not grow
+    assert len(sketch.counts) == size
+
+
+def test_latency_sketch_decay():
+    sketch = wait_for2.LatencySketch(half_life=100)
+    for _ in range(1000):
+        sketch.record(1.0)
+    for _ in range(1000):
+        sketch.record(0.01)
+    assert sketch.count < 200
+    assert sketch.quantile(0.99) == pytest.approx(0.01, rel=0.05)
+
+
+def test_adaptive_timeout_clamped():
+    adaptive = wait_for2.AdaptiveTimeout(2.0, quantile=0.9, margin=0.1, floor=0.5, min_samples=10, refresh=1)
+    assert adaptive.value() == 2.0
+    for _ in range(9):
+        adaptive.observe(0.001)
+    assert adaptive.value() == 2.0  # not enough samples yet
+    adaptive.observe(0.001)
+    assert adaptive.value() == 0.5
+    for _ in range(100):
+        adaptive.observe(1.0)
+    assert adaptive.value() == pytest.approx(1.1, rel=0.05)
+    for _ in range(100):
+        adaptive.observe(10.0)
+    assert adaptive.value() == 2.0
+
+
+def test_adaptive_timeout_grows_on_timeouts():
+    with pytest.raises(ValueError):
+        wait_for2.AdaptiveTimeout(2.0, growth=0.5)
+    adaptive = wait_for2.AdaptiveTimeout(2.0, quantile=0.9, initial=0.1, min_samples=10, refresh=1)
+    for _ in range(10):
+        adaptive.timed_out(adaptive.value())
+    assert adaptive.value() == pytest.approx(0.15, rel=0.05)
+    for _ in range(100):
+        adaptive.timed_out(adaptive.value())
+    assert adaptive.value() == 2.0
+
+
+def test_adaptive_timeout_registry():
+    with pytest.raises(ValueError):
+        wait_for2.adaptive_timeout("test.registry")
+    adaptive = wait_for2.adaptive_timeout("test.registry", 1.0)
+    assert adaptive.key == "test.registry"
+    assert wait_for2.adaptive_timeout("test.registry", 5.0) is adaptive
+    wait_for2.remove_adaptive_timeout("test.registry")
+    assert wait_for2.adaptive_timeout("test.registry", 5.0) is not adaptive
+    wait_for2.remove_adaptive_timeout("test.registry")
+
+
+@pytest.mark.asyncio
+async def test_wait_for_adaptive():
+    adaptive = wait_for2.AdaptiveTimeout(1.0, floor=0.05, min_samples=5, refresh=1)
+    for _ in range(5):
+        assert await wait_for2.wait_for(asyncio.sleep(0.001, "ok"), adaptive) == "ok"
+    assert adaptive.sketch.count == 5
+    assert adaptive.value() < 1.0
+
+    with pytest.raises(asyncio.TimeoutError):
+        await wait_for2.wait_for(asyncio.sleep(1.0), adaptive)
+    assert adaptive.sketch.count == 6
+
+    done = asyncio.get_running_loop().create_future()
+    done.set_result("done")
+    assert await wait_for2.wait_for(done, adaptive) == "done"
+    with pytest.raises(ValueError):
+        await wait_for2.wait_for(asyncio.get_running_loop().run_in_executor(None, int, "x"), adaptive)
+    assert adaptive.sketch.count == 6  # neither is a latency observation
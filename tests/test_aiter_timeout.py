@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.testing import run
+
+
+class _Stream(object):
+    def __init__(self, delays, on_cancel=None):
+        self.delays = delays
+        self.on_cancel = on_cancel  # item to yield when cancelled while waiting
+        self.closed = False
+
+    async def __aiter__(self):
+        try:
+            for i, delay in enumerate(self.delays):
+                try:
+                    await asyncio.sleep(delay)
+                except asyncio.CancelledError:
+                    if self.on_cancel is None:
+                        raise
+                    yield self.on_cancel
+                    continue
+                yield i
+        finally:
+            self.closed = True
+
+
+def test_aiter_timeout_items():
+    async def main():
+        stream = _Stream([0, 0.5, 0.9, 0])
+        items = [i async for i in wait_for2.aiter_timeout(stream, 1.0)]
+        assert items == [0, 1, 2, 3]
+        assert stream.closed
+        assert [i async for i in wait_for2.aiter_timeout(_Stream([]), 1.0)] == []
+
+    run(main())
+
+
+def test_aiter_timeout_per_item():
+    async def main():
+        loop = asyncio.get_running_loop()
+        stream = _Stream([0.5, 0.5, 2.0, 0])
+        items = []
+        start = loop.time()
+        with pytest.raises(asyncio.TimeoutError):
+            async for i in wait_for2.aiter_timeout(stream, 1.0):
+                items.append(i)
+        assert items == [0, 1]
+        assert loop.time() - start == 2.0
+        assert stream.closed
+
+    run(main())
+
+
+def test_aiter_timeout_total():
+    async def main():
+        loop = asyncio.get_running_loop()
+        stream = _Stream([0.3] * 10)
+        items = []
+        start = loop.time()
+        with pytest.raises(asyncio.TimeoutError):
+            async for i in wait_for2.aiter_timeout(stream, 1.0, 1.0):
+                items.append(i)
+        assert items == [0, 1, 2]
+        assert loop.time() - start == 1.0
+        assert stream.closed
+
+    run(main())
+
+
+def test_aiter_timeout_deadline():
+    async def main():
+        stream = _Stream([0.3] * 10)
+        items = []
+        with pytest.raises(wait_for2.DeadlineExceeded):
+            with wait_for2.deadline(1.0):
+                async for i in wait_for2.aiter_timeout(stream, 1.0, 5.0):
+                    items.append(i)
+        assert items == [0, 1, 2]
+
+    run(main())
+
+
+def test_aiter_timeout_item_prioritized_over_timeout():
+    async def main():
+        stream = _Stream([0, 2.0, 0], on_cancel="late")
+        items = [i async for i in wait_for2.aiter_timeout(stream, 1.0)]
+        assert items == [0, "late", 2]
+
+    run(main())
+
+
+def test_aiter_timeout_cancel_race():
+    handled = []
+    raised = []
+
+    async def consume(stream):
+        try:
+            async for _ in wait_for2.aiter_timeout(stream, 10.0, race_handler=lambda r, e: handled.append((r, e))):
+                pass
+        except asyncio.CancelledError as e:
+            raised.append(e)  # before Python 3.11 the task would not keep the exception type
+            raise
+
+    async def main():
+        stream = _Stream([0, 2.0], on_cancel="late")
+        task = asyncio.ensure_future(consume(stream))
+        await asyncio.sleep(1.0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert isinstance(raised[0], wait_for2.CancelledWithResultError)
+        assert raised[0].result == "late" and not raised[0].is_exception
+        assert handled == [("late", False)]
+        assert stream.closed
+
+        stream = _Stream([0, 2.0])
+        task = asyncio.ensure_future(consume(stream))
+        await asyncio.sleep(1.0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not isinstance(raised[1], wait_for2.CancelledWithResultError)
+        assert stream.closed
+
+    run(main())
+
+
+def test_aiter_timeout_reuses_timer():
+    async def main():
+        loop = asyncio.get_running_loop()
+        scheduled = []
+        call_at = loop.call_at
+
+        def counting_call_at(when, callback, *args, **kwargs):
+            scheduled.append(callback)
+            return call_at(when, callback, *args, **kwargs)
+
+        loop.call_at = counting_call_at
+        stream = _Stream([0.01] * 1000)
+        items = [i async for i in wait_for2.aiter_timeout(stream, 1.0)]
+        assert len(items) == 1000
+        timers = [cb for cb in scheduled if getattr(cb, "__name__", None) == "_fire"]
+        assert 1 <= len(timers) <= 12  # rescheduled about once per second, not per item
+
+    run(main())
+
+
+def test_aiter_timeout_errors_and_close():
+    async def failing():
+        yield 1
+        raise ValueError("broken")
+
+    async def main():
+        items = []
+        with pytest.raises(ValueError):
+            async for i in wait_for2.aiter_timeout(failing(), 1.0):
+                items.append(i)
+        assert items == [1]
+
+        stream = _Stream([0] * 10)
+        it = wait_for2.aiter_timeout(stream, 1.0)
+        assert await it.__anext__() == 0
+        await it.aclose()
+        assert stream.closed
+
+    run(main())
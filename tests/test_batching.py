@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.testing import run
+
+
+class _QueueReader(object):
+    """Async iterator that tolerates the cancellation of __anext__(), it is usable for many batches."""
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.exhausted = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.exhausted:
+            item = await self.queue.get()
+            if item is not None:
+                return item
+            self.exhausted = True
+        raise StopAsyncIteration()
+
+
+def _feed(queue, items, interval):
+    loop = asyncio.get_running_loop()
+    for i, item in enumerate(items):
+        loop.call_later(interval * (i + 1), queue.put_nowait, item)
+
+
+@pytest.mark.parametrize("queue_type", [asyncio.Queue, wait_for2.Queue])
+def test_collect_batch_from_queue(queue_type):
+    async def main():
+        loop = asyncio.get_running_loop()
+        queue = queue_type()
+        for i in range(5):
+            queue.put_nowait(i)
+        assert await wait_for2.collect_batch(queue, 3, 1.0) == [0, 1, 2]
+        start = loop.time()
+        assert await wait_for2.collect_batch(queue, 3, 1.0) == [3, 4]
+        assert loop.time() - start == 1.0
+        assert await wait_for2.collect_batch(queue, 3, 0) == []
+
+        _feed(queue, range(10), 0.3)
+        start = loop.time()
+        assert await wait_for2.collect_batch(queue, 100, 1.0) == [0, 1, 2]
+        assert await wait_for2.collect_batch(queue, 2, 1.0) == [3, 4]
+        assert await wait_for2.collect_batch(queue, 5, None) == [5, 6, 7, 8, 9]
+        with pytest.raises(ValueError):
+            await wait_for2.collect_batch(queue, 0, 1.0)
+        assert not queue._getters
+
+    run(main())
+
+
+def test_collect_batch_deadline_scope():
+    async def main():
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        _feed(queue, range(10), 0.3)
+        start = loop.time()
+        with wait_for2.deadline(0.5):
+            assert await wait_for2.collect_batch(queue, 100, 5.0) == [0]
+        assert loop.time() - start == 0.5
+
+    run(main())
+
+
+def test_collect_batch_cancel_keeps_items():
+    handled = []
+    raised = []
+
+    async def collect(source):
+        try:
+            return await wait_for2.collect_batch(source, 100, 10.0, race_handler=lambda r, e: handled.append(r))
+        except asyncio.CancelledError as e:
+            raised.append(e)  # before Python 3.11 the task would not keep the exception type
+            raise
+
+    async def main():
+        for make_source in (lambda q: q, _QueueReader):
+            queue = asyncio.Queue()
+            _feed(queue, range(5), 0.3)
+            task = asyncio.ensure_future(collect(make_source(queue)))
+            await asyncio.sleep(1.0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert isinstance(raised[-1], wait_for2.CancelledWithResultError)
+            assert raised[-1].result == [0, 1, 2] and not raised[-1].is_exception
+            assert handled[-1] == [0, 1, 2]
+            await asyncio.sleep(1.0)
+            assert await wait_for2.collect_batch(make_source(queue), 100, 0) == [3, 4]
+
+        # nothing was collected yet, a plain cancellation
+        task = asyncio.ensure_future(collect(asyncio.Queue()))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not isinstance(raised[-1], wait_for2.CancelledWithResultError)
+
+    run(main())
+
+
+def test_collect_batch_from_iterator():
+    async def main():
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        reader = _QueueReader(queue)
+        _feed(queue, list(range(10)) + [None], 0.3)
+        start = loop.time()
+        assert await wait_for2.collect_batch(reader, 100, 1.0) == [0, 1, 2]
+        assert loop.time() - start == 1.0
+        assert await wait_for2.collect_batch(reader, 2, 1.0) == [3, 4]
+        assert await wait_for2.collect_batch(reader, 100, 10.0) == [5, 6, 7, 8, 9]
+        with pytest.raises(StopAsyncIteration):
+            await wait_for2.collect_batch(reader, 100, 1.0)
+
+    run(main())
+
+
+def test_collect_batch_iterator_item_at_deadline():
+    async def slow():
+        yield 1
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            yield 2  # produced while being cancelled at the deadline
+
+    async def main():
+        assert await wait_for2.collect_batch(slow(), 100, 1.0) == [1, 2]
+
+    run(main())
+
+
+def test_collect_batch_iterator_error():
+    handled = []
+
+    async def failing():
+        yield 1
+        raise ValueError("broken")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await wait_for2.collect_batch(failing(), 100, 1.0, race_handler=lambda r, e: handled.append(r))
+        assert handled == [[1]]
+
+    run(main())
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.breakers import CLOSED, HALF_OPEN, OPEN
+from wait_for2.testing import run
+from .common.race import result_at_cancel
+
+
+async def _call(breaker, behaviour, key="db", timeout=1.0):
+    async def backend():
+        if behaviour == "fail":
+            raise ConnectionError()
+        if behaviour == "slow":
+            await asyncio.sleep(10)
+        return "ok"
+
+    try:
+        return await breaker.wait_for(key, backend(), timeout)
+    except (ConnectionError, asyncio.TimeoutError):
+        return behaviour
+
+
+def test_breaker_opens_and_fails_fast():
+    async def main():
+        loop = asyncio.get_running_loop()
+        breaker = wait_for2.CircuitBreaker(failure_ratio=0.5, min_calls=4, window=10.0, open_for=5.0)
+        for behaviour in ("ok", "fail", "ok"):
+            await _call(breaker, behaviour)
+        assert breaker.state("db") == CLOSED
+        assert await _call(breaker, "slow") == "slow"
+        assert breaker.state("db") == OPEN
+        assert breaker.stats("db") == {"calls": 4, "timeouts": 1, "exceptions": 1, "races": 0}
+        assert breaker.state("other") == CLOSED
+
+        # rejected right away, without a timer or a task
+        handles = len(loop._scheduled)
+        tasks = len(asyncio.all_tasks())
+        coro = asyncio.sleep(1)
+        with pytest.raises(wait_for2.CircuitOpenError) as e:
+            await breaker.wait_for("db", coro, 1.0)
+        assert e.value.key == "db"
+        assert coro.cr_frame is None  # closed
+        fut = loop.create_future()
+        with pytest.raises(wait_for2.CircuitOpenError):
+            await breaker.wait_for("db", fut, 1.0)
+        assert fut.cancelled()
+        assert len(loop._scheduled) == handles and len(asyncio.all_tasks()) == tasks
+        assert await _call(breaker, "ok", key="other") == "ok"
+
+    run(main())
+
+
+def test_breaker_window_rolls():
+    async def main():
+        breaker = wait_for2.CircuitBreaker(failure_ratio=0.5, min_calls=4, window=10.0, buckets=10)
+        for _ in range(3):
+            await _call(breaker, "fail")
+        await asyncio.sleep(10.0)  # the failures fall out of the window
+        assert breaker.stats("db")["calls"] == 0
+        for behaviour in ("ok", "ok", "fail", "ok"):
+            await _call(breaker, behaviour)
+        assert breaker.state("db") == CLOSED
+
+        # exceptions not matching failure_on count as successful calls
+        breaker = wait_for2.CircuitBreaker(min_calls=2, failure_on=(asyncio.TimeoutError,))
+        for _ in range(3):
+            await _call(breaker, "fail")
+        assert breaker.state("db") == CLOSED
+        assert breaker.stats("db")["exceptions"] == 0
+
+    run(main())
+
+
+def test_breaker_half_open_probes():
+    async def main():
+        breaker = wait_for2.CircuitBreaker(failure_ratio=1.0, min_calls=1, open_for=5.0, probes=2)
+        await _call(breaker, "fail")
+        assert breaker.state("db") == OPEN
+        await asyncio.sleep(5.0)
+        assert breaker.state("db") == HALF_OPEN
+
+        # at most 2 probes at a time, a failed one opens it again
+        probes = [asyncio.ensure_future(_call(breaker, "slow")) for _ in range(3)]
+        await asyncio.sleep(0)
+        with pytest.raises(wait_for2.CircuitOpenError):
+            await probes[2]
+        assert await asyncio.gather(*probes[:2]) == ["slow", "slow"]
+        assert breaker.state("db") == OPEN
+
+        await asyncio.sleep(5.0)
+        # a cancelled probe frees its place, a successful one closes the circuit
+        probe = asyncio.ensure_future(_call(breaker, "slow"))
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert breaker.state("db") == HALF_OPEN
+        assert await _call(breaker, "ok") == "ok"
+        assert breaker.state("db") == CLOSED
+        assert breaker.stats("db") == {"calls": 1, "timeouts": 0, "exceptions": 0, "races": 0}
+
+    run(main())
+
+
+def test_breaker_counts_races():
+    handled = []
+
+    async def main():
+        breaker = wait_for2.CircuitBreaker(failure_ratio=1.0, min_calls=1)
+        task = asyncio.ensure_future(
+            breaker.wait_for("db", result_at_cancel("late"), 1.0, race_handler=lambda r, e: handled.append(r))
+        )
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert handled == ["late"]
+        assert breaker.stats("db")["races"] == 1
+        assert breaker.state("db") == OPEN
+
+        # a plain cancellation is not counted
+        breaker = wait_for2.CircuitBreaker(failure_ratio=1.0, min_calls=1)
+        task = asyncio.ensure_future(breaker.wait_for("db", asyncio.sleep(10), 1.0))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert breaker.stats("db")["calls"] == 0
+        assert breaker.state("db") == CLOSED
+
+    run(main())
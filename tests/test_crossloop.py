@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import wait_for2
+from .common.race import result_at_cancel
+
+
+@pytest.fixture
+def other_loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def _in(loop, coro):
+    return asyncio.run_coroutine_threadsafe(coro, loop).result(5.0)
+
+
+async def _create_task(coro):
+    return asyncio.ensure_future(coro)
+
+
+@pytest.mark.asyncio
+async def test_foreign_future_result(other_loop):
+    task = _in(other_loop, _create_task(asyncio.sleep(0.01, "foreign")))
+    assert await wait_for2.wait_for(task, 1.0) == "foreign"
+    assert await wait_for2.wait_for(task, 1.0) == "foreign"  # already done
+
+    task = _in(other_loop, _create_task(asyncio.sleep(0.01, "foreign")))
+    assert await wait_for2.wait_for(task, None) == "foreign"
+
+    cfut = Future()
+    threading.Timer(0.01, cfut.set_result, ("concurrent",)).start()
+    assert await wait_for2.wait_for(cfut, 1.0) == "concurrent"
+    assert await wait_for2.wait_for(cfut, 1.0) == "concurrent"
+
+    cfut = Future()
+    cfut.set_exception(ValueError())
+    with pytest.raises(ValueError):
+        await wait_for2.wait_for(cfut, 1.0)
+
+
+@pytest.mark.asyncio
+async def test_foreign_future_timeout_is_bound(other_loop):
+    task = _in(other_loop, _create_task(asyncio.sleep(10.0)))
+    with pytest.raises(asyncio.TimeoutError):
+        await wait_for2.wait_for(task, 0.01)
+    assert task.cancelled()  # the waiting ended after the foreign task has stopped
+
+    # a result produced during the cancellation after the timeout is returned
+    task = _in(other_loop, _create_task(result_at_cancel("late", 0.01)))
+    assert await wait_for2.wait_for(task, 0.01) == "late"
+
+
+@pytest.mark.asyncio
+async def test_foreign_future_race(other_loop):
+    handled = []
+    task = _in(other_loop, _create_task(result_at_cancel("raced", 0.01)))
+    waiter = asyncio.ensure_future(wait_for2.wait_for(task, 1.0, race_handler=lambda r, e: handled.append(r)))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert task.done() and not task.cancelled()
+    assert handled == ["raced"]
+
+    # without a timeout as well
+    handled.clear()
+    task = _in(other_loop, _create_task(result_at_cancel("raced", 0.01)))
+    waiter = asyncio.ensure_future(wait_for2.wait_for(task, None, race_handler=lambda r, e: handled.append(r)))
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert task.done() and not task.cancelled()
+    assert handled == ["raced"]
+
+
+@pytest.mark.asyncio
+async def test_wait_for_threadsafe(other_loop):
+    loop = asyncio.get_running_loop()
+    assert await wait_for2.wait_for_threadsafe(asyncio.sleep(0, "ok"), other_loop, 1.0) == "ok"
+    assert await wait_for2.wait_for_threadsafe(asyncio.sleep(0, "ok"), loop, 1.0) == "ok"
+
+    async def where():
+        return asyncio.get_running_loop()
+
+    assert await wait_for2.wait_for_threadsafe(where(), other_loop, 1.0) is other_loop
+
+    handled = []
+    waiter = asyncio.ensure_future(
+        wait_for2.wait_for_threadsafe(
+            result_at_cancel("raced", 0.01), other_loop, 1.0, race_handler=lambda r, e: handled.append(r)
+        )
+    )
+    await asyncio.sleep(0.01)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert handled == ["raced"]
+
+    # cancelled before the task could even start on the other loop
+    waiter = asyncio.ensure_future(wait_for2.wait_for_threadsafe(asyncio.sleep(10.0), other_loop, 1.0))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    stopped = asyncio.new_event_loop()
+    try:
+        coro = asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            await wait_for2.wait_for_threadsafe(coro, stopped, 1.0)
+        assert coro.cr_frame is None  # closed
+    finally:
+        stopped.close()
+
+
+@pytest.mark.asyncio
+async def test_foreign_completions_batched(other_loop):
+    async def start_many():
+        futs = [asyncio.get_running_loop().create_future() for _ in range(100)]
+        return futs
+
+    futs = _in(other_loop, start_many())
+    loop = asyncio.get_running_loop()
+    waiters = [loop.create_task(wait_for2.wait_for(f, 1.0)) for f in futs]
+    await asyncio.sleep(0.01)
+
+    async def complete_all():
+        for i, f in enumerate(futs):
+            f.set_result(i)
+
+    _in(other_loop, complete_all())
+    assert await asyncio.gather(*waiters) == list(range(100))
@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.testing import run
+from .common.race import result_at_cancel
+
+
+@pytest.mark.asyncio
+async def test_deadline_limits_timeout():
+    loop = asyncio.get_running_loop()
+    assert wait_for2.time_remaining() is None
+    with wait_for2.deadline(0.05):
+        assert 0 < wait_for2.time_remaining() <= 0.05
+        with wait_for2.deadline(10.0):  # the enclosing deadline is earlier
+            assert wait_for2.time_remaining() <= 0.05
+        start = loop.time()
+        with pytest.raises(wait_for2.DeadlineExceeded) as e:
+            await wait_for2.wait_for(asyncio.sleep(10.0), 5.0)
+        assert loop.time() - start < 1.0
+        assert isinstance(e.value, asyncio.TimeoutError)
+        assert isinstance(e.value.__cause__, asyncio.CancelledError)
+        with pytest.raises(wait_for2.DeadlineExceeded):
+            await wait_for2.wait_for(asyncio.sleep(10.0), None)  # no own timeout, expired deadline applies
+        with pytest.raises(wait_for2.DeadlineExceeded):
+            await wait_for2.wait_for(asyncio.sleep(10.0), 1.0)  # already expired
+        assert wait_for2.time_remaining() < 0
+    assert wait_for2.time_remaining() is None
+
+    with wait_for2.deadline(10.0):
+        # the own timeout is shorter, it is a plain TimeoutError
+        with pytest.raises(asyncio.TimeoutError) as e:
+            await wait_for2.wait_for(asyncio.sleep(10.0), 0.001)
+        assert not isinstance(e.value, wait_for2.DeadlineExceeded)
+
+
+@pytest.mark.asyncio
+async def test_deadline_result_prioritized():
+    with wait_for2.deadline(0.01):
+        assert await wait_for2.wait_for(result_at_cancel("late"), 1.0) == "late"
+
+
+@pytest.mark.asyncio
+async def test_nested_calls_skip_redundant_timers():
+    loop = asyncio.get_running_loop()
+    scheduled = []
+
+    class Scheduler(object):
+        def call_later(self, delay, callback, *args):
+            scheduled.append(delay)
+            return loop.call_later(delay, callback, *args)
+
+    async def query():
+        # enforced by the wait_for of the backend call, no timer needed
+        return await wait_for2.wait_for(asyncio.sleep(0.01, "row"), 5.0, scheduler=Scheduler())
+
+    async def backend():
+        return await wait_for2.wait_for(query(), 2.0, scheduler=Scheduler())
+
+    with wait_for2.deadline(1.0):
+        assert await wait_for2.wait_for(backend(), 10.0, scheduler=Scheduler()) == "row"
+    assert len(scheduled) == 1 and scheduled[0] <= 1.0  # only the outermost call is limited by the deadline
+
+    # the deadline expires in the innermost call, the outermost one reports it
+    async def slow_query():
+        return await wait_for2.wait_for(asyncio.sleep(10.0), 5.0)
+
+    with wait_for2.deadline(0.02):
+        with pytest.raises(wait_for2.DeadlineExceeded):
+            await wait_for2.wait_for(slow_query(), 10.0)
+
+    # without a deadline nothing changes
+    scheduled.clear()
+    assert await wait_for2.wait_for(backend(), 10.0, scheduler=Scheduler()) == "row"
+    assert len(scheduled) == 3
+
+
+@pytest.mark.asyncio
+async def test_deadline_not_enforced_for_other_tasks():
+    async def detached():
+        # this task is not cancelled by the enclosing call, it needs its own timer
+        return await wait_for2.wait_for(asyncio.sleep(10.0), 0.01)
+
+    async def spawner():
+        return asyncio.ensure_future(detached())
+
+    with wait_for2.deadline(5.0):
+        task = await wait_for2.wait_for(spawner(), 1.0)
+    with pytest.raises(asyncio.TimeoutError):
+        await task
+
+
+@pytest.mark.asyncio
+async def test_timeout_scope_sets_deadline():
+    async with wait_for2.timeout(0.02):
+        assert wait_for2.time_remaining() <= 0.02
+    assert wait_for2.time_remaining() is None
+    with pytest.raises(asyncio.TimeoutError) as e:
+        async with wait_for2.timeout(0.02):
+            await wait_for2.wait_for(asyncio.sleep(10.0), 5.0)  # no timer of its own
+    assert not isinstance(e.value, wait_for2.DeadlineExceeded)
+
+
+def test_deadline_fired_cleanup_keeps_own_timer():
+    cleanup = []
+
+    async def cleanup_on_cancel():
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.sleep(100)
+        except asyncio.CancelledError:
+            start = loop.time()
+            try:
+                await wait_for2.wait_for(asyncio.Event().wait(), 0.1)
+            except asyncio.TimeoutError:
+                cleanup.append(loop.time() - start)
+            raise
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        # the enclosing wait_for timed out, and cancelled explicitly
+        with wait_for2.deadline(5.0):
+            with pytest.raises(asyncio.TimeoutError):
+                await wait_for2.wait_for(cleanup_on_cancel(), 0.2)
+            task = asyncio.ensure_future(wait_for2.wait_for(cleanup_on_cancel(), 10.0))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        # the enclosing timeout scope expired
+        with pytest.raises(asyncio.TimeoutError):
+            async with wait_for2.timeout(0.2):
+                await cleanup_on_cancel()
+        # the task group's deadline expired
+        start = loop.time()
+        with pytest.raises(asyncio.TimeoutError):
+            async with wait_for2.TaskGroup(timeout=0.2) as group:
+                group.create_task(cleanup_on_cancel())
+        assert loop.time() - start == pytest.approx(0.3)
+        assert cleanup == [pytest.approx(0.1)] * 4
+
+    run(main())
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+import pytest
+
+import wait_for2
+
+
+def _blocking(event, result):
+    event.wait(5.0)
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+
+@pytest.mark.asyncio
+async def test_executor_result_and_error():
+    with ThreadPoolExecutor(2) as executor:
+        assert await wait_for2.wait_for_executor(executor, sum, (1, 2), timeout=1.0) == 3
+        assert await wait_for2.wait_for_executor(executor, sum, (1, 2)) == 3
+        with pytest.raises(ValueError):
+            await wait_for2.wait_for_executor(executor, int, "x", timeout=1.0)
+
+
+@pytest.mark.asyncio
+async def test_executor_late_result_to_race_handler():
+    handled = []
+    event = threading.Event()
+    with ThreadPoolExecutor(1) as executor:
+        with pytest.raises(asyncio.TimeoutError):
+            await wait_for2.wait_for_executor(
+                executor, _blocking, event, "late", timeout=0.01, race_handler=lambda r, e: handled.append((r, e))
+            )
+        event.set()
+        while not handled:
+            await asyncio.sleep(0.001)
+    assert handled == [("late", False)]
+
+
+@pytest.mark.asyncio
+async def test_executor_late_results_retained():
+    event = threading.Event()
+    with ThreadPoolExecutor(3) as executor:
+        for max_late, result in ((2, "a"), (None, ValueError("b")), (None, "c")):
+            # the limit set by the first call is kept by the calls not passing one
+            task = asyncio.ensure_future(
+                wait_for2.wait_for_executor(executor, _blocking, event, result, max_late=max_late)
+            )
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        loop = asyncio.get_running_loop()
+        dropped = []
+        loop.set_exception_handler(lambda loop, context: dropped.append(context))
+        try:
+            event.set()
+            await asyncio.sleep(0.05)
+        finally:
+            loop.set_exception_handler(None)
+        late = wait_for2.late_results(executor)
+    assert len(late) == 2 and len(dropped) == 1
+    assert "exception" not in dropped[0]
+    assert sorted(str(r) for r, _ in late + [(dropped[0]["result"], None)]) == ["a", "b", "c"]
+    assert wait_for2.late_results(executor) == []
+
+
+@pytest.mark.asyncio
+async def test_executor_not_started_is_cancelled():
+    event = threading.Event()
+    with ThreadPoolExecutor(1) as executor:
+        with pytest.raises(asyncio.TimeoutError):
+            await wait_for2.wait_for_executor(executor, _blocking, event, "running", timeout=0.01)
+        # the second call never starts as the only worker is busy, it is cancelled instead of abandoned
+        with pytest.raises(asyncio.TimeoutError):
+            await wait_for2.wait_for_executor(executor, _blocking, event, "queued", timeout=0.01)
+        event.set()
+    await asyncio.sleep(0.01)
+    assert wait_for2.late_results(executor) == [("running", False)]
+
+
+class _InlineExecutor(Executor):
+    def submit(self, fn, *args):
+        fut = Future()
+        fut.set_result(fn(*args))
+        return fut
+
+
+@pytest.mark.asyncio
+async def test_executor_completion_at_cancel():
+    handled = []
+
+    def complete_and_cancel(task):
+        task.cancel()  # the caller is cancelled before it could receive the result
+        return "r"
+
+    with pytest.raises(wait_for2.CancelledWithResultError) as e:
+        await wait_for2.wait_for_executor(
+            _InlineExecutor(), complete_and_cancel, asyncio.current_task(), race_handler=lambda r, e: handled.append(r)
+        )
+    assert e.value.result == "r" and handled == ["r"]
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.impl import wait_for
+from .common.constants import GT_PY312
+
+
+async def _immediate(result):
+    return result
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("wait_for_impl", [wait_for2.wait_for, wait_for])
+async def test_fast_path_done(wait_for_impl):
+    loop = asyncio.get_running_loop()
+    sentinel = object()
+    fut = loop.create_future()
+    fut.set_result(sentinel)
+    wait_for2.reset_fast_path_stats()
+    assert await wait_for_impl(fut, 1.0) is sentinel
+    assert await wait_for_impl(fut, 0) is sentinel
+    assert wait_for2.fast_path_stats() == {"done": 2, "eager_start": 0, "eager_factory": 0, "waiter": 0, "builtin": 0}
+
+    fut = loop.create_future()
+    error = ValueError()
+    fut.set_exception(error)
+    with pytest.raises(ValueError):
+        await wait_for_impl(fut, 1.0)
+
+
+@pytest.mark.asyncio
+async def test_fast_path_eager_start():
+    sentinel = object()
+    wait_for2.reset_fast_path_stats()
+    assert await wait_for2.wait_for(_immediate(sentinel), 1.0, eager_start=True) is sentinel
+    assert await wait_for2.wait_for(asyncio.sleep(0, sentinel), 1.0, eager_start=True) is sentinel
+    stats = wait_for2.fast_path_stats()
+    if GT_PY312:
+        assert stats == {"done": 0, "eager_start": 1, "eager_factory": 0, "waiter": 1, "builtin": 0}
+    else:
+        assert stats == {"done": 0, "eager_start": 0, "eager_factory": 0, "waiter": 2, "builtin": 0}
+
+
+@pytest.mark.asyncio
+async def test_fast_path_builtin():
+    wait_for2.reset_fast_path_stats()
+    assert await wait_for2.wait_for(asyncio.sleep(0, "a"), 1.0) == "a"
+    assert await wait_for2.wait_for(asyncio.sleep(0, "b"), None) == "b"
+    stats = wait_for2.fast_path_stats()
+    if GT_PY312:
+        assert stats["builtin"] == 2 and stats["waiter"] == 0
+    else:
+        assert stats["builtin"] == 0 and stats["waiter"] == 2
+
+
+@pytest.mark.skipif(not GT_PY312, reason="eager task factories were added in Python 3.12")
+@pytest.mark.asyncio
+async def test_fast_path_eager_factory():
+    loop = asyncio.get_running_loop()
+    sentinel = object()
+    loop.set_task_factory(asyncio.eager_task_factory)
+    try:
+        wait_for2.reset_fast_path_stats()
+        assert await wait_for(_immediate(sentinel), 1.0) is sentinel
+        assert await wait_for(_immediate(sentinel), 0) is sentinel
+        assert wait_for2.fast_path_stats()["eager_factory"] == 2
+    finally:
+        loop.set_task_factory(None)
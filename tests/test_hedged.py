@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from .common.race import result_at_cancel
+
+
+class _Attempts(object):
+    """Factory whose n-th attempt runs the n-th coroutine function given."""
+
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.started = 0
+
+    def __call__(self):
+        behaviour = self.behaviours[self.started]
+        self.started += 1
+        return behaviour()
+
+
+def _after(delay, result):
+    async def attempt():
+        await asyncio.sleep(delay)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    return attempt
+
+
+@pytest.mark.asyncio
+async def test_hedged_first_success():
+    attempts = _Attempts(_after(0, "fast"))
+    assert await wait_for2.hedged(attempts, 0.1) == "fast"
+    assert attempts.started == 1
+
+    # the backup wins, the slow one is cancelled
+    attempts = _Attempts(_after(10, "slow"), _after(0.01, "backup"))
+    assert await wait_for2.hedged(attempts, 0.01) == "backup"
+    assert attempts.started == 2
+
+
+@pytest.mark.asyncio
+async def test_hedged_failures():
+    # a failure hedges right away
+    attempts = _Attempts(_after(0, ValueError("a")), _after(0, "b"))
+    assert await wait_for2.hedged(attempts, 10) == "b"
+
+    attempts = _Attempts(_after(0, ValueError("a")), _after(0.01, KeyError("b")))
+    with pytest.raises(KeyError):
+        await wait_for2.hedged(attempts, 10)
+
+    with pytest.raises(ValueError):
+        await wait_for2.hedged(_Attempts(), 1.0, max_attempts=0)
+
+
+@pytest.mark.asyncio
+async def test_hedged_loser_reclaimed():
+    handled = []
+    attempts = _Attempts(lambda: result_at_cancel("loser"), _after(0.01, "winner"))
+    result = await wait_for2.hedged(attempts, 0.01, race_handler=lambda r, e: handled.append((r, e)))
+    assert result == "winner"
+    assert handled == [("loser", False)]
+
+
+@pytest.mark.asyncio
+async def test_hedged_timeout():
+    handled = []
+    attempts = _Attempts(_after(10, "a"), _after(10, "b"), _after(10, "c"))
+    with pytest.raises(asyncio.TimeoutError):
+        await wait_for2.hedged(
+            attempts, 0.01, max_attempts=3, timeout=0.05, race_handler=lambda r, e: handled.append(r)
+        )
+    assert attempts.started == 3 and not handled
+
+    # an attempt completing while cancelled after the timeout is returned, like in wait_for
+    attempts = _Attempts(lambda: result_at_cancel("late"), _after(10, "b"))
+    assert await wait_for2.hedged(attempts, 0.01, timeout=0.05) == "late"
+
+
+@pytest.mark.asyncio
+async def test_hedged_cancelled():
+    handled = []
+    attempts = _Attempts(lambda: result_at_cancel("a"), lambda: result_at_cancel("b"))
+    task = asyncio.ensure_future(wait_for2.hedged(attempts, 0.01, race_handler=lambda r, e: handled.append(r)))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert sorted(handled) == ["a", "b"]
+
+    attempts = _Attempts(_after(10, "a"))
+    task = asyncio.ensure_future(wait_for2.hedged(attempts, 1.0))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError) as e:
+        await task
+    assert not isinstance(e.value, wait_for2.CancelledWithResultError)
+
+
+@pytest.mark.asyncio
+async def test_hedged_cancelled_with_result():
+    # the result is only propagated to the caller coroutine itself
+    handled = []
+
+    async def caller():
+        attempts = _Attempts(lambda: result_at_cancel("a"))
+        try:
+            await wait_for2.hedged(attempts, 1.0, race_handler=lambda r, e: handled.append(r))
+        except wait_for2.CancelledWithResultError as e:
+            return e.result, e.is_exception
+
+    task = asyncio.ensure_future(caller())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    assert await task == ("a", False)
+    assert handled == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_hedged_adaptive_delay():
+    adaptive = wait_for2.AdaptiveTimeout(1.0, quantile=0.95, min_samples=1, refresh=1)
+    assert await wait_for2.hedged(_Attempts(_after(0, "a")), adaptive) == "a"
+    assert adaptive.sketch.count == 1
+    assert adaptive.value() < 1.0
@@ -3,6 +3,7 @@ import asyncio
 import pytest
 
 import wait_for2
+from wait_for2.testing import run
 from .common.constants import BUILTIN_WAIT_FOR_BEHAVIOUR, BEST_WAIT_FOR_BEHAVIOUR, GT_PY312
 from .common.inner_bind import inner_bind_behaviour_check
 
@@ -22,3 +23,21 @@ async def test_inner_bound_wf2():
 
         x = await inner_bind_behaviour_check(wait_for)
     assert x == BEST_WAIT_FOR_BEHAVIOUR, str(x)
+
+
+# The same checks on the virtual clock, they only depend on the order of events so their sleeps are instant.
+
+
+def test_inner_bound_builtin_virtual_time():
+    x = run(inner_bind_behaviour_check(asyncio.wait_for))
+    assert x == BUILTIN_WAIT_FOR_BEHAVIOUR, str(x)
+
+
+def test_inner_bound_wf2_virtual_time():
+    x = run(inner_bind_behaviour_check(wait_for2.wait_for))
+    if GT_PY312:
+        assert x == BUILTIN_WAIT_FOR_BEHAVIOUR, str(x)
+        from wait_for2.impl import wait_for
+
+        x = run(inner_bind_behaviour_check(wait_for))
+    assert x == BEST_WAIT_FOR_BEHAVIOUR, str(x)
@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+
+
+@pytest.mark.asyncio
+async def test_semaphore_acquire_timeout():
+    sem = wait_for2.Semaphore(1)
+    assert await sem.acquire(0) is True
+    assert sem.locked()
+    with pytest.raises(asyncio.TimeoutError):
+        await sem.acquire(0.01)
+    asyncio.get_running_loop().call_later(0.01, sem.release)
+    assert await sem.acquire(1.0) is True
+    sem.release()
+    assert not sem.locked()
+    async with sem.acquired(0.01):
+        assert sem.locked()
+    async with sem:
+        assert sem.locked()
+    assert sem._value == 1
+    with pytest.raises(ValueError):
+        wait_for2.Semaphore(-1)
+
+
+@pytest.mark.asyncio
+async def test_semaphore_release_prioritized_over_timeout():
+    sem = wait_for2.Semaphore(0)
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(sem.acquire(0.01))
+    await asyncio.sleep(0)
+    # the timer and the release run in the same loop iteration, before the waiter resumes
+    loop.call_at(loop.time() + 0.01, sem.release)
+    assert await task is True
+    assert sem._value == 0
+
+
+@pytest.mark.asyncio
+async def test_semaphore_cancel_passes_permit_on():
+    sem = wait_for2.Semaphore(0)
+    first = asyncio.ensure_future(sem.acquire(1.0))
+    second = asyncio.ensure_future(sem.acquire(1.0))
+    await asyncio.sleep(0)
+    sem.release()
+    first.cancel()  # handed the permit, but cancelled before it could resume
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert await second is True
+    assert sem._value == 0
+    sem.release()
+    assert sem._value == 1
+
+
+@pytest.mark.asyncio
+async def test_semaphore_fifo():
+    sem = wait_for2.Semaphore(0)
+    order = []
+
+    async def waiter(i):
+        await sem.acquire(1.0)
+        order.append(i)
+
+    tasks = [asyncio.ensure_future(waiter(i)) for i in range(10)]
+    await asyncio.sleep(0)
+    tasks[3].cancel()
+    for _ in range(9):
+        sem.release()
+        # a newcomer does not overtake the queued waiters
+        with pytest.raises(asyncio.TimeoutError):
+            await sem.acquire(0)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert order == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    assert sem._value == 0
+
+
+@pytest.mark.asyncio
+async def test_bounded_semaphore():
+    sem = wait_for2.BoundedSemaphore(2)
+    with pytest.raises(ValueError):
+        sem.release()
+    await sem.acquire()
+    task = asyncio.ensure_future(sem.acquire(1.0))
+    await sem.acquire()
+    await asyncio.sleep(0)
+    sem.release()
+    await task
+    sem.release()
+    sem.release()
+    with pytest.raises(ValueError):
+        sem.release()
+
+
+@pytest.mark.asyncio
+async def test_lock():
+    lock = wait_for2.Lock()
+    with pytest.raises(RuntimeError):
+        lock.release()
+    async with lock.acquired(0.01):
+        assert lock.locked()
+        with pytest.raises(asyncio.TimeoutError):
+            await lock.acquire(0.01)
+    assert not lock.locked()
+    assert not lock._waiters
+
+
+@pytest.mark.asyncio
+async def test_release_twice_while_waiter_queued():
+    lock = wait_for2.Lock()
+    await lock.acquire()
+    waiter = asyncio.ensure_future(lock.acquire(1.0))
+    await asyncio.sleep(0)
+    lock.release()  # handed to the waiter, which has not resumed yet
+    with pytest.raises(RuntimeError):
+        lock.release()
+    assert lock.locked()
+    with pytest.raises(asyncio.TimeoutError):
+        await lock.acquire(0)
+    assert await waiter is True
+    assert lock.locked()
+    lock.release()
+    assert not lock.locked()
+
+    sem = wait_for2.BoundedSemaphore(1)
+    await sem.acquire()
+    waiter = asyncio.ensure_future(sem.acquire(1.0))
+    await asyncio.sleep(0)
+    sem.release()
+    with pytest.raises(ValueError):
+        sem.release()
+    assert await waiter is True
+    sem.release()
+    assert sem._value == 1
+
+
+@pytest.mark.asyncio
+async def test_semaphore_no_leak_under_cancel_storm():
+    sem = wait_for2.Semaphore(3)
+    loop = asyncio.get_running_loop()
+    held = 0
+
+    async def worker():
+        nonlocal held
+        for _ in range(20):
+            try:
+                await sem.acquire(0.005)
+            except asyncio.TimeoutError:
+                continue
+            held += 1
+            assert held <= 3
+            try:
+                await asyncio.sleep(0)
+            finally:
+                held -= 1
+                sem.release()
+
+    tasks = [loop.create_task(worker()) for _ in range(50)]
+    for i in range(200):
+        await asyncio.sleep(0)
+        tasks[i % 50].cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert sem._value == 3 and sem._held == 0 and sem._handed == 0
+    assert all(fut.done() for fut in sem._waiters)
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from .common.race import result_at_cancel
+
+
+async def _sleep_forever():
+    await asyncio.sleep(10.0)
+
+
+@pytest.mark.asyncio
+async def test_metrics_outcomes():
+    loop = asyncio.get_running_loop()
+    collector = wait_for2.install_metrics(loop=loop)
+    try:
+        assert wait_for2.get_metrics() is collector
+        assert await wait_for2.wait_for(asyncio.sleep(0, "ok"), 1.0, label="a") == "ok"
+        done = loop.create_future()
+        done.set_result("done")
+        assert await wait_for2.wait_for(done, 1.0, label="a") == "done"
+        with pytest.raises(ValueError):
+            await wait_for2.wait_for(loop.run_in_executor(None, int, "x"), 1.0, label="a")
+        with pytest.raises(asyncio.TimeoutError):
+            await wait_for2.wait_for(_sleep_forever(), 0.01, label="b")
+        with pytest.raises(asyncio.TimeoutError):
+            await wait_for2.wait_for(_sleep_forever(), 0, label="b")
+        assert await wait_for2.wait_for(asyncio.sleep(0, "ok"), None) == "ok"
+
+        task = asyncio.ensure_future(wait_for2.wait_for(_sleep_forever(), 1.0, label="c"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        handled = []
+        task = asyncio.ensure_future(
+            wait_for2.wait_for(result_at_cancel("r"), 1.0, label="c", race_handler=lambda r, ie: handled.append(r))
+        )
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert handled == ["r"]
+    finally:
+        wait_for2.uninstall_metrics(loop=loop)
+    assert wait_for2.get_metrics() is None
+
+    assert collector.counters("a") == {"completed": 2, "error": 1, "timeout": 0, "cancelled": 0, "race": 0}
+    assert collector.counters("b") == {"completed": 0, "error": 0, "timeout": 2, "cancelled": 0, "race": 0}
+    assert collector.counters("c") == {"completed": 0, "error": 0, "timeout": 0, "cancelled": 1, "race": 1}
+    assert collector.counters(None)["completed"] == 1
+    assert collector.wait_time("b").count == 2
+    assert collector.wait_time("b").quantile(1.0) >= 0.01
+    assert collector.cancel_latency("b").count == 2
+    assert collector.cancel_latency("c").count == 2
+    assert set(collector.snapshot()) == {"a", "b", "c", None}
+
+
+@pytest.mark.asyncio
+async def test_metrics_global():
+    collector = wait_for2.install_metrics()
+    try:
+        await wait_for2.wait_for(asyncio.sleep(0), 1.0)
+        per_loop = wait_for2.install_metrics(loop=asyncio.get_running_loop())
+        await wait_for2.wait_for(asyncio.sleep(0), 1.0)
+        wait_for2.uninstall_metrics(loop=asyncio.get_running_loop())
+    finally:
+        wait_for2.uninstall_metrics()
+    await wait_for2.wait_for(asyncio.sleep(0), 1.0)
+    assert collector.counters()["completed"] == 1
+    assert per_loop.counters()["completed"] == 1
+    collector.reset()
+    assert collector.labels() == []
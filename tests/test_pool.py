@@ -0,0 +1,160 @@
+import asyncio
+import random
+
+import pytest
+
+import wait_for2
+from .common.race import result_at_cancel
+from .common.resource import Resource
+
+
+class _Factory(object):
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.created = []
+        self.disposed = []
+
+    async def create(self):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ValueError("create failed")
+        resource = Resource()
+        self.created.append(resource)
+        return resource
+
+    def dispose(self, resource):
+        self.disposed.append(resource)
+
+
+@pytest.mark.asyncio
+async def test_pool_lifo_and_bounded():
+    factory = _Factory()
+    pool = wait_for2.Pool(factory.create, max_size=2, dispose=factory.dispose)
+    a = await pool.acquire()
+    b = await pool.acquire()
+    assert pool.size == 2
+    with pytest.raises(asyncio.TimeoutError):
+        await pool.acquire(timeout=0.01)
+    pool.release(a)
+    pool.release(b)
+    assert await pool.acquire() is b  # most recently released first
+    async with pool.acquired() as r:
+        assert r is a
+    assert pool.idle == 1
+    pool.release(b)
+    await pool.close()
+    assert sorted(map(id, factory.disposed)) == sorted(map(id, [a, b]))
+    assert pool.size == 0
+    with pytest.raises(wait_for2.PoolClosedError):
+        await pool.acquire()
+
+
+@pytest.mark.asyncio
+async def test_pool_acquired_discard_on_error():
+    factory = _Factory()
+    pool = wait_for2.Pool(factory.create, max_size=1, dispose=factory.dispose)
+    with pytest.raises(ValueError):
+        async with pool.acquired() as a:
+            raise ValueError()
+    assert pool.idle == 1 and not factory.disposed  # released by default
+    with pytest.raises(ValueError):
+        async with pool.acquired(discard_on_error=True) as b:
+            raise ValueError()
+    assert b is a and factory.disposed == [a]
+    assert pool.idle == 0 and pool.size == 0
+    async with pool.acquired(discard_on_error=True) as c:
+        pass
+    assert c is not a and pool.idle == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_waiters_fifo():
+    pool = wait_for2.Pool(_Factory().create, max_size=1)
+    r = await pool.acquire()
+    order = []
+
+    async def waiter(i):
+        order.append((i, await pool.acquire(timeout=1.0)))
+
+    tasks = [asyncio.ensure_future(waiter(i)) for i in range(3)]
+    await asyncio.sleep(0)
+    assert pool.waiting == 3
+    for i in range(3):
+        pool.release(r)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        r = order[-1][1]
+    await asyncio.gather(*tasks)
+    assert [i for i, _ in order] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_pool_race_returns_resource():
+    pool = wait_for2.Pool(_Factory().create, max_size=1)
+    r = await pool.acquire()
+    task = asyncio.ensure_future(pool.acquire(timeout=1.0))
+    await asyncio.sleep(0)
+    # the resource is handed to the waiter right when it is cancelled
+    pool.release(r)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert pool.idle == 1 and pool.size == 1
+
+    # created for an acquirer that was cancelled meanwhile
+    async def create():
+        return await result_at_cancel(Resource())
+
+    pool = wait_for2.Pool(create, max_size=1)
+    task = asyncio.ensure_future(pool.acquire(timeout=1.0))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError) as e:
+        await task
+    assert not isinstance(e.value, wait_for2.CancelledWithResultError)
+    assert pool.size == 1 and pool.idle == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_failed_create_frees_slot():
+    factory = _Factory(fail=True)
+    pool = wait_for2.Pool(factory.create, max_size=1)
+    with pytest.raises(ValueError):
+        await pool.acquire()
+    assert pool.size == 0
+    factory.fail = False
+    r = await pool.acquire()
+    task = asyncio.ensure_future(pool.acquire(timeout=1.0))
+    await asyncio.sleep(0)
+    pool.discard(r)  # the waiter is allowed to create a new one
+    assert await task is not r
+    assert pool.size == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_no_leak_under_cancellation():
+    factory = _Factory()
+    pool = wait_for2.Pool(factory.create, max_size=20)
+    held = []
+
+    async def worker():
+        while True:
+            async with pool.acquired(timeout=random.choice([None, 0.001, 0.01])) as r:
+                held.append(r)
+                try:
+                    await asyncio.sleep(0)
+                finally:
+                    held.remove(r)
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(1000)]
+    for _ in range(20):
+        await asyncio.sleep(0.005)
+        for t in random.sample(tasks, 100):
+            t.cancel()
+        tasks = [t for t in tasks if not t.cancelled()] + [asyncio.ensure_future(worker()) for _ in range(100)]
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    assert not held
+    assert pool.size == pool.idle == len(factory.created) <= 20
@@ -0,0 +1,102 @@
+import asyncio
+import random
+
+import pytest
+
+import wait_for2
+
+
+@pytest.mark.asyncio
+async def test_queue_get_timeout():
+    queue = wait_for2.Queue()
+    with pytest.raises(asyncio.TimeoutError):
+        await queue.get(0.01)
+    with pytest.raises(asyncio.TimeoutError):
+        await queue.get(0)
+    queue.put_nowait(1)
+    assert await queue.get(0) == 1
+    asyncio.get_running_loop().call_later(0.01, queue.put_nowait, 2)
+    assert await queue.get(1.0) == 2
+    assert not queue._getters
+
+
+@pytest.mark.asyncio
+async def test_queue_requires_internals(monkeypatch):
+    monkeypatch.delattr(asyncio.Queue, "_wakeup_next")
+    with pytest.raises(RuntimeError):
+        wait_for2.Queue()
+
+
+@pytest.mark.asyncio
+async def test_queue_item_prioritized_over_timeout():
+    queue = wait_for2.Queue()
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(queue.get(0.01))
+    await asyncio.sleep(0)
+    # the timer and the put run in the same loop iteration, before the getter resumes
+    loop.call_at(loop.time() + 0.01, queue.put_nowait, "item")
+    assert await task == "item"
+
+
+@pytest.mark.asyncio
+async def test_queue_cancel_keeps_order():
+    queue = wait_for2.Queue()
+    first = asyncio.ensure_future(queue.get(1.0))
+    second = asyncio.ensure_future(queue.get(1.0))
+    await asyncio.sleep(0)
+    queue.put_nowait(1)
+    queue.put_nowait(2)
+    first.cancel()  # woken up for an item, but cancelled before it could take it
+    with pytest.raises(asyncio.CancelledError):
+        await first
+    assert await second == 1
+    assert queue.get_nowait() == 2
+
+
+@pytest.mark.asyncio
+async def test_queue_get_batch():
+    queue = wait_for2.Queue(maxsize=3)
+    with pytest.raises(ValueError):
+        await queue.get_batch(0)
+    with pytest.raises(asyncio.TimeoutError):
+        await queue.get_batch(10, 0.01)
+    producer = asyncio.ensure_future(asyncio.gather(*(queue.put(i) for i in range(5))))
+    await asyncio.sleep(0)
+    assert await queue.get_batch(2, 1.0) == [0, 1]
+    assert await queue.get_batch(10, 1.0) == [2]
+    await asyncio.sleep(0)
+    assert await queue.get_batch(10, 1.0) == [3, 4]
+    await producer
+
+
+@pytest.mark.asyncio
+async def test_queue_lossless_stress():
+    queue = wait_for2.Queue()
+    received = []
+    count = 20000
+
+    async def consumer():
+        while True:
+            try:
+                if random.random() < 0.5:
+                    received.append(await queue.get(random.choice([0, 0.0001, 0.001])))
+                else:
+                    received.extend(await queue.get_batch(random.randint(1, 50), random.choice([0, 0.001])))
+            except asyncio.TimeoutError:
+                pass
+
+    consumers = [asyncio.ensure_future(consumer()) for _ in range(50)]
+    for i in range(count):
+        queue.put_nowait(i)
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+            victim = random.randrange(len(consumers))
+            consumers[victim].cancel()
+            consumers[victim] = asyncio.ensure_future(consumer())
+    while len(received) + queue.qsize() < count:
+        await asyncio.sleep(0.001)
+    for c in consumers:
+        c.cancel()
+    await asyncio.gather(*consumers, return_exceptions=True)
+    received.extend(queue.get_nowait() for _ in range(queue.qsize()))
+    assert sorted(received) == list(range(count))
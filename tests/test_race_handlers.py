@@ -0,0 +1,128 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import wait_for2
+from .common.race import result_at_cancel
+from .common.resource import ResourceWorkerWaitForTester
+
+
+@pytest.mark.asyncio
+async def test_race_handler_runner():
+    loop = asyncio.get_running_loop()
+    running = []
+    max_running = []
+    handled = []
+
+    async def handler(r, ie):
+        running.append(r)
+        max_running.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(r)
+        handled.append((r, ie))
+
+    runner = wait_for2.RaceHandlerRunner(handler, concurrency=2, high_water=3)
+    for i in range(6):
+        runner(i, False)
+    assert runner.pending == 6
+    await runner.throttle()
+    assert runner.pending <= 3
+    await runner.join()
+    assert runner.pending == 0
+    assert handled == [(i, False) for i in range(6)]
+    assert max(max_running) == 2
+
+    def invert(r, ie):
+        handled.append(r)
+        return 1 / r
+
+    errors = []
+    loop.set_exception_handler(lambda _, ctx: errors.append(ctx["exception"]))
+    try:
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            runner = wait_for2.RaceHandlerRunner(invert, executor=executor)
+            runner(1, False)
+            runner(0, False)
+            await runner.join()
+        sync_runner = wait_for2.RaceHandlerRunner(lambda r, ie: handled.append(r))
+        sync_runner("sync", False)
+        assert handled[-1] == 0
+        await sync_runner.join()
+        assert handled[-1] == "sync"
+    finally:
+        loop.set_exception_handler(None)
+    assert len(errors) == 1 and isinstance(errors[0], ZeroDivisionError)
+
+
+@pytest.mark.asyncio
+async def test_coroutine_race_handler():
+    from wait_for2.impl import wait_for
+
+    handled = []
+
+    async def handler(r, ie):
+        await asyncio.sleep(0)
+        handled.append((r, ie))
+
+    task = asyncio.ensure_future(wait_for(result_at_cancel("r"), 1.0, race_handler=handler))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert handled == []
+    await wait_for2.drain_race_handlers()
+    assert handled == [("r", False)]
+
+
+@pytest.mark.asyncio
+async def test_resource_leakage_wf2_async_callback():
+    tester = ResourceWorkerWaitForTester(wait_for2.wait_for)
+
+    async def cleanup(resource, exc):
+        await asyncio.sleep(0)
+        tester.cleanup_resource(resource, exc)
+
+    await tester.run(race_handler=cleanup, drain=wait_for2.drain_race_handlers)
+
+
+@pytest.mark.asyncio
+async def test_resource_leakage_wf2_executor_callback():
+    tester = ResourceWorkerWaitForTester(wait_for2.wait_for)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        runner = wait_for2.RaceHandlerRunner(tester.cleanup_resource, executor=executor)
+        await tester.run(race_handler=runner, drain=runner.join)
+
+
+@pytest.mark.asyncio
+async def test_awaitable_returning_race_handler():
+    from wait_for2.impl import wait_for
+
+    handled = []
+
+    async def handler(tag, r, ie):
+        await asyncio.sleep(0)
+        handled.append((tag, r, ie))
+
+    class Handler(object):
+        async def __call__(self, r, ie):
+            await handler("call", r, ie)
+
+    for race_handler in (lambda r, ie: handler("lambda", r, ie), Handler()):
+        task = asyncio.ensure_future(wait_for(result_at_cancel("r"), 1.0, race_handler=race_handler))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    await wait_for2.drain_race_handlers()
+    assert handled == [("lambda", "r", False), ("call", "r", False)]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        for runner in (
+            wait_for2.RaceHandlerRunner(lambda r, ie: handler("sync", r, ie)),
+            wait_for2.RaceHandlerRunner(lambda r, ie: handler("executor", r, ie), executor=executor),
+        ):
+            runner(1, True)
+            await runner.join()
+            assert runner.pending == 0
+    assert handled[2:] == [("sync", 1, True), ("executor", 1, True)]
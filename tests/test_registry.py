@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.impl import wait_for
+from wait_for2.testing import run
+from .common.race import result_at_cancel
+
+
+async def _slow_shutdown(shutdown):
+    try:
+        await asyncio.sleep(100)
+    except asyncio.CancelledError:
+        await asyncio.sleep(shutdown)
+        raise
+
+
+async def _outcome(aw):
+    try:
+        return await aw
+    except asyncio.CancelledError as e:
+        return e  # before Python 3.11 the task would not keep the exception type
+    except Exception as e:
+        return e
+
+
+def test_registry_active_waits():
+    async def main():
+        loop = asyncio.get_running_loop()
+        registry = wait_for2.install_wait_registry(loop=loop)
+        try:
+            assert wait_for2.get_wait_registry() is registry
+            done = loop.create_future()
+            done.set_result(None)
+            await wait_for(done, 1.0)
+            assert len(registry) == 0
+            tasks = [
+                asyncio.ensure_future(wait_for(asyncio.sleep(2.0), 5.0, label="a")),
+                asyncio.ensure_future(wait_for(asyncio.sleep(2.0), None, label="b")),
+            ]
+            await asyncio.sleep(1.0)
+            active = sorted(registry.active(), key=lambda entry: entry.label)
+            assert [entry.label for entry in active] == ["a", "b"]
+            assert active[0].remaining() == pytest.approx(4.0) and active[1].remaining() is None
+            assert active[0].task is tasks[0] and active[0].started == 0.0
+            await asyncio.gather(*tasks)
+            assert len(registry) == 0
+        finally:
+            wait_for2.uninstall_wait_registry(loop=loop)
+        assert wait_for2.get_wait_registry() is None
+
+    run(main())
+
+
+def test_registry_drain():
+    async def main():
+        loop = asyncio.get_running_loop()
+        registry = wait_for2.install_wait_registry(loop=loop)
+        try:
+            short = asyncio.ensure_future(_outcome(wait_for(asyncio.sleep(0.5, "short"), 1.0)))
+            times_out = asyncio.ensure_future(_outcome(wait_for(asyncio.sleep(10.0), 1.0)))
+            slow = asyncio.ensure_future(_outcome(wait_for(_slow_shutdown(1.0), 1.5)))
+            long = asyncio.ensure_future(_outcome(wait_for(asyncio.sleep(10.0), 10.0)))
+            unbounded = asyncio.ensure_future(_outcome(wait_for(asyncio.sleep(10.0), None)))
+            raced = [asyncio.ensure_future(_outcome(wait_for(result_at_cancel(i), 10.0))) for i in range(3)]
+            await asyncio.sleep(0)
+            assert len(registry) == 8
+
+            assert sorted(await registry.drain(2.0)) == [(0, False), (1, False), (2, False)]
+            # the slow one timed out at 1.5, was cancelled at 2.0 and terminated at 2.5
+            assert loop.time() == pytest.approx(2.5)
+            assert len(registry) == 0
+            assert short.result() == "short"
+            assert isinstance(times_out.result(), asyncio.TimeoutError)
+            assert isinstance(slow.result(), asyncio.CancelledError)
+            assert isinstance(long.result(), asyncio.CancelledError)
+            assert isinstance(unbounded.result(), asyncio.CancelledError)
+
+            coro = asyncio.sleep(0)
+            with pytest.raises(wait_for2.DrainingError):
+                await wait_for(coro, 1.0)
+            assert coro.cr_frame is None  # closed
+        finally:
+            wait_for2.uninstall_wait_registry(loop=loop)
+
+    run(main())
+
+
+async def _ignores_cancel(delay):
+    try:
+        await asyncio.sleep(100)
+    except asyncio.CancelledError:
+        pass
+    await asyncio.sleep(delay)
+
+
+def test_registry_drain_again():
+    async def main():
+        loop = asyncio.get_running_loop()
+        registry = wait_for2.install_wait_registry(loop=loop)
+        try:
+            # the calls without a timeout hand their raced results over too
+            raced = asyncio.ensure_future(_outcome(wait_for(result_at_cancel("a"), None)))
+            await asyncio.sleep(0)
+            assert await registry.drain(1.0) == [("a", False)]
+            assert isinstance(raced.result(), asyncio.CancelledError)
+
+            registry.resume()
+            raced = asyncio.ensure_future(_outcome(wait_for(result_at_cancel("b"), 10.0)))
+            stubborn = asyncio.ensure_future(_outcome(wait_for(_ignores_cancel(100.0), 10.0)))
+            await asyncio.sleep(0)
+            start = loop.time()
+            assert await registry.drain(1.0, stop_wait=2.0) == [("b", False)]  # only the results of this drain
+            # waited for until max_wait and then stop_wait, the stubborn call is not waited for longer
+            assert loop.time() - start == pytest.approx(3.0)
+            assert len(registry) == 1 and not stubborn.done()
+            stubborn.cancel()
+        finally:
+            wait_for2.uninstall_wait_registry(loop=loop)
+
+    run(main())
+
+
+def test_registry_drain_batches():
+    async def main():
+        loop = asyncio.get_running_loop()
+        registry = wait_for2.install_wait_registry(wait_for2.WaitRegistry(cancel_batch=1000), loop=loop)
+        try:
+            tasks = [asyncio.ensure_future(wait_for(asyncio.sleep(10.0), 10.0)) for _ in range(3000)]
+            await asyncio.sleep(0)
+            drain = asyncio.ensure_future(registry.drain(1.0))
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            assert len(registry._cancel_queue) == 2000  # one batch per loop iteration
+            assert await drain == []
+            assert all(task.cancelled() for task in tasks)
+            assert loop.time() == 0.0
+        finally:
+            wait_for2.uninstall_wait_registry(loop=loop)
+        with pytest.raises(ValueError):
+            wait_for2.WaitRegistry(cancel_batch=0)
+
+    run(main())
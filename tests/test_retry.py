@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.testing import run
+from .common.race import result_at_cancel
+
+
+class _Attempts(object):
+    def __init__(self, *behaviours):
+        self.behaviours = list(behaviours)
+        self.started = []
+
+    async def __call__(self):
+        self.started.append(asyncio.get_running_loop().time())
+        behaviour = self.behaviours.pop(0) if self.behaviours else "ok"
+        if isinstance(behaviour, BaseException):
+            raise behaviour
+        if behaviour == "hang":
+            await asyncio.sleep(100)
+        if behaviour == "result_at_cancel":
+            return await result_at_cancel("late")
+        return behaviour
+
+
+_NO_JITTER = wait_for2.Backoff(0.1, 2.0, 1.0, jitter=0)
+
+
+def test_backoff():
+    backoff = wait_for2.Backoff(0.1, 2.0, 1.0, jitter=0)
+    assert [backoff(n) for n in range(1, 6)] == pytest.approx([0.1, 0.2, 0.4, 0.8, 1.0])
+    jittered = wait_for2.Backoff(1.0, 1.0, 1.0, jitter=0.5)
+    assert all(0.5 <= jittered(1) <= 1.0 for _ in range(100))
+    with pytest.raises(ValueError):
+        wait_for2.Backoff(jitter=2)
+
+
+def test_retry_until_success():
+    async def main():
+        factory = _Attempts(ValueError(), "hang", ValueError(), "done")
+        assert await wait_for2.retry(factory, 1.0, backoff=_NO_JITTER) == "done"
+        assert factory.started == pytest.approx([0.0, 0.1, 1.3, 1.7])
+
+        factory = _Attempts(ValueError(), "done")
+        assert await wait_for2.retry(factory, 1.0, retry_on=lambda exc: True, backoff=_NO_JITTER) == "done"
+
+    run(main())
+
+
+def test_retry_gives_up():
+    async def main():
+        factory = _Attempts(ValueError(), TypeError(), "done")
+        with pytest.raises(TypeError):
+            await wait_for2.retry(factory, 1.0, retry_on=(ValueError, asyncio.TimeoutError), backoff=_NO_JITTER)
+        assert len(factory.started) == 2
+
+        factory = _Attempts(ValueError(), ValueError(), ValueError(), "done")
+        with pytest.raises(ValueError):
+            await wait_for2.retry(factory, 1.0, max_attempts=3, backoff=_NO_JITTER)
+        assert len(factory.started) == 3
+
+        factory = _Attempts("hang", "hang")
+        with pytest.raises(asyncio.TimeoutError):
+            await wait_for2.retry(factory, 1.0, max_attempts=2, backoff=_NO_JITTER)
+
+    run(main())
+
+
+def test_retry_total_budget():
+    async def main():
+        loop = asyncio.get_running_loop()
+        # the total budget expires during an attempt, which is not retried
+        factory = _Attempts("hang", "hang", "hang")
+        with pytest.raises(wait_for2.DeadlineExceeded):
+            await wait_for2.retry(factory, 1.0, 1.5, backoff=_NO_JITTER)
+        assert factory.started == pytest.approx([0.0, 1.1])
+        assert loop.time() == pytest.approx(1.5)
+        assert wait_for2.time_remaining() is None
+
+        # it is not slept past either, the last error is raised as soon as the next retry could not start in time
+        start = loop.time()
+        factory = _Attempts(*[ValueError()] * 10)
+        with pytest.raises(ValueError):
+            await wait_for2.retry(factory, 1.0, 2.5, backoff=wait_for2.Backoff(1.0, 1.0, jitter=0))
+        assert len(factory.started) == 3
+        assert loop.time() - start == pytest.approx(2.0)
+
+        # an enclosing deadline is the total budget if it is earlier
+        start = loop.time()
+        with pytest.raises(wait_for2.DeadlineExceeded):
+            with wait_for2.deadline(0.5):
+                await wait_for2.retry(_Attempts("hang"), 1.0, 10.0)
+        assert loop.time() - start == pytest.approx(0.5)
+
+    run(main())
+
+
+def test_retry_race_handler():
+    handled = []
+    raised = []
+
+    async def call(factory):
+        try:
+            return await wait_for2.retry(
+                factory, 10.0, backoff=_NO_JITTER, race_handler=lambda r, e: handled.append((r, e))
+            )
+        except asyncio.CancelledError as e:
+            raised.append(e)  # before Python 3.11 the task would not keep the exception type
+            raise
+
+    async def main():
+        factory = _Attempts(ValueError(), "result_at_cancel")
+        task = asyncio.ensure_future(call(factory))
+        await asyncio.sleep(1.0)
+        assert len(factory.started) == 2
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert isinstance(raised[0], wait_for2.CancelledWithResultError)
+        assert handled == [("late", False)]
+
+        # cancelled during the backoff
+        factory = _Attempts(ValueError())
+        task = asyncio.ensure_future(call(factory))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not isinstance(raised[1], wait_for2.CancelledWithResultError)
+        assert len(handled) == 1
+
+    run(main())
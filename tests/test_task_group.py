@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.testing import run
+from .common.race import result_at_cancel
+
+
+async def _sleep_and_return(delay, result):
+    await asyncio.sleep(delay)
+    return result
+
+
+def test_task_group_completes():
+    async def main():
+        loop = asyncio.get_running_loop()
+        async with wait_for2.TaskGroup(timeout=5.0) as group:
+            tasks = [group.create_task(_sleep_and_return(i * 0.1, i)) for i in range(10)]
+            assert len(group) == 10
+        assert [task.result() for task in tasks] == list(range(10))
+        assert len(group) == 0 and not group.expired()
+        assert loop.time() == pytest.approx(0.9)
+        with pytest.raises(RuntimeError):
+            group.create_task(_sleep_and_return(0, None))
+        with pytest.raises(RuntimeError):
+            wait_for2.TaskGroup().create_task(_sleep_and_return(0, None))
+        with pytest.raises(ValueError):
+            wait_for2.TaskGroup(cancel_batch=0)
+
+    run(main())
+
+
+def test_task_group_timeout():
+    async def main():
+        loop = asyncio.get_running_loop()
+        with pytest.raises(asyncio.TimeoutError):
+            async with wait_for2.TaskGroup(timeout=1.0) as group:
+                fast = group.create_task(_sleep_and_return(0.5, "fast"))
+                slow = group.create_task(_sleep_and_return(10.0, "slow"))
+                # the group enforces its deadline, the nested calls with later timeouts need no timers
+                nested = group.create_task(wait_for2.wait_for(_sleep_and_return(10.0, None), 5.0))
+                deadline = group.create_task(wait_for2.wait_for(asyncio.ensure_future(asyncio.sleep(10.0)), 5.0))
+        assert group.expired()
+        assert loop.time() == pytest.approx(1.0)
+        assert fast.result() == "fast"
+        assert slow.cancelled() and nested.cancelled() and deadline.cancelled()
+
+        # an earlier enclosing deadline is kept, the child fails on its own
+        start = loop.time()
+        with pytest.raises(wait_for2.DeadlineExceeded), wait_for2.deadline(0.5):
+            async with wait_for2.TaskGroup(timeout=1.0) as group:
+                task = group.create_task(wait_for2.wait_for(_sleep_and_return(10.0, None), 5.0))
+        assert isinstance(task.exception(), wait_for2.DeadlineExceeded)
+        assert loop.time() - start == pytest.approx(0.5)
+
+    run(main())
+
+
+def test_task_group_collects_races():
+    async def main():
+        with pytest.raises(asyncio.TimeoutError):
+            async with wait_for2.TaskGroup(timeout=1.0) as group:
+                for i in range(100):
+                    group.create_task(wait_for2.wait_for(result_at_cancel(i), 10.0))
+                group.create_task(wait_for2.wait_for(_sleep_and_return(10.0, None), 10.0))
+        assert sorted(group.raced) == [(i, False) for i in range(100)]
+
+        # without a deadline and a race_handler too (the builtin wait_for would be used on Python 3.12+)
+        async with wait_for2.TaskGroup() as group:
+            group.create_task(wait_for2.wait_for(result_at_cancel("r"), 10.0))
+            await asyncio.sleep(0.5)
+            group.cancel()
+        assert group.raced == [("r", False)]
+
+    run(main())
+
+
+def test_task_group_batched_cancel():
+    async def main():
+        batches = []
+        loop = asyncio.get_running_loop()
+
+        async def child():
+            try:
+                await asyncio.sleep(100)
+            except asyncio.CancelledError:
+                batches.append(loop.time())
+                raise
+
+        async with wait_for2.TaskGroup(cancel_batch=100) as group:
+            tasks = [group.create_task(child()) for _ in range(5000)]
+            await asyncio.sleep(1.0)
+            group.cancel()
+            await asyncio.sleep(0)
+            assert len(group._cancel_queue) == 4900  # one batch per loop iteration
+            # the body may keep adding children, they are cancelled too
+            tasks.append(group.create_task(child()))
+        assert all(task.cancelled() for task in tasks)
+        assert len(batches) == 5001
+
+    run(main())
+
+
+def test_task_group_child_error():
+    async def failing():
+        await asyncio.sleep(0.5)
+        raise ValueError("broken")
+
+    async def main():
+        with pytest.raises(ValueError):
+            async with wait_for2.TaskGroup(timeout=10.0) as group:
+                sibling = group.create_task(_sleep_and_return(5.0, None))
+                group.create_task(failing())
+        assert sibling.cancelled() and not group.expired()
+        assert len(group.errors) == 1
+
+        # the body is cancelled by the error of a child, which is raised instead
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        body_cancelled = False
+        with pytest.raises(ValueError):
+            async with wait_for2.TaskGroup() as group:
+                group.create_task(failing())
+                try:
+                    await asyncio.sleep(10.0)
+                except asyncio.CancelledError:
+                    body_cancelled = True
+                    raise
+        assert body_cancelled and loop.time() - start == pytest.approx(0.5)
+        if hasattr(asyncio.current_task(), "cancelling"):
+            assert asyncio.current_task().cancelling() == 0
+
+        # the exception of the body has precedence
+        with pytest.raises(KeyError):
+            async with wait_for2.TaskGroup() as group:
+                sibling = group.create_task(_sleep_and_return(5.0, None))
+                raise KeyError()
+        assert sibling.cancelled()
+
+    run(main())
+
+
+def test_task_group_cancelled_waits_for_children():
+    stopped = []
+
+    async def stubborn():
+        try:
+            await asyncio.sleep(100)
+        except asyncio.CancelledError:
+            await asyncio.sleep(1.0)
+            stopped.append(asyncio.get_running_loop().time())
+            raise
+
+    async def parent():
+        async with wait_for2.TaskGroup() as group:
+            group.create_task(stubborn())
+
+    async def main():
+        task = asyncio.ensure_future(parent())
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert stopped == [pytest.approx(1.5)]
+
+    run(main())
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from .common.constants import BUILTIN_PROPAGATES_CUSTOM_CANCEL, TASK_TRACKS_CANCELLATION
+from .common.race import result_at_cancel
+
+
+@pytest.mark.asyncio
+async def test_timeout_scope():
+    with pytest.raises(asyncio.TimeoutError):
+        async with wait_for2.timeout(0.05) as scope:
+            await asyncio.sleep(1.0)
+    assert scope.expired()
+
+    async with wait_for2.timeout(1.0) as scope:
+        await asyncio.sleep(0.01)
+    assert not scope.expired()
+
+    async with wait_for2.timeout(None) as scope:
+        await asyncio.sleep(0.01)
+    assert not scope.expired()
+
+    # result after cancel by timeout is prioritized
+    async with wait_for2.timeout(0.05) as scope:
+        assert await scope.guard(result_at_cancel("ok")) == "ok"
+    assert scope.expired()
+    await asyncio.sleep(0.01)  # the timeout's cancellation is not left pending on the task
+
+
+@pytest.mark.asyncio
+async def test_timeout_scope_reenter():
+    scope = wait_for2.timeout(1.0)
+    async with scope:
+        with pytest.raises(RuntimeError):
+            async with scope:
+                pass
+        await asyncio.sleep(0.01)
+    assert not scope.expired()
+    with pytest.raises(RuntimeError):
+        async with scope:
+            pass
+
+
+@pytest.mark.asyncio
+async def test_timeout_scope_explicit_cancel():
+    async def inner():
+        async with wait_for2.timeout(5.0):
+            await asyncio.sleep(1.0)
+
+    task = asyncio.ensure_future(inner())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.asyncio
+async def test_timeout_scope_guard_future_race():
+    loop = asyncio.get_running_loop()
+    handled = []
+    sentinel = object()
+
+    # completion and the timeout's cancellation at the same time: the result is prioritized
+    fut = loop.create_future()
+    async with wait_for2.timeout(5.0) as scope:
+        loop.call_soon(lambda: (fut.set_result(sentinel), scope._on_timeout()))
+        assert await scope.guard(fut) is sentinel
+    assert scope.expired()
+
+    # completion and an explicit cancellation at the same time: the result is passed to the race_handler
+    async def inner(f):
+        async with wait_for2.timeout(5.0, race_handler=lambda r, ie: handled.append((r, ie))) as s:
+            await s.guard(f)
+
+    fut = loop.create_future()
+    task = asyncio.ensure_future(inner(fut))
+    await asyncio.sleep(0)
+    loop.call_soon(lambda: (fut.set_result(sentinel), task.cancel()))
+    try:
+        await task
+    except wait_for2.CancelledWithResultError:
+        assert BUILTIN_PROPAGATES_CUSTOM_CANCEL, "task does not propagate the custom exception"
+    except asyncio.CancelledError:
+        assert not BUILTIN_PROPAGATES_CUSTOM_CANCEL, "custom exception should be propagated"
+    else:
+        assert False, "did not raise"
+    assert handled == [(sentinel, False)]
+
+
+@pytest.mark.asyncio
+async def test_timeout_scope_guard_coroutine_race():
+    handled = []
+
+    async def inner():
+        async with wait_for2.timeout(5.0, race_handler=lambda r, ie: handled.append((r, ie))) as s:
+            return await s.guard(result_at_cancel("ok"))
+
+    task = asyncio.ensure_future(inner())
+    await asyncio.sleep(0.01)
+    task.cancel()
+    if TASK_TRACKS_CANCELLATION:
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert handled == [("ok", False)]
+    else:
+        # the suppressed cancellation can not be detected, it is lost like with the builtin
+        assert await task == "ok"
+        assert not handled
@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.wheel import TimerWheel
+from .common.constants import BEST_WAIT_FOR_BEHAVIOUR
+from .common.inner_bind import inner_bind_behaviour_check
+
+
+@pytest.mark.asyncio
+async def test_timer_wheel_fires_in_order():
+    loop = asyncio.get_running_loop()
+    # small wheel so that the delays below exercise cascading and the beyond-the-top-level parking
+    wheel = TimerWheel(loop, resolution=0.002, slots=4, levels=3)
+    fired = []
+    done = loop.create_future()
+    delays = [0.3, 0.001, 0.05, 0.009, 0.2, 0.02, 0.13]
+
+    def cb(i, deadline):
+        fired.append(i)
+        assert loop.time() >= deadline - 0.002
+        if len(fired) == len(delays):
+            done.set_result(None)
+
+    for i, delay in enumerate(delays):
+        wheel.call_later(delay, cb, i, loop.time() + delay)
+    assert len(wheel) == len(delays)
+    await asyncio.wait_for(done, 2.0)
+    assert fired == sorted(range(len(delays)), key=lambda i: delays[i])
+    assert len(wheel) == 0
+
+
+@pytest.mark.asyncio
+async def test_timer_wheel_cancel():
+    loop = asyncio.get_running_loop()
+    wheel = TimerWheel(loop, resolution=0.005)
+    fired = []
+    handles = [wheel.call_later(0.01 * (i % 5), fired.append, i) for i in range(1000)]
+    for h in handles[1:]:
+        h.cancel()
+        h.cancel()
+    assert len(wheel) == 1
+    await asyncio.sleep(0.05)
+    assert fired == [0]
+    assert len(wheel) == 0
+
+
+@pytest.mark.asyncio
+async def test_timer_wheel_slack():
+    loop = asyncio.get_running_loop()
+    wheel = TimerWheel(loop, resolution=0.001, slack=0.05)
+    base = loop.time()
+    handles = [wheel.call_at(base + 0.001 * i, lambda: None) for i in range(1, 40)]
+    assert len({h.when() for h in handles}) <= 2
+    assert all(h.when() >= base + 0.001 * i for i, h in enumerate(handles, 1))
+    precise = wheel.call_at(base + 0.001, lambda: None, slack=0)
+    assert precise.when() < handles[-1].when()
+    for h in handles + [precise]:
+        h.cancel()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_timer_wheel():
+    loop = asyncio.get_running_loop()
+    wheel = TimerWheel(loop, resolution=0.01)
+    with pytest.raises(asyncio.TimeoutError):
+        await wait_for2.wait_for(asyncio.sleep(1.0), 0.05, scheduler=wheel)
+    assert await wait_for2.wait_for(asyncio.sleep(0.01, "ok"), 1.0, scheduler=wheel) == "ok"
+    assert len(wheel) == 0
+
+    installed = wait_for2.install_timer_wheel(resolution=0.01)
+    try:
+        assert wait_for2.get_timer_wheel() is installed
+        task = asyncio.ensure_future(wait_for2.wait_for(asyncio.sleep(1.0), 0.05))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert len(installed) == 1
+        with pytest.raises(asyncio.TimeoutError):
+            await task
+        # the loop can still be chosen explicitly
+        assert await wait_for2.wait_for(asyncio.sleep(0, "ok"), 1.0, scheduler=loop) == "ok"
+    finally:
+        wait_for2.uninstall_timer_wheel()
+    assert wait_for2.get_timer_wheel() is None
+
+
+@pytest.mark.asyncio
+async def test_inner_bound_wf2_timer_wheel():
+    wait_for2.install_timer_wheel(resolution=0.01)
+    try:
+        x = await inner_bind_behaviour_check(wait_for2.wait_for)
+    finally:
+        wait_for2.uninstall_timer_wheel()
+    assert x == BEST_WAIT_FOR_BEHAVIOUR, str(x)
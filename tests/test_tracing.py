@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.testing import run
+from .common.race import result_at_cancel
+
+
+def _events(buffer):
+    return {call_id: [event for event, _ in events] for call_id, events in buffer.calls().items()}
+
+
+def test_trace_buffer_ring():
+    buffer = wait_for2.TraceBuffer(4)
+    for i in range(6):
+        assert buffer.start(i, float(i), "l%d" % i if i % 2 else None) == i + 1
+    assert len(buffer) == 4 and buffer.dropped() == 2
+    assert buffer.records() == [
+        (3, "done", 2.0, None),
+        (4, "wait", 3.0, "l3"),
+        (5, "wait_no_timer", 4.0, None),
+        (6, "cancelled_inner_done", 5.0, "l5"),
+    ]
+    buffer.clear()
+    assert buffer.records() == [] and buffer.dropped() == 0
+    with pytest.raises(ValueError):
+        wait_for2.TraceBuffer(0)
+
+
+@pytest.mark.parametrize("format", ["json", "binary"])
+def test_trace_dump(tmp_path, format):
+    buffer = wait_for2.TraceBuffer(2)
+    buffer.record(1, 0, 0.5, "a")
+    buffer.record(1, 3, 1.0, "ä" * 10)
+    buffer.record(1, 8, 1.5, None)
+    path = str(tmp_path / "trace")
+    buffer.dump(path, format)
+    assert wait_for2.load_trace(path) == {
+        "dropped": 1,
+        "records": [[1, "wait", 1.0, "ä" * 10], [1, "completed", 1.5, None]],
+    }
+    with pytest.raises(ValueError):
+        buffer.dump(path, "xml")
+
+
+def test_trace_dump_truncates_label_on_characters(tmp_path):
+    buffer = wait_for2.TraceBuffer(1)
+    buffer.start(0, 0.0, "a" + "é" * 40000)  # 80001 bytes in UTF-8, over the limit of the binary format
+    path = str(tmp_path / "trace")
+    buffer.dump(path, "binary")
+    label = wait_for2.load_trace(path)["records"][0][3]
+    assert label == "a" + "é" * 32766  # 65533 bytes, the next character would not fit
+
+
+def test_tracing_paths():
+    async def sleep_forever():
+        await asyncio.sleep(100)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        buffer = wait_for2.install_tracing(loop=loop)
+        try:
+            assert wait_for2.get_tracing() is buffer
+            assert await wait_for2.wait_for(asyncio.sleep(0.5, "ok"), 1.0, label="a") == "ok"
+            done = loop.create_future()
+            done.set_result("done")
+            assert await wait_for2.wait_for(done, 1.0) == "done"
+            with pytest.raises(asyncio.TimeoutError):
+                await wait_for2.wait_for(sleep_forever(), 1.0)
+            with pytest.raises(asyncio.TimeoutError):
+                await wait_for2.wait_for(sleep_forever(), 0)
+            assert await wait_for2.wait_for(asyncio.sleep(0.5, "ok"), None) == "ok"
+            async with wait_for2.timeout(1.0):
+                assert await wait_for2.wait_for(asyncio.sleep(0.5, "ok"), 5.0) == "ok"
+
+            task = asyncio.ensure_future(wait_for2.wait_for(sleep_forever(), 10.0))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            task = asyncio.ensure_future(
+                wait_for2.wait_for(result_at_cancel("r"), 10.0, race_handler=lambda r, e: None)
+            )
+            await asyncio.sleep(0.5)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+            inner = loop.create_future()
+            task = asyncio.ensure_future(wait_for2.wait_for(inner, 10.0, race_handler=lambda r, e: None))
+            await asyncio.sleep(0.5)
+            inner.set_result("r")
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        finally:
+            wait_for2.uninstall_tracing(loop=loop)
+        assert wait_for2.get_tracing() is None
+
+        assert list(_events(buffer).values()) == [
+            ["start", "wait", "completed"],
+            ["start", "done"],
+            ["start", "wait", "timeout_cancel", "timeout"],
+            ["start", "timeout_cancel", "timeout"],
+            ["start_unbounded", "wait_no_timer", "completed"],
+            ["start", "wait_no_timer", "completed"],
+            ["start", "wait", "cancel_and_wait", "cancelled"],
+            ["start", "wait", "cancel_and_wait", "race"],
+            ["start", "wait", "cancelled_inner_done", "race"],
+        ]
+        assert {label for _, _, _, label in buffer.records()} == {"a", None}
+        first = buffer.calls()[1]
+        assert [when for _, when in first] == [0.0, 0.0, 0.5]
+
+    run(main())
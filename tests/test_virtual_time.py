@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.testing import VirtualClockEventLoop, run
+
+
+def test_virtual_clock():
+    async def main():
+        loop = asyncio.get_running_loop()
+        assert isinstance(loop, VirtualClockEventLoop)
+        start = loop.time()
+        await asyncio.sleep(3600)
+        assert loop.time() - start == 3600
+        with pytest.raises(asyncio.TimeoutError):
+            await wait_for2.wait_for(asyncio.sleep(10), 5)
+        assert loop.time() - start == 3605
+        loop.advance(10)
+        assert loop.time() - start == 3615
+        return "done"
+
+    assert run(main()) == "done"
+
+
+def test_inject_at_step():
+    steps = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        with pytest.raises(ValueError):
+            loop.inject(loop.iteration - 1, steps.append, None)
+        loop.inject(loop.iteration + 2, steps.append, "injected")
+        for i in range(4):
+            steps.append(i)
+            await asyncio.sleep(0)
+
+    run(main())
+    assert steps == [0, 1, "injected", 2, 3]
+
+
+async def _produce(behaviour):
+    if behaviour == "immediate":
+        return "r"
+    try:
+        await asyncio.sleep(0.5)
+    except asyncio.CancelledError:
+        if behaviour == "result_at_cancel":
+            await asyncio.sleep(0.1)
+            return "r"
+        if behaviour == "exception_at_cancel":
+            raise ValueError("r")
+        raise
+    if behaviour == "exception":
+        raise ValueError("r")
+    return "r"
+
+
+async def _scenario(behaviour, timeout, cancel_step):
+    """
+    Wait for the inner task and cancel the waiting at the given loop iteration. Returns the number of steps the
+    scenario took.
+    """
+    loop = asyncio.get_running_loop()
+    handled = []
+    started = []
+    inner = loop.create_task(_produce(behaviour))
+
+    async def waiting():
+        started.append(True)
+        try:
+            return await wait_for2.wait_for(inner, timeout, race_handler=lambda r, e: handled.append((r, e)))
+        except wait_for2.CancelledWithResultError as e:
+            return e  # tasks only propagate a plain CancelledError before Python 3.11
+
+    waiter = loop.create_task(waiting())
+    first_step = loop.iteration
+    if cancel_step is not None:
+        loop.inject(first_step + cancel_step, waiter.cancel)
+    try:
+        returned = await waiter
+        raised = None
+    except BaseException as e:  # noqa
+        returned, raised = None, e
+    if isinstance(returned, wait_for2.CancelledWithResultError):
+        returned, raised = None, returned
+    if not started:
+        # cancelled before it could start waiting, there is nothing to check
+        assert isinstance(raised, asyncio.CancelledError)
+        inner.cancel()
+        await asyncio.gather(inner, return_exceptions=True)
+        return loop.iteration - first_step
+    assert inner.done(), "the inner task is not bound to the waiting"
+    produced = not inner.cancelled()
+    if produced:
+        inner.exception()  # it is checked below whether the caller received it
+    if isinstance(raised, wait_for2.CancelledWithResultError):
+        assert produced and len(handled) == 1
+        assert handled[0] == (raised.result, raised.is_exception)
+    else:
+        assert not handled
+        if produced:
+            delivered = returned == "r" or (isinstance(raised, ValueError) and str(raised) == "r")
+            assert delivered, "the outcome of the inner task was lost"
+        else:
+            assert isinstance(raised, (asyncio.CancelledError, asyncio.TimeoutError))
+            if isinstance(raised, asyncio.TimeoutError):
+                assert timeout is not None
+    return loop.iteration - first_step
+
+
+@pytest.mark.parametrize("behaviour", ["immediate", "result", "exception", "result_at_cancel", "exception_at_cancel"])
+@pytest.mark.parametrize("timeout", [None, 0, 0.2, 1.0])
+def test_exhaustive_cancellation_matrix(behaviour, timeout):
+    steps = run(_scenario(behaviour, timeout, None))
+    # a cancellation injected at every step of the undisturbed run, and one after it finished
+    for cancel_step in range(steps + 2):
+        run(_scenario(behaviour, timeout, cancel_step))
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from .common.race import result_at_cancel
+from .common.resource import ResourceWorkerWaitForTester
+
+
+async def _sleep_result(delay, result):
+    await asyncio.sleep(delay)
+    return result
+
+
+async def _sleep_raise(delay, error):
+    await asyncio.sleep(delay)
+    raise error
+
+
+@pytest.mark.asyncio
+async def test_wait_for_many_ordered():
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    done.set_result("done")
+    error = ValueError()
+    results = await wait_for2.wait_for_many(
+        [_sleep_result(0.05, "a"), done, _sleep_result(1.0, "b"), result_at_cancel("c"), _sleep_raise(0, error), done],
+        [None, 0, 0.1, 0.1, 1.0, None],
+        return_exceptions=True,
+    )
+    assert results[0] == "a"
+    assert results[1] == results[5] == "done"
+    assert isinstance(results[2], asyncio.TimeoutError)
+    assert results[3] == "c"  # result after cancel by timeout is prioritized
+    assert results[4] is error
+    assert await wait_for2.wait_for_many([], 1.0) == []
+    with pytest.raises(ValueError):
+        await wait_for2.wait_for_many([done], [1.0, 2.0])
+    tasks = len(asyncio.all_tasks())
+    coros = [_sleep_result(0, "a"), _sleep_result(0, "b")]
+    with pytest.raises(ValueError):
+        await wait_for2.wait_for_many(coros, [1.0])
+    assert len(asyncio.all_tasks()) == tasks  # nothing was started
+    for coro in coros:
+        coro.close()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_many_error_hands_off_results():
+    handled = []
+    error = ValueError()
+    with pytest.raises(ValueError) as e:
+        await wait_for2.wait_for_many(
+            [_sleep_result(0, "a"), _sleep_raise(0.05, error), result_at_cancel("b"), _sleep_result(1.0, "c")],
+            1.0,
+            race_handler=lambda r, ie: handled.append((r, ie)),
+        )
+    assert e.value is error
+    assert sorted(handled) == [("a", False), ("b", False)]
+
+
+@pytest.mark.asyncio
+async def test_wait_for_many_cancel():
+    handled = []
+
+    async def waiter():
+        try:
+            await wait_for2.wait_for_many(
+                [_sleep_result(0, "a"), result_at_cancel("b"), _sleep_result(1.0, "c")],
+                5.0,
+                race_handler=lambda r, ie: handled.append((r, ie)),
+            )
+        except wait_for2.CancelledWithResultError as e:
+            assert sorted(e.result) == [(0, "a", False), (1, "b", False)]
+            raise
+        assert False, "did not raise"  # pragma: no cover
+
+    task = asyncio.ensure_future(waiter())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert sorted(handled) == [("a", False), ("b", False)]
+
+
+@pytest.mark.asyncio
+async def test_wait_for_many_cancel_while_stopping_after_error():
+    handled = []
+    error = ValueError()
+
+    async def waiter():
+        try:
+            await wait_for2.wait_for_many(
+                [_sleep_raise(0.05, error), result_at_cancel("b", 0.1)],
+                1.0,
+                race_handler=lambda r, ie: handled.append((r, ie)),
+            )
+        except wait_for2.CancelledWithResultError as e:
+            raced.extend(e.result)
+            raise
+        assert False, "did not raise"  # pragma: no cover
+
+    raced = []
+    task = asyncio.ensure_future(waiter())
+    await asyncio.sleep(0.1)  # the error was raised, the other item is stopping
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert sorted(raced, key=lambda r: r[0]) == [(0, error, True), (1, "b", False)]
+    assert len(handled) == 2 and (error, True) in handled and ("b", False) in handled
+
+
+@pytest.mark.asyncio
+async def test_iter_wait_for_many():
+    handled = []
+    it = wait_for2.iter_wait_for_many(
+        [_sleep_result(0.1, "a"), _sleep_result(0, "b"), result_at_cancel("c"), _sleep_result(0.05, "d")],
+        [1.0, 1.0, 5.0, 1.0],
+        race_handler=lambda r, ie: handled.append((r, ie)),
+    )
+    received = []
+    async for i, r in it:
+        received.append((i, r))
+        if len(received) == 2:
+            break
+    await it.aclose()
+    assert received == [(1, "b"), (3, "d")]
+    assert sorted(handled) == [("c", False)]  # "a" was cancelled while sleeping
+
+    with pytest.raises(asyncio.TimeoutError):
+        async for _ in wait_for2.iter_wait_for_many([_sleep_result(1.0, "a")], 0.05):
+            pass  # pragma: no cover
+
+
+async def _wait_for_single(fut, timeout, race_handler=None):
+    return (await wait_for2.wait_for_many([fut], timeout, race_handler=race_handler))[0]
+
+
+@pytest.mark.asyncio
+async def test_resource_leakage_wait_for_many():
+    tester = ResourceWorkerWaitForTester(_wait_for_single)
+    await tester.run(race_handler=tester.cleanup_resource)
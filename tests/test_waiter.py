@@ -0,0 +1,37 @@
+import asyncio
+import sys
+import threading
+
+import pytest
+
+from wait_for2.impl import wait_for as impl_wait_for
+
+
+def test_loops_in_threads_time_out():
+    errors = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+        for _ in range(300):
+            with pytest.raises(asyncio.TimeoutError):
+                # the outer timeout only bounds the test if the inner timer failed to fire
+                await asyncio.wait_for(impl_wait_for(loop.create_future(), 0.001), 1.0)
+
+    def run_in_thread():
+        try:
+            asyncio.run(main())
+        except BaseException as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=run_in_thread) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+import wait_for2
+from wait_for2.impl import wait_for
+from wait_for2.testing import run
+
+
+async def _slow_shutdown(shutdown):
+    try:
+        await asyncio.sleep(100)
+    except asyncio.CancelledError:
+        await asyncio.sleep(shutdown)
+        raise
+
+
+async def _ignores_cancel(times):
+    ignored = 0
+    while True:
+        try:
+            await asyncio.sleep(100)
+        except asyncio.CancelledError:
+            ignored += 1
+            if ignored > times:
+                raise
+
+
+def test_watchdog_reports_stall():
+    reports = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        watchdog = wait_for2.install_cancel_watchdog(wait_for2.CancelWatchdog(1.0, callback=reports.append), loop=loop)
+        try:
+            assert wait_for2.get_cancel_watchdog() is watchdog
+            with pytest.raises(asyncio.TimeoutError):
+                await wait_for(_slow_shutdown(0.5), 1.0)
+            assert not reports
+
+            with pytest.raises(asyncio.TimeoutError):
+                await wait_for(_slow_shutdown(3.0), 1.0, label="slow")
+            assert len(reports) == 1
+            report = reports[0]
+            assert report["label"] == "slow" and report["elapsed"] == pytest.approx(1.0)
+            assert "_slow_shutdown" in report["stack"]
+
+            task = asyncio.ensure_future(wait_for(_slow_shutdown(2.0), 10.0))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            await asyncio.sleep(1.5)
+            assert len(watchdog.stalled()) == 1
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert watchdog.stalled() == []
+        finally:
+            wait_for2.uninstall_cancel_watchdog(loop=loop)
+        assert wait_for2.get_cancel_watchdog() is None
+
+        stats = watchdog.stats()
+        assert stats["stalls"] == 2 and stats["stalled"] == 0 and stats["recancels"] == 0
+        assert watchdog.durations.count == 2
+        assert watchdog.durations.sum == pytest.approx(5.0)
+
+    run(main())
+
+
+def test_watchdog_recancels_and_logs():
+    contexts = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda loop, context: contexts.append(context))
+        watchdog = wait_for2.install_cancel_watchdog(wait_for2.CancelWatchdog(1.0, recancel_interval=0.5), loop=loop)
+        try:
+            start = loop.time()
+            with pytest.raises(asyncio.TimeoutError):
+                await wait_for(_ignores_cancel(3), 1.0)
+            assert loop.time() - start == pytest.approx(3.5)  # stalled at 2.0, cancelled again at 2.5, 3.0 and 3.5
+        finally:
+            wait_for2.uninstall_cancel_watchdog(loop=loop)
+        assert watchdog.stats()["recancels"] == 3
+        assert len(contexts) == 1 and "did not terminate" in contexts[0]["message"]
+
+        # a failing callback is reported to the exception handler
+        def failing(report):
+            raise ValueError()
+
+        wait_for2.install_cancel_watchdog(wait_for2.CancelWatchdog(0.5, callback=failing), loop=loop)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await wait_for(_slow_shutdown(1.0), 1.0)
+        finally:
+            wait_for2.uninstall_cancel_watchdog(loop=loop)
+        assert isinstance(contexts[-1]["exception"], ValueError)
+
+    run(main())
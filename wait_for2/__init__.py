@@ -13,16 +13,66 @@ __version__ = "0.4.1"
 
 import sys
 
+from .adaptive import AdaptiveTimeout, LatencySketch, adaptive_timeout, remove_adaptive_timeout
+from .batching import collect_batch
+from .breakers import CircuitBreaker, CircuitOpenError
+from .crossloop import wait_for_threadsafe
+from .deadlines import DeadlineExceeded, deadline, time_remaining
+from .executors import late_results, wait_for_executor
+from .groups import TaskGroup
+from .handlers import RaceHandlerRunner, drain_race_handlers, get_race_handler_runner
+from .hedging import hedged
+from .impl import fast_path_stats, reset_fast_path_stats
+from .iterators import aiter_timeout
+from .locks import BoundedSemaphore, Lock, Semaphore
+from .many import iter_wait_for_many, wait_for_many
+from .metrics import Histogram, MetricsCollector, get_metrics, install_metrics, uninstall_metrics
+from .pool import Pool, PoolClosedError
+from .queues import Queue
+from .registry import (
+    ActiveWait,
+    DrainingError,
+    WaitRegistry,
+    get_wait_registry,
+    install_wait_registry,
+    uninstall_wait_registry,
+)
+from .retries import Backoff, retry
+from .timeouts import Timeout, timeout
+from .tracing import TraceBuffer, get_tracing, install_tracing, load_trace, uninstall_tracing
+from .watchdog import CancelWatchdog, get_cancel_watchdog, install_cancel_watchdog, uninstall_cancel_watchdog
+from .wheel import TimerWheel, get_timer_wheel, install_timer_wheel, uninstall_timer_wheel
+
 if sys.version_info >= (3, 12):
-    from asyncio import wait_for as _builtin_wait_for
-    from .impl import CancelledWithResultError, wait_for as _wf2
+    from asyncio import get_running_loop, isfuture, wait_for as _builtin_wait_for
+    from .adaptive import AdaptiveTimeout as _AdaptiveTimeout
+    from .crossloop import _is_foreign
+    from .deadlines import _active_deadline
+    from .groups import _in_group
+    from .impl import CancelledWithResultError, _fast_path_hits, _needs_impl, wait_for as _wf2
 
-    async def wait_for(fut, timeout, *, loop=None, race_handler=None):
+    async def wait_for(fut, timeout, *, loop=None, race_handler=None, scheduler=None, eager_start=False, label=None):
         if loop:
             raise RuntimeError("loop parameter has been dropped since Python 3.10")
-        if race_handler is None:
+        running_loop = get_running_loop()
+        if (
+            race_handler is None
+            and scheduler is None
+            and not eager_start
+            and not isinstance(timeout, _AdaptiveTimeout)
+            and not _needs_impl(running_loop)
+            and not _is_foreign(fut, running_loop)
+            and _active_deadline() is None
+            and not _in_group.get()
+        ):
+            if isfuture(fut) and fut.done():
+                _fast_path_hits["done"] += 1
+                return fut.result()
+            _fast_path_hits["builtin"] += 1
             return await _builtin_wait_for(fut, timeout)
-        return await _wf2(fut, timeout, race_handler=race_handler)
+        return await _wf2(
+            fut, timeout, race_handler=race_handler, scheduler=scheduler, eager_start=eager_start, label=label
+        )
 
 else:
     from .impl import CancelledWithResultError, wait_for
@@ -0,0 +1,147 @@
+"""
+Adaptive timeouts derived from the observed completion latency of each call site.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from math import ceil, log
+
+_registry = {}
+
+
+class LatencySketch(object):
+    """
+    Streaming quantile sketch with logarithmic buckets: each bucket covers values within `accuracy` relative error,
+    so its size is fixed by `accuracy` and the [`min_value`, `max_value`] range (values outside are clamped).
+    Recording a value is O(1).
+
+    Every `half_life` recorded values all counts are halved, so old observations fade out and the quantiles follow
+    changes of the latency.
+    """
+
+    __slots__ = ("_min_value", "_log_gamma", "_gamma", "counts", "count", "_half_life", "_until_decay")
+
+    def __init__(self, accuracy=0.02, min_value=1e-6, max_value=1e4, half_life=1000):
+        if not 0 < accuracy < 1:
+            raise ValueError("accuracy must be between 0 and 1")
+        self._min_value = min_value
+        self._gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = log(self._gamma)
+        self.counts = [0] * (int(ceil(log(max_value / min_value) / self._log_gamma)) + 1)
+        self.count = 0
+        self._half_life = half_life
+        self._until_decay = half_life
+
+    def record(self, value):
+        if value <= self._min_value:
+            i = 0
+        else:
+            i = min(int(ceil(log(value / self._min_value) / self._log_gamma)), len(self.counts) - 1)
+        self.counts[i] += 1
+        self.count += 1
+        self._until_decay -= 1
+        if not self._until_decay:
+            self._until_decay = self._half_life
+            self.counts = [c >> 1 for c in self.counts]
+            self.count = sum(self.counts)
+
+    def quantile(self, q):
+        """
+        Return the approximate `q` quantile of the recorded values (None if there are none).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                break
+        return self._min_value * self._gamma**i
+
+
+class AdaptiveTimeout(object):
+    """
+    Timeout for wait_for() computed from the completion latency observed at a call site: the `quantile` of the
+    recent latencies plus `margin` seconds, clamped to [`floor`, `ceiling`]. Until `min_samples` latencies are
+    observed `initial` (`ceiling` by default) is used.
+
+    Pass it to wait_for() in place of the timeout. The time it took to return a result is recorded. Calls that timed
+    out are recorded as if they had taken `growth` times the timeout they were given, so once more than 1 - `quantile`
+    of the calls time out the timeout grows by that factor (up to `ceiling`) at the next refresh. Failed and cancelled
+    calls are not recorded. The computed timeout is refreshed every `refresh` observations.
+    """
+
+    def __init__(
+        self,
+        ceiling,
+        *,
+        quantile=0.99,
+        margin=0.0,
+        growth=1.5,
+        floor=0.0,
+        initial=None,
+        min_samples=20,
+        refresh=16,
+        sketch=None,
+        key=None
+    ):
+        if not 0 < quantile <= 1:
+            raise ValueError("quantile must be between 0 and 1")
+        if floor > ceiling:
+            raise ValueError("floor must not be greater than ceiling")
+        if growth < 1:
+            raise ValueError("growth must be at least 1")
+        self.key = key
+        self.ceiling = ceiling
+        self.floor = floor
+        self.quantile = quantile
+        self.margin = margin
+        self.growth = growth
+        self.min_samples = min_samples
+        self.sketch = LatencySketch() if sketch is None else sketch
+        self._refresh = refresh
+        self._until_refresh = refresh
+        self._value = ceiling if initial is None else initial
+
+    def value(self):
+        """Return the timeout to use now."""
+        return self._value
+
+    def observe(self, latency):
+        sketch = self.sketch
+        sketch.record(latency)
+        self._until_refresh -= 1
+        if self._until_refresh <= 0 and sketch.count >= self.min_samples:
+            self._until_refresh = self._refresh
+            self._value = min(max(sketch.quantile(self.quantile) + self.margin, self.floor), self.ceiling)
+
+    def timed_out(self, timeout):
+        """Record a call that timed out after `timeout` seconds."""
+        self.observe(timeout * self.growth)
+
+    def __repr__(self):
+        return "<AdaptiveTimeout key=%r value=%.6f>" % (self.key, self._value)
+
+
+def adaptive_timeout(key, ceiling=None, **kwargs):
+    """
+    Return the AdaptiveTimeout registered for `key`, creating it with the given configuration on first use
+    (`ceiling` is required then, see AdaptiveTimeout for the other arguments). Later calls return the same instance
+    and ignore the configuration, so it may be called at the call site:
+
+        await wait_for2.wait_for(query(), wait_for2.adaptive_timeout("db.query", 5.0, margin=0.05))
+
+    The instances are kept in a module level registry until remove_adaptive_timeout() is called for the key, which is
+    not bounded: use a fixed set of keys (such as one per call site), not values that vary per request.
+    """
+    adaptive = _registry.get(key)
+    if adaptive is None:
+        if ceiling is None:
+            raise ValueError("ceiling is required to create an adaptive timeout")
+        adaptive = _registry[key] = AdaptiveTimeout(ceiling, key=key, **kwargs)
+    return adaptive
+
+
+def remove_adaptive_timeout(key):
+    _registry.pop(key, None)
@@ -0,0 +1,131 @@
+"""
+Collecting micro-batches from a queue or an async iterator with one deadline timer per batch.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import CancelledError, Queue, TimeoutError
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .deadlines import _active_deadline
+from .impl import _call_race_handler, _handle_cancelling_with_inner_completion
+from .iterators import _ItemTimer, _Pump
+from .queues import _Expiry, _wait_for_item
+from .wheel import _get_scheduler
+
+
+async def collect_batch(source, max_items, max_wait, *, race_handler=None):
+    """
+    Collect items from `source` until there are `max_items` of them or `max_wait` seconds passed (None waits until
+    the batch is full), and return them as a list, which is empty if none arrived in time:
+
+        while True:
+            rows = await wait_for2.collect_batch(queue, 500, 0.05, race_handler=requeue_rows)
+            if rows:
+                await insert_rows(rows)
+
+    The `source` may be an asyncio.Queue (including wait_for2.Queue) or an async iterable. The batch is returned at
+    the deadline of an enclosing deadline() scope at the latest.
+
+    If the collecting is cancelled, the items collected so far are passed to the `race_handler` as a list and
+    CancelledWithResultError is raised with them, so no item is lost. Items are only taken off a queue when they are
+    added to the batch, the ones left in it stay there for the next batch.
+
+    An async iterator is advanced by a single task per batch. When the deadline passes while it is producing an
+    item, it is cancelled like wait_for() would cancel it, and an item it still produces is added to the batch. To
+    be used for more than one batch, the iterator must tolerate the cancellation of __anext__(), like one reading a
+    queue does (an async generator usually does not). Once it is exhausted, StopAsyncIteration is raised instead of
+    returning an empty batch. If it raises an exception, the items collected before are passed to the `race_handler`.
+    """
+    if max_items < 1:
+        raise ValueError("max_items must be at least 1")
+    loop = get_running_loop()
+    deadline = None if max_wait is None else loop.time() + max_wait
+    budget = _active_deadline()
+    if budget is not None and (deadline is None or budget.when < deadline):
+        deadline = budget.when
+    if isinstance(source, Queue):
+        return await _collect_from_queue(source, max_items, deadline, loop, race_handler)
+    return await _collect_from_iterator(source.__aiter__(), max_items, deadline, loop, race_handler)
+
+
+async def _collect_from_queue(queue, max_items, deadline, loop, race_handler):
+    items = []
+    expiry = None
+    if deadline is not None:
+        expiry = _Expiry(_get_scheduler(loop), deadline)
+    try:
+        while len(items) < max_items:
+            if queue.empty():
+                try:
+                    await _wait_for_item(queue, loop, expiry)
+                except TimeoutError:
+                    break
+                except CancelledError:
+                    if items:
+                        _handle_cancelling_with_inner_completion(loop, None, items, False, race_handler)
+                    raise
+                if queue.empty() and items:
+                    break  # shut down, get_nowait() raises QueueShutDown for the next batch
+            items.append(queue.get_nowait())
+    finally:
+        if expiry is not None:
+            expiry.cancel()
+    return items
+
+
+async def _collect_from_iterator(iterator, max_items, deadline, loop, race_handler):
+    items = []
+    timer = _ItemTimer(_get_scheduler(loop))
+    pump = _Pump(loop, iterator)
+    expired = False
+    try:
+        while not expired and len(items) < max_items:
+            waiter = pump.next()
+            timer.arm(deadline, waiter)
+            try:
+                await waiter
+            except CancelledError:
+                await pump.stop()
+                _add_outcome(items, pump)
+                if items:
+                    _handle_cancelling_with_inner_completion(loop, pump._task, items, False, race_handler)
+                raise
+            if pump.outcome is None:
+                failed = pump.failure()
+                if failed is not None:
+                    if items:
+                        _call_race_handler(loop, failed, items, False, race_handler)
+                    failed.result()  # raises why the iterator stopped
+                if await pump.stop():
+                    _add_outcome(items, pump)
+                    if items:
+                        _handle_cancelling_with_inner_completion(loop, pump._task, items, False, race_handler)
+                    raise CancelledError()
+                if pump.outcome is None:
+                    break
+                expired = True  # produced while being cancelled, the deadline passed
+            result, is_exception = pump.outcome
+            if is_exception:
+                if isinstance(result, StopAsyncIteration):
+                    if items:
+                        break
+                    raise StopAsyncIteration()
+                if items:
+                    _call_race_handler(loop, pump._task, items, False, race_handler)
+                raise result
+            items.append(result)
+    finally:
+        timer.cancel()
+        await pump.stop()
+    return items
+
+
+def _add_outcome(items, pump):
+    # An item produced while the pump was being cancelled is part of the batch.
+    if pump.outcome is not None and not pump.outcome[1]:
+        items.append(pump.outcome[0])
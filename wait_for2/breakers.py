@@ -0,0 +1,213 @@
+"""
+Circuit breaker around wait_for(), failing fast while a backend keeps timing out or failing.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import CancelledError, TimeoutError, iscoroutine, isfuture
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .impl import CancelledWithResultError, wait_for
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Counters of a window bucket.
+_CALLS, _TIMEOUTS, _EXCEPTIONS, _RACES = range(4)
+
+
+class CircuitOpenError(RuntimeError):
+    """
+    Raised by CircuitBreaker.wait_for() instead of waiting while the circuit of the key is open.
+    """
+
+    def __init__(self, key):
+        super(CircuitOpenError, self).__init__(key)
+
+    @property
+    def key(self):
+        return self.args[0]
+
+
+class _Circuit(object):
+    """
+    State of one key, with the outcome counters of a rolling window split into time buckets.
+    """
+
+    __slots__ = ("state", "opened_at", "trips", "probes", "_epochs", "_counts")
+
+    def __init__(self, buckets):
+        self.state = CLOSED
+        self.opened_at = None
+        self.trips = 0  # the number of times it opened, the probes belong to the half-open state of the last one
+        self.probes = 0
+        self._epochs = [-1] * buckets
+        self._counts = [[0, 0, 0, 0] for _ in range(buckets)]
+
+    def add(self, epoch, counter):
+        i = epoch % len(self._epochs)
+        counts = self._counts[i]
+        if self._epochs[i] != epoch:
+            self._epochs[i] = epoch
+            counts[:] = (0, 0, 0, 0)
+        counts[_CALLS] += 1
+        if counter is not None:
+            counts[counter] += 1
+
+    def totals(self, epoch):
+        totals = [0, 0, 0, 0]
+        oldest = epoch - len(self._epochs)
+        for e, counts in zip(self._epochs, self._counts):
+            if e > oldest:
+                for i, n in enumerate(counts):
+                    totals[i] += n
+        return totals
+
+    def reset(self):
+        for i, counts in enumerate(self._counts):
+            self._epochs[i] = -1
+            counts[:] = (0, 0, 0, 0)
+
+
+class CircuitBreaker(object):
+    """
+    Wraps wait_for() and tracks the outcomes of the calls per key (e.g. per backend) over a rolling `window` of
+    seconds. Timeouts, exceptions matching `failure_on`, and results that raced a cancellation count as failures.
+    When at least `min_calls` calls finished in the window and `failure_ratio` of them failed, the circuit opens.
+
+    While it is open, calls fail fast with CircuitOpenError, without scheduling a timer or creating a task. After
+    `open_for` seconds it becomes half-open: at most `probes` calls are let through at a time, the others still fail
+    fast. The first probe that succeeds closes the circuit (with a fresh window), a failed one opens it again.
+
+    Calls that are cancelled without a result are not counted. The state only changes when calls are made or
+    finish, the breaker has no timers of its own.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_ratio=0.5,
+        min_calls=20,
+        window=10.0,
+        buckets=10,
+        open_for=5.0,
+        probes=1,
+        failure_on=Exception,
+    ):
+        if not 0.0 < failure_ratio <= 1.0:
+            raise ValueError("failure_ratio must be in (0, 1]")
+        if buckets < 1 or probes < 1:
+            raise ValueError("buckets and probes must be at least 1")
+        self._failure_ratio = failure_ratio
+        self._min_calls = min_calls
+        self._buckets = buckets
+        self._bucket_width = window / buckets
+        self._open_for = open_for
+        self._probes = probes
+        self._failure_on = failure_on
+        self._circuits = {}
+
+    def state(self, key):
+        """Return CLOSED, OPEN or HALF_OPEN (the strings "closed", "open" and "half_open") for the key."""
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            return CLOSED
+        if circuit.state == OPEN and get_running_loop().time() >= circuit.opened_at + self._open_for:
+            return HALF_OPEN  # it turns half-open at the next call
+        return circuit.state
+
+    def stats(self, key):
+        """Return the counters of the key's current window as a dict."""
+        circuit = self._circuits.get(key)
+        totals = [0, 0, 0, 0] if circuit is None else circuit.totals(self._epoch(get_running_loop().time()))
+        return {
+            "calls": totals[_CALLS],
+            "timeouts": totals[_TIMEOUTS],
+            "exceptions": totals[_EXCEPTIONS],
+            "races": totals[_RACES],
+        }
+
+    async def wait_for(self, key, fut, timeout, *, race_handler=None, label=None):
+        """
+        Call wait_for(fut, timeout) if the circuit of `key` lets the call through, otherwise raise CircuitOpenError.
+        A rejected coroutine is closed and a rejected future is cancelled, as they will not be awaited.
+        """
+        loop = get_running_loop()
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit(self._buckets)
+        probe = self._admit(circuit, loop.time())
+        if probe is None:
+            if iscoroutine(fut):
+                fut.close()
+            elif isfuture(fut):
+                fut.cancel()
+            raise CircuitOpenError(key)
+        try:
+            result = await wait_for(fut, timeout, race_handler=race_handler, label=label)
+        except CancelledWithResultError:
+            self._record(circuit, loop.time(), probe, _RACES)
+            raise
+        except CancelledError:
+            if probe and probe == circuit.trips and circuit.state == HALF_OPEN:
+                circuit.probes -= 1
+            raise
+        except TimeoutError:
+            self._record(circuit, loop.time(), probe, _TIMEOUTS)
+            raise
+        except Exception as exc:
+            self._record(circuit, loop.time(), probe, _EXCEPTIONS if isinstance(exc, self._failure_on) else None)
+            raise
+        self._record(circuit, loop.time(), probe, None)
+        return result
+
+    def _epoch(self, now):
+        return int(now // self._bucket_width)
+
+    def _admit(self, circuit, now):
+        """Return 0 for a normal call, the trip it probes for a probe, or None if the call is rejected."""
+        state = circuit.state
+        if state == CLOSED:
+            return 0
+        if state == OPEN:
+            if now < circuit.opened_at + self._open_for:
+                return None
+            circuit.state = HALF_OPEN
+            circuit.probes = 0
+        if circuit.probes >= self._probes:
+            return None
+        circuit.probes += 1
+        return circuit.trips
+
+    def _record(self, circuit, now, probe, counter):
+        if probe:
+            if probe != circuit.trips or circuit.state != HALF_OPEN:
+                return  # another probe decided already
+            circuit.probes -= 1
+            if counter is None:
+                circuit.state = CLOSED
+                circuit.reset()
+                circuit.add(self._epoch(now), None)
+            else:
+                self._open(circuit, now)
+            return
+        epoch = self._epoch(now)
+        circuit.add(epoch, counter)
+        if counter is None or circuit.state != CLOSED:
+            return
+        totals = circuit.totals(epoch)
+        calls = totals[_CALLS]
+        failures = totals[_TIMEOUTS] + totals[_EXCEPTIONS] + totals[_RACES]
+        if calls >= self._min_calls and failures >= self._failure_ratio * calls:
+            self._open(circuit, now)
+
+    @staticmethod
+    def _open(circuit, now):
+        circuit.state = OPEN
+        circuit.trips += 1
+        circuit.opened_at = now
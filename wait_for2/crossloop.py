@@ -0,0 +1,162 @@
+"""
+Waiting for futures owned by other event loops or threads, keeping the race and bound inner future guarantees.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import Future
+from collections import deque
+from concurrent.futures import Future as ConcurrentFuture
+from weakref import WeakKeyDictionary
+
+_inboxes = WeakKeyDictionary()
+
+
+class _Inbox(object):
+    """
+    Collects the completions posted from other threads for a loop and delivers them in a single callback, so a
+    burst of completions costs one call_soon_threadsafe() (and one wakeup of the loop) instead of one each.
+    """
+
+    __slots__ = ("_loop", "_items", "_scheduled", "__weakref__")
+
+    def __init__(self, loop):
+        self._loop = loop
+        self._items = deque()
+        self._scheduled = False
+
+    def post(self, proxy):  # called from any thread
+        self._items.append(proxy)
+        if not self._scheduled:
+            self._scheduled = True
+            try:
+                self._loop.call_soon_threadsafe(self._drain)
+            except RuntimeError:  # the loop is closed, nobody is waiting anymore
+                pass
+
+    def _drain(self):
+        self._scheduled = False  # reset first, a post() racing with the draining schedules a new one
+        items = self._items
+        while items:
+            items.popleft()._mirror()
+
+
+def _get_inbox(loop):
+    inbox = _inboxes.get(loop)
+    if inbox is None:
+        inbox = _inboxes[loop] = _Inbox(loop)
+    return inbox
+
+
+class _ForeignProxy(Future):
+    """
+    Future on the waiting loop that mirrors the final state of a future owned by another loop or thread.
+
+    Cancelling the proxy does not cancel it right away. The cancellation is forwarded to the foreign future and the
+    proxy terminates the same way the foreign future does, so waiting for the proxy waits until the foreign future
+    has actually stopped, and a result it still produced is not lost.
+    """
+
+    def __init__(self, loop, foreign=None, foreign_loop=None):
+        super(_ForeignProxy, self).__init__(loop=loop)
+        self._foreign = foreign
+        self._foreign_loop = foreign_loop
+        self._cancel_requested = False
+        self._inbox = _get_inbox(loop)
+        if foreign is not None:
+            self._subscribe()
+
+    def _attach(self, foreign):
+        # Called from the thread of the foreign loop, when the foreign future is created after the proxy.
+        self._foreign = foreign
+        foreign.add_done_callback(self._on_foreign_done)
+        if self._cancel_requested:
+            foreign.cancel()
+
+    def _subscribe(self):
+        foreign = self._foreign
+        if self._foreign_loop is None:
+            if foreign.done():
+                self._mirror()  # a completed concurrent future, there is nothing to wait for
+            else:
+                foreign.add_done_callback(self._on_foreign_done)
+            return
+        try:
+            # Callbacks of asyncio futures must be added from the thread of their loop.
+            self._foreign_loop.call_soon_threadsafe(foreign.add_done_callback, self._on_foreign_done)
+        except RuntimeError:  # the foreign loop is closed, its future will never complete
+            pass
+
+    def _on_foreign_done(self, foreign):
+        self._inbox.post(self)
+
+    def _mirror(self):
+        if self.done():
+            return
+        foreign = self._foreign
+        if foreign.cancelled():
+            super(_ForeignProxy, self).cancel()
+            return
+        exc = foreign.exception()
+        if exc is not None:
+            self.set_exception(exc)
+        else:
+            self.set_result(foreign.result())
+
+    def cancel(self, *args):
+        if self.done():
+            return False
+        self._cancel_requested = True
+        foreign = self._foreign
+        if foreign is not None:
+            if self._foreign_loop is None:
+                foreign.cancel()
+            else:
+                try:
+                    self._foreign_loop.call_soon_threadsafe(foreign.cancel)
+                except RuntimeError:  # the foreign loop is closed, its future will never complete
+                    super(_ForeignProxy, self).cancel()
+        return True
+
+
+def _is_foreign(fut, loop):
+    if isinstance(fut, Future):
+        return fut.get_loop() is not loop
+    return isinstance(fut, ConcurrentFuture)
+
+
+def _foreign_proxy(fut, loop):
+    """
+    Return a proxy on `loop` for a concurrent future or an asyncio future of another loop. Completed asyncio futures
+    are returned as they are, their result can be read from any thread.
+    """
+    if isinstance(fut, ConcurrentFuture):
+        return _ForeignProxy(loop, fut)
+    if fut.done():
+        return fut
+    return _ForeignProxy(loop, fut, fut.get_loop())
+
+
+def _start_threadsafe(proxy, coro, foreign_loop):
+    proxy._attach(foreign_loop.create_task(coro))
+
+
+async def wait_for_threadsafe(coro, loop, timeout, *, race_handler=None, label=None):
+    """
+    Run the coroutine as a task on another `loop` (running in another thread) and wait for it like wait_for() does,
+    with the same handling of the race conditions. Unlike with asyncio.run_coroutine_threadsafe(), a result the task
+    produces while it is being cancelled is not dropped, it is passed to the `race_handler` on the waiting loop.
+
+    Raises RuntimeError if the other loop is not running, the task would never be started.
+    """
+    from .impl import get_running_loop, wait_for
+
+    running_loop = get_running_loop()
+    if loop is running_loop:
+        return await wait_for(coro, timeout, race_handler=race_handler, label=label)
+    if not loop.is_running():
+        coro.close()
+        raise RuntimeError("the loop of wait_for_threadsafe() is not running")
+    proxy = _ForeignProxy(running_loop, foreign_loop=loop)
+    loop.call_soon_threadsafe(_start_threadsafe, proxy, coro, loop)
+    return await wait_for(proxy, timeout, race_handler=race_handler, label=label)
@@ -0,0 +1,108 @@
+"""
+Absolute deadlines propagated to nested wait_for calls with a context variable.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import TimeoutError
+from contextvars import ContextVar
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+_deadline = ContextVar("wait_for2_deadline", default=None)
+
+
+class Deadline(object):
+    """
+    Absolute deadline in loop time. If `task` is set, something will cancel that task when the deadline expires
+    (an enclosing wait_for or timeout scope), so calls made in it do not need their own timer for it. Once that
+    owner cancelled the task, `fired` is set, and the calls made afterwards (e.g. cleanup in a cancellation handler)
+    are only limited by the `parent` deadline it was derived from, with timers of their own.
+    """
+
+    __slots__ = ("when", "task", "parent", "fired")
+
+    def __init__(self, when, task=None, parent=None):
+        self.when = when
+        self.task = task
+        self.parent = parent
+        self.fired = False
+
+
+def _active_deadline():
+    """Return the deadline in effect, skipping the ones whose owner has already cancelled the task for them."""
+    current = _deadline.get()
+    while current is not None and current.fired:
+        current = current.parent
+    return current
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised by wait_for() instead of TimeoutError when the deadline of an enclosing deadline() scope expired before
+    the call's own timeout.
+    """
+
+    def __init__(self, when):
+        super(DeadlineExceeded, self).__init__(when)
+
+    @property
+    def when(self):
+        return self.args[0]
+
+
+class _DeadlineScope(object):
+    def __init__(self, timeout):
+        self._timeout = timeout
+        self._token = None
+
+    def __enter__(self):
+        when = get_running_loop().time() + self._timeout
+        current = _active_deadline()
+        if current is not None and current.when <= when:
+            when = current.when
+        self._token = _deadline.set(Deadline(when))
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _deadline.reset(self._token)
+        self._token = None
+
+    # The scope only sets a context variable, it can be used with either kind of with statement.
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return self.__exit__(exc_type, exc_val, exc_tb)
+
+
+def deadline(timeout):
+    """
+    Context manager that sets a deadline `timeout` seconds from now (or keeps the enclosing one if it is earlier)
+    for the wait_for() calls made inside it, including those in the tasks they create:
+
+        with wait_for2.deadline(2.0):
+            await wait_for2.wait_for(backend_call(), 5.0)  # waits at most ~2 seconds
+
+    A call's effective timeout is the smaller of its own timeout and the remaining time. If the remaining time was
+    smaller and it expired, DeadlineExceeded (a TimeoutError) is raised. A call does not schedule a timer at all if
+    an enclosing wait_for or timeout() scope of the same task will expire before its own timeout would.
+
+    The deadline itself is not enforced, code that does not wait with wait_for() is not interrupted by it.
+    """
+    return _DeadlineScope(timeout)
+
+
+def time_remaining(loop=None):
+    """
+    Return the seconds left until the current deadline (negative if it has expired), or None if there is none.
+    """
+    current = _active_deadline()
+    if current is None:
+        return None
+    if loop is None:
+        loop = get_running_loop()
+    return current.when - loop.time()
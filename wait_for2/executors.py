@@ -0,0 +1,143 @@
+"""
+Waiting for functions run in a concurrent.futures executor, without dropping the results of the calls that finish
+after their waiting timed out or was cancelled.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+
+from asyncio import CancelledError, TimeoutError
+from collections import deque
+from weakref import WeakKeyDictionary
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .impl import CancelledWithResultError, _call_race_handler, _release_waiter
+from .wheel import _get_scheduler
+
+_late = WeakKeyDictionary()
+
+
+class _LateResults(object):
+    __slots__ = ("items", "limit")
+
+    def __init__(self, limit):
+        self.items = deque()
+        self.limit = limit
+
+    def add(self, loop, result, is_exception):
+        items = self.items
+        items.append((result, is_exception))
+        while len(items) > self.limit:
+            dropped, _ = items.popleft()
+            if loop is not None and not loop.is_closed():
+                loop.call_exception_handler({"message": "wait_for2 late executor result dropped", "result": dropped})
+
+
+def _outcome(cfut):
+    exc = cfut.exception()
+    if exc is None:
+        return cfut.result(), False
+    return exc, True
+
+
+class _ExecutorCall(object):
+    """
+    Forwards the completion of a concurrent future to the loop: it wakes the waiter while it is waited for, and
+    hands over the result as a late one after it was abandoned.
+    """
+
+    __slots__ = ("_loop", "_cfut", "waiter", "_race_handler", "_late", "_abandoned")
+
+    def __init__(self, loop, cfut, race_handler, late):
+        self._loop = loop
+        self._cfut = cfut
+        self.waiter = loop.create_future()
+        self._race_handler = race_handler
+        self._late = late
+        self._abandoned = False
+        cfut.add_done_callback(self._on_done)
+
+    def _on_done(self, cfut):  # called from the worker thread
+        try:
+            self._loop.call_soon_threadsafe(self._deliver)
+        except RuntimeError:  # the loop is closed, the result is retained at least
+            if self._abandoned and not cfut.cancelled():
+                self._late.add(None, *_outcome(cfut))
+
+    def _deliver(self):
+        if not self._abandoned:
+            _release_waiter(self.waiter)
+        elif not self._cfut.cancelled():
+            result, is_exception = _outcome(self._cfut)
+            if self._race_handler is not None:
+                _call_race_handler(self._loop, self._cfut, result, is_exception, self._race_handler)
+            else:
+                self._late.add(self._loop, result, is_exception)
+
+    def abandon(self):
+        """Try to cancel the call, if it is already running its result will be delivered as a late one."""
+        self._abandoned = True
+        self._cfut.cancel()
+
+
+async def wait_for_executor(executor, fn, *args, timeout=None, race_handler=None, max_late=None):
+    """
+    Run `fn(*args)` in the `executor` and wait at most `timeout` seconds for its result, like wait_for() does with
+    loop.run_in_executor(), but without wrapping it in asyncio futures and tasks.
+
+    A function that is already running in a thread can not be stopped. If the timeout expires or the waiting is
+    cancelled, the call is abandoned: TimeoutError or CancelledError is raised right away and whatever the function
+    returns (or raises) later is passed to the `race_handler` on the loop. Without a `race_handler` the late results
+    are retained for the executor, at most `max_late` of them (the oldest are dropped and reported to the loop's
+    exception handler), and can be collected with late_results(). The limit is kept for the executor until another
+    call passes `max_late`, it is 100 if none did.
+
+    If the function completes at the same time the timeout expires, its result is returned. If it completes at the
+    same time the waiting is cancelled, the result is passed to the `race_handler` and CancelledWithResultError is
+    raised, the same as with wait_for().
+    """
+    loop = get_running_loop()
+    late = _late.get(executor)
+    if late is None:
+        late = _late[executor] = _LateResults(100 if max_late is None else max_late)
+    elif max_late is not None:
+        late.limit = max_late
+    cfut = executor.submit(fn, *args)
+    call = _ExecutorCall(loop, cfut, race_handler, late)
+    handle = None
+    if timeout is not None:
+        scheduler = _get_scheduler(loop)
+        handle = scheduler.call_later(max(timeout, 0), _release_waiter, call.waiter)
+    try:
+        await call.waiter
+    except CancelledError:
+        if cfut.done() and not cfut.cancelled():
+            result, is_exception = _outcome(cfut)
+            _call_race_handler(loop, cfut, result, is_exception, race_handler)
+            raise CancelledWithResultError(result, is_exception)
+        call.abandon()
+        raise
+    finally:
+        if handle is not None:
+            handle.cancel()
+    if not cfut.done():
+        call.abandon()
+        raise TimeoutError()
+    return cfut.result()
+
+
+def late_results(executor):
+    """
+    Return and forget the (result, is_exception) pairs of the abandoned calls of wait_for_executor() that finished
+    late on `executor`, oldest first. Only the calls without a race_handler are retained.
+    """
+    late = _late.get(executor)
+    if late is None:
+        return []
+    items = list(late.items)
+    late.items.clear()
+    return items
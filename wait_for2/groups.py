@@ -0,0 +1,201 @@
+"""
+Task group with a group-wide deadline, cancelling its children in batches and collecting their racing results.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import CancelledError, TimeoutError, current_task
+from collections import deque
+from contextvars import ContextVar
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .deadlines import Deadline, DeadlineExceeded, _active_deadline, _deadline
+from .impl import CancelledWithResultError, _wait_stopped
+from .wheel import _get_scheduler
+
+# Set in the context of the children, so wait_for2.wait_for() takes the library's path in them on Python 3.12+ too
+# and their racing results end up in the group's `raced` list.
+_in_group = ContextVar("wait_for2_in_group", default=False)
+
+
+class TaskGroup(object):
+    """
+    Asynchronous context manager that runs the tasks created with create_task() and waits at exit until every one
+    of them terminated, even if the waiting is cancelled meanwhile:
+
+        async with wait_for2.TaskGroup(timeout=5.0) as group:
+            for request in requests:
+                group.create_task(handle(request))
+        release_all(group.raced)
+
+    If `timeout` is given, a single timer cancels the children that are still running when it expires, and
+    TimeoutError is raised at exit. The children see it as the deadline of a deadline() scope, which the group
+    enforces, so their wait_for() calls with a later timeout do not schedule timers of their own.
+
+    Children are cancelled in batches of `cancel_batch` per loop iteration, so cancelling thousands of them does
+    not stall the loop. This happens at the timeout, if the body or a child raises an exception, if the waiting at
+    exit is cancelled, or when cancel() is called. Like in asyncio.TaskGroup, a child raising an exception also
+    cancels the body if it is still running. Unlike it, the first exception of the children is raised at exit
+    instead of an ExceptionGroup, the others are in `errors`.
+
+    The result (or exception) of every child that ended with CancelledWithResultError is collected in `raced` as
+    (result, is_exception) pairs, so all the results that raced a cancellation can be handled at once. The
+    wait_for2.wait_for() calls of the children always use the library's implementation for this, even on Python
+    3.12+ without a race_handler.
+    """
+
+    def __init__(self, timeout=None, *, cancel_batch=1000):
+        if cancel_batch < 1:
+            raise ValueError("cancel_batch must be at least 1")
+        self._timeout = timeout
+        self._cancel_batch = cancel_batch
+        self._loop = None
+        self._parent = None
+        self._parent_cancelling = 0
+        self._parent_cancel_requested = False
+        self._exiting = False
+        self._when = None
+        self._handle = None
+        self._tasks = set()
+        self._budgets = {}  # the deadlines of the children, which the group enforces
+        self._cancel_queue = None  # children left to cancel, None until the group is cancelling them
+        self._waiter = None
+        self._expired = False
+        self._exited = False
+        self.raced = []
+        self.errors = []
+
+    def __len__(self):
+        """The number of children that did not terminate yet."""
+        return len(self._tasks)
+
+    def expired(self):
+        return self._expired
+
+    async def __aenter__(self):
+        loop = self._loop = get_running_loop()
+        parent = self._parent = current_task(loop)
+        if hasattr(parent, "cancelling"):  # Python 3.11+
+            self._parent_cancelling = parent.cancelling()
+        if self._timeout is not None:
+            self._when = loop.time() + self._timeout
+            scheduler = _get_scheduler(loop)
+            self._handle = scheduler.call_at(self._when, self._on_timeout)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._exiting = True
+        if exc_type is not None:
+            self.cancel()
+        cancelled = await _wait_stopped(self, lambda: self._tasks, self.cancel)
+        self._exited = True
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._parent_cancel_requested and not self._uncancel_parent():
+            # The cancellation of the body was only requested for the error of a child, it is raised instead.
+            if exc_type is not None and issubclass(exc_type, CancelledError):
+                exc_type = None
+            cancelled = False
+        if exc_type is not None:
+            return None  # the exception of the body propagates
+        if cancelled:
+            raise CancelledError()
+        if self.errors:
+            raise self.errors[0]
+        if self._expired:
+            raise TimeoutError()
+        return None
+
+    def create_task(self, coro):
+        """Run the coroutine as a child task of the group and return the task."""
+        if self._loop is None or self._exited:
+            coro.close()
+            raise RuntimeError("TaskGroup has already exited" if self._exited else "TaskGroup has not been entered")
+        loop = self._loop
+        current = _active_deadline()
+        in_group = _in_group.set(True)
+        try:
+            if self._when is not None and (current is None or self._when <= current.when):
+                budget = Deadline(self._when, parent=current)
+                token = _deadline.set(budget)
+                try:
+                    task = loop.create_task(self._run(coro))
+                finally:
+                    _deadline.reset(token)
+                budget.task = task  # the group cancels it when the deadline expires
+                self._budgets[task] = budget
+            else:
+                task = loop.create_task(self._run(coro))
+        finally:
+            _in_group.reset(in_group)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+        if self._cancel_queue is not None:
+            self._enqueue_cancel(task)
+        return task
+
+    def cancel(self):
+        """Cancel every child, in batches of `cancel_batch` per loop iteration."""
+        if self._cancel_queue is not None:
+            return
+        self._cancel_queue = deque()
+        for task in self._tasks:
+            self._enqueue_cancel(task)
+
+    async def _run(self, coro):
+        try:
+            return await coro
+        except CancelledWithResultError as e:
+            self.raced.append((e.result, e.is_exception))
+            raise
+
+    def _uncancel_parent(self):
+        """Revoke the cancellation requested for the body. Returns True if the parent was cancelled by others too."""
+        self._parent_cancel_requested = False
+        uncancel = getattr(self._parent, "uncancel", None)
+        if uncancel is None:  # before Python 3.11 the cancellations are not counted
+            return False
+        return uncancel() > self._parent_cancelling
+
+    def _enqueue_cancel(self, task):
+        queue = self._cancel_queue
+        queue.append(task)
+        if len(queue) == 1:
+            self._loop.call_soon(self._cancel_some)
+
+    def _cancel_some(self):
+        queue = self._cancel_queue
+        for _ in range(min(self._cancel_batch, len(queue))):
+            task = queue.popleft()
+            budget = self._budgets.get(task)
+            if budget is not None:
+                budget.fired = True
+            task.cancel()
+        if queue:
+            self._loop.call_soon(self._cancel_some)
+
+    def _on_timeout(self):
+        self._handle = None
+        if self._tasks:
+            self._expired = True
+            self.cancel()
+
+    def _on_done(self, task):
+        self._tasks.discard(task)
+        self._budgets.pop(task, None)
+        if not task.cancelled():
+            exc = task.exception()
+            # a child running out of the group's deadline on its own is the same as it being cancelled for it
+            if exc is not None and not (isinstance(exc, DeadlineExceeded) and exc.when == self._when):
+                self.errors.append(exc)
+                self.cancel()
+                if not self._exiting and not self._parent_cancel_requested and self._parent is not None:
+                    self._parent_cancel_requested = True
+                    self._parent.cancel()
+        if not self._tasks and self._waiter is not None:
+            self._waiter()
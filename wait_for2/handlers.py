@@ -0,0 +1,150 @@
+"""
+Running race handlers off the cancellation path: coroutine handlers as tracked tasks and synchronous handlers in an
+executor, with bounded concurrency.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import ensure_future, iscoroutinefunction
+from inspect import isawaitable
+from collections import deque
+from weakref import WeakKeyDictionary
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+_runners = WeakKeyDictionary()
+
+
+class RaceHandlerRunner(object):
+    """
+    Runs race handlers in the background, so the cancellation path of wait_for only has to queue the result.
+
+    An instance may be passed as `race_handler` itself, then it runs `handler` for each result. Coroutine functions
+    are run as tasks. Other callables are run in `executor` if one is given, otherwise they are called from a loop
+    callback soon after; if they return an awaitable (e.g. a functools.partial of a coroutine function), it is run as
+    a task on the loop as well.
+
+    At most `concurrency` handlers run at the same time, the rest are queued in order and none are dropped. Producers
+    may await throttle() to wait until the backlog (running and queued handlers) shrinks to `high_water`, and join()
+    waits until every handler has finished, e.g. at shutdown. Exceptions raised by the handlers are passed to the
+    loop's exception handler.
+    """
+
+    def __init__(self, handler=None, *, loop=None, executor=None, concurrency=16, high_water=1000):
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        self._handler = handler
+        self._loop = loop
+        self._executor = executor
+        self._concurrency = concurrency
+        self._high_water = high_water
+        self._queue = deque()
+        self._running = 0
+        self._waiters = []
+
+    @property
+    def pending(self):
+        return self._running + len(self._queue)
+
+    def __call__(self, result, is_exception):
+        self.submit(self._handler, result, is_exception)
+
+    def submit(self, handler, result, is_exception):
+        if self._loop is None:
+            self._loop = get_running_loop()
+        self._queue.append((handler, result, is_exception))
+        self._start()
+
+    def _start(self):
+        loop = self._loop
+        while self._running < self._concurrency and self._queue:
+            handler, result, is_exception = self._queue.popleft()
+            self._running += 1
+            if iscoroutinefunction(handler):
+                loop.create_task(handler(result, is_exception)).add_done_callback(self._on_done)
+                continue
+            if self._executor is not None:
+                fut = loop.run_in_executor(self._executor, handler, result, is_exception)
+            else:
+                fut = loop.create_future()
+                loop.call_soon(self._call, fut, handler, result, is_exception)
+            fut.add_done_callback(self._on_called)
+
+    def _track(self, awaitable):
+        # The handler was already called and returned an awaitable, it only has to be run and counted.
+        if self._loop is None:
+            self._loop = get_running_loop()
+        self._running += 1
+        ensure_future(awaitable, loop=self._loop).add_done_callback(self._on_done)
+
+    @staticmethod
+    def _call(fut, handler, result, is_exception):
+        try:
+            value = handler(result, is_exception)
+        except Exception as e:
+            fut.set_exception(e)
+        else:
+            fut.set_result(value)
+
+    def _on_called(self, fut):
+        if not fut.cancelled() and fut.exception() is None and isawaitable(fut.result()):
+            ensure_future(fut.result(), loop=self._loop).add_done_callback(self._on_done)
+        else:
+            self._on_done(fut)
+
+    def _on_done(self, fut):
+        self._running -= 1
+        if not fut.cancelled() and fut.exception() is not None:
+            self._loop.call_exception_handler(
+                {"message": "wait_for2 race_handler failed", "exception": fut.exception(), "future": fut}
+            )
+        self._start()
+        if self._waiters:
+            pending = self.pending
+            waiters = self._waiters
+            self._waiters = []
+            for limit, waiter in waiters:
+                if waiter.done():
+                    continue
+                if pending <= limit:
+                    waiter.set_result(None)
+                else:
+                    self._waiters.append((limit, waiter))
+
+    async def _wait_below(self, limit):
+        while self.pending > limit:
+            waiter = self._loop.create_future()
+            self._waiters.append((limit, waiter))
+            await waiter
+
+    async def throttle(self):
+        """Wait until the backlog is at most `high_water`."""
+        await self._wait_below(self._high_water)
+
+    async def join(self):
+        """Wait until all submitted handlers have finished."""
+        await self._wait_below(0)
+
+
+def get_race_handler_runner(loop=None):
+    """
+    Return the runner used for coroutine function race handlers passed to wait_for on the loop.
+    """
+    if loop is None:
+        loop = get_running_loop()
+    runner = _runners.get(loop)
+    if runner is None:
+        runner = _runners[loop] = RaceHandlerRunner(loop=loop)
+    return runner
+
+
+async def drain_race_handlers():
+    """
+    Wait until every coroutine race handler scheduled by wait_for on the running loop has finished.
+    """
+    runner = _runners.get(get_running_loop())
+    if runner is not None:
+        await runner.join()
@@ -0,0 +1,187 @@
+"""
+Hedged requests: starting backup attempts of a slow request and taking the first success, without leaking the
+results of the losers.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import CancelledError, TimeoutError, ensure_future
+from collections import deque
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .adaptive import AdaptiveTimeout
+from .impl import CancelledWithResultError, _call_race_handler, _release_waiter, _wait_stopped
+from .wheel import _get_scheduler
+
+
+class _Hedge(object):
+    """
+    Tracks the attempts with a single done callback. Terminated attempts are queued in `ready` until they are
+    consumed, so the ones left there at the end are the results nobody received.
+    """
+
+    __slots__ = ("_loop", "_scheduler", "_factory", "attempts", "_started", "ready", "_running", "_waiter")
+
+    def __init__(self, loop, factory):
+        self._loop = loop
+        self._scheduler = _get_scheduler(loop)
+        self._factory = factory
+        self.attempts = []
+        self._started = {}
+        self.ready = deque()
+        self._running = 0
+        self._waiter = None
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        fut = ensure_future(self._factory(), loop=self._loop)
+        self.attempts.append(fut)
+        self._started[fut] = self._loop.time()
+        self._running += 1
+        fut.add_done_callback(self._on_done)
+
+    def started_at(self, fut):
+        return self._started[fut]
+
+    def _on_done(self, fut):
+        self._running -= 1
+        self.ready.append(fut)
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def wait(self, delay):
+        """Wait until an attempt terminates or `delay` seconds pass (forever if None)."""
+        waiter = self._waiter = self._loop.create_future()
+        handle = None if delay is None else self._scheduler.call_later(max(delay, 0), _release_waiter, waiter)
+        try:
+            await waiter
+        finally:
+            self._waiter = None
+            if handle is not None:
+                handle.cancel()
+
+    async def close(self):
+        """
+        Cancel the running attempts and wait until every one of them terminates. Returns True if the waiting was
+        cancelled meanwhile.
+        """
+        for fut in self.attempts:
+            fut.cancel()
+        return await _wait_stopped(self, lambda: self._running)
+
+    def first_success(self):
+        for fut in self.ready:
+            if not fut.cancelled() and fut.exception() is None:
+                return fut
+        return None
+
+    def hand_off(self, race_handler, skip=None):
+        """Pass the outcomes of the terminated attempts nobody received to the race_handler."""
+        raced = []
+        for fut in self.ready:
+            if fut is skip or fut.cancelled():
+                continue
+            result = fut.exception()
+            if result is None:
+                result, is_exception = fut.result(), False
+            else:
+                is_exception = True
+            _call_race_handler(self._loop, fut, result, is_exception, race_handler)
+            raced.append((result, is_exception))
+        self.ready.clear()
+        return raced
+
+
+async def _race(hedge, loop, hedge_delay, max_attempts, deadline):
+    """Return the first successful attempt, or None on timeout. Raises the last error if every attempt failed."""
+    hedge.start()
+    next_hedge = loop.time() + hedge_delay
+    ready = hedge.ready
+    while True:
+        while ready:
+            fut = ready.popleft()
+            if not fut.cancelled() and fut.exception() is None:
+                return fut
+            if not hedge.running and not ready:
+                if len(hedge.attempts) >= max_attempts:
+                    fut.result()  # every attempt failed, raise the last error
+                hedge.start()  # nothing left to wait for, hedge right away
+                next_hedge = loop.time() + hedge_delay
+        now = loop.time()
+        if deadline is not None and now >= deadline:
+            return None
+        if len(hedge.attempts) < max_attempts:
+            if next_hedge <= now:
+                hedge.start()
+                next_hedge = now + hedge_delay
+                continue
+            wake_at = next_hedge if deadline is None else min(next_hedge, deadline)
+        else:
+            wake_at = deadline
+        await hedge.wait(None if wake_at is None else wake_at - now)
+
+
+async def hedged(factory, hedge_delay, max_attempts=2, timeout=None, *, race_handler=None):
+    """
+    Await `factory()` and if it did not succeed within `hedge_delay` seconds start another attempt, up to
+    `max_attempts` in total, returning the result of the first one that succeeds. When an attempt fails and no other
+    is running the next one is started right away. If all of them fail the last exception is raised.
+
+    The `hedge_delay` may be an AdaptiveTimeout (e.g. tracking the 95th percentile), then its current value is used
+    and the latency of the winning attempt is recorded to it.
+
+    The losers are cancelled and awaited until they terminate. Any result or exception they still produce is passed
+    to the `race_handler`. If the `timeout` (in seconds, for the whole call) expires, every attempt is cancelled and
+    awaited the same way. If one of them still succeeds its result is returned, otherwise TimeoutError is raised.
+
+    If the waiting is cancelled, every attempt is cancelled and awaited until it terminates. As none of their
+    outcomes are delivered in this case, each of them is passed to the `race_handler` and CancelledWithResultError
+    is raised with the first one, like wait_for() would.
+    """
+    if max_attempts < 1:
+        raise ValueError("max_attempts must be at least 1")
+    loop = get_running_loop()
+    adaptive = None
+    if isinstance(hedge_delay, AdaptiveTimeout):
+        adaptive = hedge_delay
+        hedge_delay = adaptive.value()
+    deadline = None if timeout is None else loop.time() + timeout
+    hedge = _Hedge(loop, factory)
+    try:
+        winner = await _race(hedge, loop, hedge_delay, max_attempts, deadline)
+    except CancelledError as exc:
+        await hedge.close()
+        raced = hedge.hand_off(race_handler)
+        if raced:
+            raise CancelledWithResultError(*raced[0]) from exc
+        raise
+    except BaseException:
+        await hedge.close()
+        hedge.hand_off(race_handler)
+        raise
+    if winner is not None:
+        if adaptive is not None:
+            adaptive.observe(loop.time() - hedge.started_at(winner))
+        hedge.ready.appendleft(winner)
+    cancelled = await hedge.close()
+    if winner is None:
+        winner = hedge.first_success()
+    if cancelled:
+        raced = hedge.hand_off(race_handler)
+        if winner is not None:
+            raise CancelledWithResultError(winner.result(), False)
+        if raced:
+            raise CancelledWithResultError(*raced[0])
+        raise CancelledError()
+    hedge.hand_off(race_handler, skip=winner)
+    if winner is None:
+        raise TimeoutError()
+    return winner.result()
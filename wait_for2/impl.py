@@ -5,13 +5,167 @@ This implementation is mostly copied from asyncio.tasks (Python 3.8) while makin
 :license: Apache2, see LICENSE for more details.
 """
 import sys
-from asyncio import CancelledError, ensure_future, TimeoutError
+from asyncio import (
+    CancelledError,
+    Future,
+    Task,
+    TimeoutError,
+    current_task,
+    ensure_future,
+    iscoroutine,
+    iscoroutinefunction,
+    isfuture,
+)
 
 try:
     from asyncio import get_running_loop
 except ImportError:  # pragma: no cover
     from asyncio import get_event_loop as get_running_loop
-from functools import partial
+from contextvars import Context
+from inspect import isawaitable
+
+from .adaptive import AdaptiveTimeout
+from .crossloop import _foreign_proxy, _is_foreign
+from .deadlines import Deadline, DeadlineExceeded, _active_deadline, _deadline
+from .handlers import get_race_handler_runner
+from .metrics import _installed as _metrics
+from .registry import _registries
+from .tracing import (
+    CANCEL_AND_WAIT,
+    CANCELLED_INNER_DONE,
+    COMPLETED,
+    DONE,
+    OUTCOME_EVENTS,
+    START,
+    START_UNBOUNDED,
+    TIMEOUT_CANCEL,
+    WAIT,
+    WAIT_NO_TIMER,
+    _installed as _tracing,
+)
+from .watchdog import _installed as _watchdogs
+from .wheel import _get_scheduler, _schedulers
+
+_HAS_EAGER_START = sys.version_info >= (3, 12)
+
+# How often wait_for returned without allocating a waiter and timer, and how often it had to.
+_fast_path_hits = {"done": 0, "eager_start": 0, "eager_factory": 0, "waiter": 0, "builtin": 0}
+
+
+def fast_path_stats():
+    """
+    Return a copy of the wait_for path counters:
+        - done: the future was already done
+        - eager_start: the coroutine completed in its first step when started with eager_start=True
+        - eager_factory: the task created by the loop's (eager) task factory was already done
+        - waiter: none of the above, a waiter and a timer were allocated
+        - builtin: the call was passed on to asyncio.wait_for (Python 3.12+, when none of the library's features
+          are needed), which takes its own paths
+    """
+    return dict(_fast_path_hits)
+
+
+def reset_fast_path_stats():
+    for key in _fast_path_hits:
+        _fast_path_hits[key] = 0
+
+
+def _needs_impl(loop):
+    """
+    Return True if an extension is installed for the loop, which the builtin asyncio.wait_for would not apply.
+    """
+    return bool(
+        (_schedulers and loop in _schedulers)
+        or _metrics.collector is not None
+        or (_metrics.loops and loop in _metrics.loops)
+        or _tracing.buffer is not None
+        or (_tracing.loops and loop in _tracing.loops)
+        or _watchdogs.watchdog is not None
+        or (_watchdogs.loops and loop in _watchdogs.loops)
+        or (_registries and loop in _registries)
+    )
+
+
+def _outcome(exc, timed_out):
+    if isinstance(exc, CancelledWithResultError):
+        return "race"
+    if isinstance(exc, CancelledError):
+        return "cancelled"
+    if timed_out and isinstance(exc, TimeoutError):
+        return "timeout"
+    return "error"
+
+
+def _record_done(collector, label, fut):
+    if fut.cancelled():
+        collector.record(label, "cancelled", 0.0)
+    elif fut.exception() is not None:
+        collector.record(label, "error", 0.0)
+    else:
+        collector.record(label, "completed", 0.0)
+
+
+async def _measure(collector, label, loop, aw, timed_out):
+    start = loop.time()
+    try:
+        result = await aw
+    except BaseException as exc:
+        collector.record(label, _outcome(exc, timed_out), loop.time() - start)
+        raise
+    collector.record(label, "completed", loop.time() - start)
+    return result
+
+
+def _create_task(coro, loop, eager, budget, timeout):
+    """Return the task, and the deadline it inherits from this call (None if there is none)."""
+    if budget is None:
+        return (Task(coro, loop=loop, eager_start=True) if eager else ensure_future(coro, loop=loop)), None
+    # The task inherits the deadline, which this call enforces by cancelling it.
+    inner = Deadline(budget.when if timeout is None else min(budget.when, loop.time() + timeout), parent=budget)
+    token = _deadline.set(inner)
+    try:
+        task = Task(coro, loop=loop, eager_start=True) if eager else ensure_future(coro, loop=loop)
+    finally:
+        _deadline.reset(token)
+    inner.task = task
+    return task, inner
+
+
+def _timed_out_by(budget, exc):
+    if isinstance(exc, TimeoutError) and isinstance(exc.__cause__, CancelledError):
+        return DeadlineExceeded(budget.when)
+    return None
+
+
+class _Waiter(Future):
+    """
+    Waiter future of a wait_for call. It is also the callback of the timer and the done callback of the inner future,
+    so waking it up does not need a partial object per call.
+    """
+
+    __slots__ = ()
+
+    def __call__(self, *args):
+        if not self.done():
+            self.set_result(None)
+
+
+def _waiter_context(loop):
+    """
+    Return the context shared by the timers of the waiters of the loop, they do not need a copy of the current
+    context each. A context can not be entered by two threads at once, so each loop (possibly running in its own
+    thread) has its own, cached as an attribute of the loop. None is returned for loops not taking attributes, then
+    the timer gets a copy of the current context as usual.
+    """
+    try:
+        return loop._wait_for2_waiter_context
+    except AttributeError:
+        context = Context()
+        try:
+            loop._wait_for2_waiter_context = context
+        except AttributeError:
+            return None
+        return context
 
 
 def _release_waiter(waiter, *args):  # copied from from asyncio.tasks
@@ -19,16 +173,47 @@ def _release_waiter(waiter, *args):  # copied from from asyncio.tasks
         waiter.set_result(None)
 
 
-def _handle_cancelling_with_inner_completion(loop, fut, fut_result, res_exception, race_handler):
+async def _wait_stopped(owner, pending, on_cancel=None):
+    """
+    Wait while `pending()` is true, for the futures the owner cancelled to terminate. The waiter is set as
+    `owner._waiter`, the owner wakes it up when one of them terminates. Being cancelled does not stop the waiting,
+    the futures must always be stopped before returning, `on_cancel()` is called instead (if given). Returns True if
+    the waiting was cancelled meanwhile.
+    """
+    cancelled = False
+    while pending():
+        waiter = owner._waiter = _Waiter(loop=owner._loop)
+        try:
+            await waiter
+        except CancelledError:
+            cancelled = True
+            if on_cancel is not None:
+                on_cancel()
+        finally:
+            owner._waiter = None
+    return cancelled
+
+
+def _call_race_handler(loop, fut, fut_result, res_exception, race_handler):
     if race_handler:
+        if iscoroutinefunction(race_handler):
+            get_race_handler_runner(loop).submit(race_handler, fut_result, res_exception)
+            return
         try:
-            race_handler(fut_result, res_exception)
+            handled = race_handler(fut_result, res_exception)
         except Exception as e:
             loop.call_exception_handler({"message": "wait_for2 race_handler failed", "exception": e, "future": fut})
+        else:
+            if isawaitable(handled):
+                get_race_handler_runner(loop)._track(handled)
+
+
+def _handle_cancelling_with_inner_completion(loop, fut, fut_result, res_exception, race_handler):
+    _call_race_handler(loop, fut, fut_result, res_exception, race_handler)
     raise CancelledWithResultError(fut_result, res_exception)
 
 
-async def _cancel_and_wait2(fut, loop, cancelling, race_handler):
+async def _cancel_and_wait2(fut, loop, cancelling, race_handler, collector=None, label=None):
     """
     The builtin implementation of _cancel_and_wait is made in a way to ensure cancellation of it will always be
     possible, at the cost of ensuring that the wrapped future shall terminate inside it.
@@ -42,35 +227,48 @@ async def _cancel_and_wait2(fut, loop, cancelling, race_handler):
 
     This implementation will prioritize cancellation or the result of the inner future dynamically as it makes sense.
     """
+    cancel_start = loop.time() if collector is not None else 0.0
+    watchdog = _watchdogs.watchdog
+    if _watchdogs.loops:
+        watchdog = _watchdogs.loops.get(loop, watchdog)
     if not cancelling:
         # We need to detect explicit cancellations so the good-case value returning will not be used.
-        waiter = loop.create_future()
-        cb = partial(_release_waiter, waiter)
-        fut.add_done_callback(cb)
+        waiter = _Waiter(loop=loop)
+        fut.add_done_callback(waiter)
         fut.cancel()
+        if watchdog is not None and not fut.done():
+            watchdog.watch(fut, loop, label)
         try:
             await waiter
         except CancelledError:
             cancelling = True  # explicitly cancelling the inner from now on
         finally:
-            fut.remove_done_callback(cb)
+            fut.remove_done_callback(waiter)
     else:
         fut.cancel()
+        if watchdog is not None and not fut.done():
+            watchdog.watch(fut, loop, label)
     # At this point there's no benefit of wrapping the future with a waiter since we're cancelling it?
     try:
         fut_result = await fut
-        if not cancelling:
-            return fut_result
     except CancelledError as exc:
+        if collector is not None and fut.done():
+            collector.record_cancel(label, loop.time() - cancel_start)
         if cancelling:
             raise exc
         raise TimeoutError() from exc
     except Exception as exc:
+        if collector is not None:
+            collector.record_cancel(label, loop.time() - cancel_start)
         if not cancelling:
             raise exc
         fut_result = exc
         res_exception = True
     else:
+        if collector is not None:
+            collector.record_cancel(label, loop.time() - cancel_start)
+        if not cancelling:
+            return fut_result
         res_exception = False
     # The waiting construct is already being cancelled, we need to discard/handle the inner future's
     # result here to adhere to the cancellation request.
@@ -90,7 +288,7 @@ class CancelledWithResultError(CancelledError):
         return self.args[1]
 
 
-async def wait_for(fut, timeout, *, loop=None, race_handler=None):
+async def wait_for(fut, timeout, *, loop=None, race_handler=None, scheduler=None, eager_start=False, label=None):
     """
     Alternate implementation of asyncio.wait_for() based on the version from Python 3.8. It handles simultaneous
     cancellation of wait and completion of future differently and consistently across python versions 3.6+.
@@ -112,7 +310,9 @@ async def wait_for(fut, timeout, *, loop=None, race_handler=None):
 
     If the caller prefers to handle the race-condition with a callback, the `race_handler` argument may be provided.
     It will be called with the result of the future when the waiter task is being cancelled. Even if this is provided,
-    the special error will be raised in the place of a normal CancelledError.
+    the special error will be raised in the place of a normal CancelledError. A coroutine function may also be used,
+    it is run as a task by the loop's RaceHandlerRunner (see drain_race_handlers()). To run synchronous handlers off
+    the cancellation path, wrap them in a RaceHandlerRunner.
 
     Additionally, this implementation will inherit the behaviour of the inner future when it comes to ignoring
     cancellation. The builtin version prefers to always be cancellable, even if that means the wrapped future may
@@ -121,6 +321,39 @@ async def wait_for(fut, timeout, *, loop=None, race_handler=None):
     waiter was cancelled after timeout handling had already started. This is more consistent as the inner future
     must always be stopped for it to return.
 
+    The timeout is scheduled with `scheduler.call_later()`. By default this is the TimerWheel installed for the loop
+    with install_timer_wheel(), or the loop itself if there is none. Any object with a compatible call_later() may be
+    passed to choose per call, including the loop to bypass an installed wheel.
+
+    The waiter future and timer are only allocated if the future is not done yet. Already done futures and tasks
+    created by an eager task factory (Python 3.12+) that completed synchronously return right away. With
+    `eager_start` a coroutine is started eagerly regardless of the task factory. This needs Python 3.12+, on older
+    versions `eager_start` has no effect: the coroutine is wrapped in a task as usual and takes the waiter path even
+    if it would complete in its first step.
+    See fast_path_stats() for how often each path is taken.
+
+    If a MetricsCollector is installed (see install_metrics()) the outcome and timings of the call are recorded,
+    under the given `label` if any.
+    If a TraceBuffer is installed (see install_tracing()) the path the call takes is recorded in it as well.
+    If a CancelWatchdog is installed (see install_cancel_watchdog()) the inner futures that are slow to terminate
+    after being cancelled are reported.
+    If a WaitRegistry is installed for the loop (see install_wait_registry()) the call is registered while it is
+    waiting, and it raises DrainingError without waiting once the registry is draining.
+
+    The future may also be a concurrent.futures.Future or belong to another loop (running in another thread). Its
+    completion is then delivered to the waiting loop and cancellation is forwarded to it thread-safely, while keeping
+    the guarantees above: the waiting ends after the foreign future has terminated and a result racing with a
+    cancellation is passed to the `race_handler` on the waiting loop. (A concurrent future can only be cancelled
+    before it starts running, and the future returned by asyncio.run_coroutine_threadsafe() drops the result once it
+    is cancelled, see wait_for_threadsafe() for that use-case.)
+
+    Inside a deadline() scope the timeout is limited to the time remaining until the deadline, and if that expires
+    DeadlineExceeded is raised instead of TimeoutError. The deadline is passed on to the task created for a
+    coroutine, and calls in it do not schedule a timer that would expire after this call's.
+
+    The `timeout` may be an AdaptiveTimeout (see adaptive_timeout()), then its current value is used and the
+    latency of the call is recorded to it.
+
     NOTE: CancelledWithResultError is limited to the coroutine wait_for is invoked from!
     If this wait_for is wrapped in tasks those will not propagate the special exception, but raise their own
     CancelledError instances.
@@ -130,28 +363,121 @@ async def wait_for(fut, timeout, *, loop=None, race_handler=None):
     elif sys.version_info >= (3, 10):  # pragma: no cover
         raise RuntimeError("loop parameter has been dropped since Python 3.10")
 
-    if timeout is None:
-        return await fut
+    if _is_foreign(fut, loop):
+        fut = _foreign_proxy(fut, loop)
 
-    if timeout <= 0:
-        fut = ensure_future(fut, loop=loop)
+    registry = _registries.get(loop) if _registries else None
+    if registry is not None and registry.draining:
+        registry._reject(fut)
 
+    collector = _metrics.collector
+    if _metrics.loops:
+        collector = _metrics.loops.get(loop, collector)
+    tracer = _tracing.buffer
+    if _tracing.loops:
+        tracer = _tracing.loops.get(loop, tracer)
+
+    adaptive = None
+    if isinstance(timeout, AdaptiveTimeout):
+        adaptive = timeout
+        timeout = adaptive.value()
+
+    budget = _active_deadline()
+    by_deadline = skip_timer = False
+    if budget is not None:
+        remaining = budget.when - loop.time()
+        if timeout is None or remaining < timeout:
+            if remaining > 0 and budget.task is not None and budget.task is current_task(loop):
+                # An enclosing wait_for or timeout scope cancels this task first, a timer would be redundant.
+                skip_timer = timeout is not None
+            else:
+                timeout = remaining
+                by_deadline = True
+
+    if tracer is not None:
+        call_id = tracer.start(START_UNBOUNDED if timeout is None else START, loop.time(), label)
+
+    owned = None  # the deadline of the task created here, which this call enforces
+    if isfuture(fut):
         if fut.done():
+            _fast_path_hits["done"] += 1
+            if collector is not None:
+                _record_done(collector, label, fut)
+            if tracer is not None:
+                tracer.record(call_id, DONE, loop.time(), label)
             return fut.result()
+    elif eager_start and _HAS_EAGER_START and iscoroutine(fut):
+        fut, owned = _create_task(fut, loop, True, budget, timeout)
+        if fut.done():
+            _fast_path_hits["eager_start"] += 1
+            if collector is not None:
+                _record_done(collector, label, fut)
+            if tracer is not None:
+                tracer.record(call_id, DONE, loop.time(), label)
+            return fut.result()
+    else:
+        fut, owned = _create_task(fut, loop, False, budget, timeout)
+        if fut.done():
+            _fast_path_hits["eager_factory"] += 1
+            if collector is not None:
+                _record_done(collector, label, fut)
+            if tracer is not None:
+                tracer.record(call_id, DONE, loop.time(), label)
+            return fut.result()
+    _fast_path_hits["waiter"] += 1
 
-        return await _cancel_and_wait2(fut, loop, False, race_handler)
+    if timeout is not None and timeout <= 0:
+        if adaptive is not None:
+            adaptive.observe(0.0)
+        if owned is not None:
+            owned.fired = True
+        aw = _cancel_and_wait2(fut, loop, False, race_handler, collector, label)
+        if collector is not None:
+            aw = _measure(collector, label, loop, aw, True)
+        if tracer is not None:
+            tracer.record(call_id, TIMEOUT_CANCEL, loop.time(), label)
+        try:
+            result = await aw
+        except BaseException as exc:
+            if tracer is not None:
+                tracer.record(call_id, OUTCOME_EVENTS[_outcome(exc, True)], loop.time(), label)
+            exceeded = _timed_out_by(budget, exc) if by_deadline else None
+            if exceeded is None:
+                raise
+            raise exceeded from exc.__cause__
+        if tracer is not None:
+            tracer.record(call_id, COMPLETED, loop.time(), label)
+        return result
 
-    waiter = loop.create_future()
-    timeout_handle = loop.call_later(timeout, _release_waiter, waiter)
-    cb = partial(_release_waiter, waiter)
-    fut = ensure_future(fut, loop=loop)
-    fut.add_done_callback(cb)
+    if scheduler is None:
+        scheduler = _get_scheduler(loop)
+
+    waiter = _Waiter(loop=loop)
+    if skip_timer or timeout is None:
+        timeout_handle = None
+    elif scheduler is loop:
+        timeout_handle = loop.call_later(timeout, waiter, context=_waiter_context(loop))
+    else:
+        timeout_handle = scheduler.call_later(timeout, waiter)
+    fut.add_done_callback(waiter)
+    if tracer is not None:
+        tracer.record(call_id, WAIT if timeout_handle is not None else WAIT_NO_TIMER, loop.time(), label)
+    if registry is not None:
+        if skip_timer:
+            when = budget.when
+        else:
+            when = None if timeout is None else loop.time() + timeout
+        entry = registry._register(current_task(loop), fut, label, loop.time(), when)
+    start = loop.time() if collector is not None or adaptive is not None else 0.0
+    timed_out = False
 
     try:
         try:
             await waiter
         except CancelledError:
             if fut.done():
+                if tracer is not None:
+                    tracer.record(call_id, CANCELLED_INNER_DONE, loop.time(), label)
                 try:
                     fut_result = fut.exception()
                 except CancelledError:
@@ -162,13 +488,46 @@ async def wait_for(fut, timeout, *, loop=None, race_handler=None):
                 else:
                     res_exception = True
                 _handle_cancelling_with_inner_completion(loop, fut, fut_result, res_exception, race_handler)
-            fut.remove_done_callback(cb)
-            await _cancel_and_wait2(fut, loop, True, race_handler)
+            fut.remove_done_callback(waiter)
+            if owned is not None:
+                owned.fired = True
+            if tracer is not None:
+                tracer.record(call_id, CANCEL_AND_WAIT, loop.time(), label)
+            await _cancel_and_wait2(fut, loop, True, race_handler, collector, label)
 
         if fut.done():
-            return fut.result()
+            result = fut.result()
         else:
-            fut.remove_done_callback(cb)
-            return await _cancel_and_wait2(fut, loop, False, race_handler)
+            fut.remove_done_callback(waiter)
+            timed_out = True
+            if owned is not None:
+                owned.fired = True
+            if tracer is not None:
+                tracer.record(call_id, TIMEOUT_CANCEL, loop.time(), label)
+            result = await _cancel_and_wait2(fut, loop, False, race_handler, collector, label)
+    except BaseException as exc:
+        if adaptive is not None and timed_out and isinstance(exc, TimeoutError):
+            adaptive.timed_out(timeout)
+        if collector is not None:
+            collector.record(label, _outcome(exc, timed_out), loop.time() - start)
+        if tracer is not None:
+            tracer.record(call_id, OUTCOME_EVENTS[_outcome(exc, timed_out)], loop.time(), label)
+        if registry is not None and registry.draining and isinstance(exc, CancelledWithResultError):
+            registry.raced.append((exc.result, exc.is_exception))
+        if by_deadline and timed_out:
+            exceeded = _timed_out_by(budget, exc)
+            if exceeded is not None:
+                raise exceeded from exc.__cause__
+        raise
     finally:
-        timeout_handle.cancel()
+        if timeout_handle is not None:
+            timeout_handle.cancel()
+        if registry is not None:
+            registry._unregister(entry)
+    if adaptive is not None:
+        adaptive.observe(timeout if timed_out else loop.time() - start)
+    if collector is not None:
+        collector.record(label, "completed", loop.time() - start)
+    if tracer is not None:
+        tracer.record(call_id, COMPLETED, loop.time(), label)
+    return result
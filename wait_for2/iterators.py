@@ -0,0 +1,217 @@
+"""
+Per-item and total timeouts for async iterators, without a task or timer per item and without losing items.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import CancelledError, TimeoutError
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .deadlines import DeadlineExceeded, _active_deadline
+from .impl import _handle_cancelling_with_inner_completion, _Waiter
+from .wheel import _get_scheduler
+
+
+class _ItemTimer(object):
+    """
+    A single timer shared by the items. The expiry moves forward with each item, but the timer is only rescheduled
+    when it fires before the expiry of the item being waited for, so fast items do not schedule timers at all.
+    """
+
+    __slots__ = ("_scheduler", "_handle", "_when", "expires", "waiter")
+
+    def __init__(self, scheduler):
+        self._scheduler = scheduler
+        self._handle = None
+        self._when = None
+        self.expires = None
+        self.waiter = None
+
+    def arm(self, expires, waiter):
+        self.expires = expires
+        self.waiter = waiter
+        if expires is not None and self._handle is None:
+            self._schedule(expires)
+
+    def _schedule(self, when):
+        self._when = when
+        self._handle = self._scheduler.call_at(when, self._fire)
+
+    def _fire(self):
+        self._handle = None
+        waiter = self.waiter
+        if waiter is None or waiter.done():
+            return  # not waiting for an item, the next one schedules it again if needed
+        if self.expires > self._when:
+            self._schedule(self.expires)
+        else:
+            waiter()
+
+    def cancel(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+
+class _Pump(object):
+    """
+    Task that advances the wrapped iterator on request, one item at a time. It outlives the items, so waiting for
+    an item needs only a waiter future, and the item is never lost: it is stored in `outcome` even if it was
+    produced while the pump was being cancelled.
+    """
+
+    __slots__ = ("_loop", "_iterator", "_task", "_request", "_stopping", "outcome", "waiter")
+
+    def __init__(self, loop, iterator):
+        self._loop = loop
+        self._iterator = iterator
+        self._task = None
+        self._request = None
+        self._stopping = False
+        self.outcome = None  # (result, is_exception) of the last request
+        self.waiter = None
+
+    def next(self):
+        """Request the next item and return the waiter that is woken when it is available or the pump stopped."""
+        self.outcome = None
+        waiter = self.waiter = _Waiter(loop=self._loop)
+        task = self._task
+        if task is None or task.done():
+            self._stopping = False
+            task = self._task = self._loop.create_task(self._run())
+            task.add_done_callback(self._wake)
+        else:
+            self._request.set_result(None)
+        return waiter
+
+    async def _run(self):
+        anext = self._iterator.__anext__
+        while True:
+            try:
+                self.outcome = (await anext(), False)
+            except CancelledError:
+                raise
+            except Exception as exc:  # including StopAsyncIteration
+                self.outcome = (exc, True)
+                self._wake()
+                return
+            self._wake()
+            if self._stopping:
+                return  # the item was produced while being cancelled, the cancellation was consumed
+            request = self._request = self._loop.create_future()
+            await request
+
+    def _wake(self, *args):
+        waiter = self.waiter
+        if waiter is not None:
+            waiter()
+
+    def failure(self):
+        """Return the task of the pump if it terminated on its own without an outcome (e.g. it was cancelled)."""
+        task = self._task
+        if self.outcome is None and task is not None and task.done() and not self._stopping:
+            return task
+        return None
+
+    async def stop(self):
+        """
+        Cancel the pump and wait until it terminated, even if the waiting is cancelled. Returns whether it was.
+        """
+        task = self._task
+        if task is None or task.done():
+            return False
+        self._stopping = True
+        task.cancel()
+        cancelled = False
+        while not task.done():
+            waiter = _Waiter(loop=self._loop)
+            task.add_done_callback(waiter)
+            try:
+                await waiter
+            except CancelledError:
+                cancelled = True
+            finally:
+                task.remove_done_callback(waiter)
+        return cancelled
+
+    async def close(self):
+        await self.stop()
+        aclose = getattr(self._iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def _handle_cancelling(loop, pump, race_handler):
+    # Same as with wait_for(): an item produced while the iteration is cancelled goes to the race_handler.
+    if pump.outcome is not None:
+        result, is_exception = pump.outcome
+        if not (is_exception and isinstance(result, StopAsyncIteration)):
+            _handle_cancelling_with_inner_completion(loop, pump._task, result, is_exception, race_handler)
+
+
+async def aiter_timeout(aiter, per_item_timeout, total_timeout=None, *, race_handler=None):
+    """
+    Iterate over the async iterable `aiter`, waiting at most `per_item_timeout` seconds for each item and at most
+    `total_timeout` seconds for all of them (either may be None):
+
+        async for message in wait_for2.aiter_timeout(stream, 1.0, 60.0, race_handler=requeue):
+            ...
+
+    Unlike calling wait_for() on each __anext__(), the iterator is advanced by a single task for the whole
+    iteration, and one timer is reused for the items. If a timeout expires, the iterator is cancelled the same way
+    wait_for() cancels a task: TimeoutError is raised (DeadlineExceeded if the deadline of an enclosing deadline()
+    scope expired first) and the iterator is closed. An item produced at the same time is yielded instead, and the
+    iteration may continue. If the iteration is cancelled while an item is produced, the item is passed to the
+    `race_handler` and CancelledWithResultError is raised.
+
+    The wrapped iterator is closed with its aclose() (if it has one) when the iteration ends or is closed.
+    """
+    iterator = aiter.__aiter__()
+    loop = get_running_loop()
+    scheduler = _get_scheduler(loop)
+    total = None if total_timeout is None else loop.time() + total_timeout
+    budget = _active_deadline()
+    if budget is not None and (total is None or budget.when < total):
+        total = budget.when
+    else:
+        budget = None
+    timer = _ItemTimer(scheduler)
+    pump = _Pump(loop, iterator)
+    try:
+        while True:
+            expires = None if per_item_timeout is None else loop.time() + per_item_timeout
+            if total is not None and (expires is None or total < expires):
+                expires = total
+            waiter = pump.next()
+            timer.arm(expires, waiter)
+            try:
+                await waiter
+            except CancelledError:
+                await pump.stop()
+                _handle_cancelling(loop, pump, race_handler)
+                raise
+            if pump.outcome is None:
+                failed = pump.failure()
+                if failed is not None:
+                    failed.result()  # raises why the wrapped iterator stopped
+                cancelled = await pump.stop()
+                if cancelled:
+                    _handle_cancelling(loop, pump, race_handler)
+                    raise CancelledError()
+                if pump.outcome is None:
+                    if budget is not None and expires == budget.when:
+                        raise DeadlineExceeded(budget.when)
+                    raise TimeoutError()
+            result, is_exception = pump.outcome
+            if is_exception:
+                if isinstance(result, StopAsyncIteration):
+                    return
+                raise result
+            yield result
+    finally:
+        timer.cancel()
+        await pump.close()
@@ -0,0 +1,181 @@
+"""
+Semaphore and lock whose acquire() accepts a timeout, that never leak a permit when acquisition and cancellation race.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import CancelledError, TimeoutError
+from collections import deque
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .wheel import _get_scheduler
+
+
+def _expire(fut):
+    if not fut.done():
+        fut.set_exception(TimeoutError())
+
+
+class _Permits(object):
+    """
+    Counter of permits with a FIFO queue of waiters. A released permit is handed directly to the first waiter (by
+    resolving its future), it is never returned to the counter while someone is waiting, so a newcomer can not
+    overtake the waiters and the counter is only positive when nobody waits.
+
+    The permits held and those handed to a waiter that has not resumed yet are counted separately, so releasing
+    more than was acquired is detected while a handed over permit is in flight.
+    """
+
+    def __init__(self, value):
+        self._value = value
+        self._held = 0
+        self._handed = 0
+        self._waiters = deque()
+        self._stale = 0  # approximate number of waiters in the queue that already gave up
+
+    async def acquire(self, timeout=None):
+        """
+        Acquire a permit, waiting at most `timeout` seconds (forever if None) for one. Returns True, or raises
+        TimeoutError if none became available in time.
+
+        If the waiting is cancelled (or times out) at the same time a permit is handed over, the permit is passed on
+        to the next waiter, so none are leaked. A permit that became available at the same time as the timeout
+        expired is taken instead of raising TimeoutError.
+        """
+        if self._value > 0:
+            self._value -= 1
+            self._held += 1
+            return True
+        loop = get_running_loop()
+        fut = loop.create_future()
+        self._waiters.append(fut)
+        handle = None
+        if timeout is not None:
+            scheduler = _get_scheduler(loop)
+            handle = scheduler.call_later(timeout, _expire, fut)
+        try:
+            await fut
+        except CancelledError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self._handed -= 1
+                self._hand_over()  # handed over while being cancelled
+            else:
+                self._gave_up()
+            raise
+        except TimeoutError:
+            self._gave_up()
+            if self._value > 0:
+                # Released before this waiter could resume, it is prioritized over the timeout.
+                self._value -= 1
+                self._held += 1
+                return True
+            raise
+        finally:
+            if handle is not None:
+                handle.cancel()
+        self._handed -= 1
+        self._held += 1
+        return True
+
+    def acquired(self, timeout=None):
+        """
+        Asynchronous context manager that acquires a permit with a timeout and releases it at exit.
+        """
+        return _Acquired(self, timeout)
+
+    def _release(self):
+        if self._held:
+            self._held -= 1
+        self._hand_over()
+
+    def _hand_over(self):
+        waiters = self._waiters
+        while waiters:
+            fut = waiters.popleft()
+            if not fut.done():
+                fut.set_result(True)
+                self._handed += 1
+                return
+            self._stale -= 1
+        self._value += 1
+
+    def _gave_up(self):
+        self._stale += 1
+        if self._stale > 64 and self._stale * 2 > len(self._waiters):
+            self._waiters = deque(fut for fut in self._waiters if not fut.done())
+            self._stale = 0
+
+    async def __aenter__(self):
+        await self.acquire()
+        return None
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class Semaphore(_Permits):
+    """
+    Semaphore with `value` permits, like asyncio.Semaphore, but acquire() takes a timeout and waits without a task
+    or wait_for call, using a plain future per waiter. Waiters are served in FIFO order.
+    """
+
+    def __init__(self, value=1):
+        if value < 0:
+            raise ValueError("Semaphore initial value must be >= 0")
+        super(Semaphore, self).__init__(value)
+
+    def locked(self):
+        """Returns True if the semaphore can not be acquired immediately."""
+        return self._value == 0
+
+    def release(self):
+        """Release a permit, handing it to the first waiter if there is one."""
+        self._release()
+
+
+class BoundedSemaphore(Semaphore):
+    """
+    Semaphore that raises ValueError if it is released more times than it was acquired.
+    """
+
+    def release(self):
+        if not self._held:
+            raise ValueError("BoundedSemaphore released too many times")
+        self._release()
+
+
+class Lock(_Permits):
+    """
+    Lock like asyncio.Lock, but acquire() takes a timeout and waits without a task or wait_for call. Waiters are
+    served in FIFO order.
+    """
+
+    def __init__(self):
+        super(Lock, self).__init__(1)
+
+    def locked(self):
+        """Returns True if the lock is acquired."""
+        return self._held + self._handed > 0
+
+    def release(self):
+        """Release the lock, handing it to the first waiter if there is one. Raises RuntimeError if it is unlocked."""
+        if not self._held:
+            raise RuntimeError("Lock is not acquired.")
+        self._release()
+
+
+class _Acquired(object):
+    def __init__(self, permits, timeout):
+        self._permits = permits
+        self._timeout = timeout
+
+    async def __aenter__(self):
+        await self._permits.acquire(self._timeout)
+        return None
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._permits.release()
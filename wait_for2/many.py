@@ -0,0 +1,233 @@
+"""
+Waiting for a batch of futures with per-item timeouts, while sharing the waiting machinery across the batch.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import CancelledError, ensure_future, TimeoutError
+from collections import deque
+from heapq import heapify, heappop
+from itertools import repeat
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .impl import CancelledWithResultError, _call_race_handler, _wait_stopped
+
+
+class _Batch(object):
+    """
+    Tracks the futures of a batch with a single done callback, a single loop timer for the earliest pending
+    deadline and one waiter per wakeup (not per item).
+    """
+
+    __slots__ = (
+        "_loop",
+        "futs",
+        "_index",
+        "_dupes",
+        "ready",
+        "_remaining",
+        "_waiter",
+        "_deadlines",
+        "_timer",
+        "_expired",
+    )
+
+    def __init__(self, loop, futs, timeouts):
+        self._loop = loop
+        futs = list(futs)
+        if timeouts is None or isinstance(timeouts, (int, float)):
+            timeouts = repeat(timeouts, len(futs))
+        else:
+            timeouts = list(timeouts)
+            if len(timeouts) != len(futs):
+                raise ValueError("timeouts must be a single value or one per future")
+        self.futs = [ensure_future(f, loop=loop) for f in futs]
+        self._index = {}
+        self._dupes = None
+        self.ready = deque()
+        self._waiter = None
+        self._timer = None
+        self._expired = set()
+        now = loop.time()
+        deadlines = []
+        for i, (fut, timeout) in enumerate(zip(self.futs, timeouts)):
+            if timeout is not None:
+                deadlines.append((now + timeout, i))
+            if fut in self._index:
+                if self._dupes is None:
+                    self._dupes = {}
+                self._dupes.setdefault(fut, []).append(i)
+                continue
+            self._index[fut] = i
+            fut.add_done_callback(self._on_done)
+        self._remaining = len(self._index)
+        heapify(deadlines)
+        self._deadlines = deadlines
+        self._arm()
+
+    def _on_done(self, fut):
+        self._remaining -= 1
+        self.ready.append(fut)
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _arm(self):
+        deadlines = self._deadlines
+        while deadlines and self.futs[deadlines[0][1]].done():
+            heappop(deadlines)
+        if deadlines:
+            self._timer = self._loop.call_at(deadlines[0][0], self._expire)
+
+    def _expire(self):
+        self._timer = None
+        now = self._loop.time()
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            fut = self.futs[heappop(deadlines)[1]]
+            if not fut.done():
+                # Like a timeout in wait_for, the inner future is cancelled and awaited until it terminates.
+                self._expired.add(fut)
+                fut.cancel()
+        self._arm()
+
+    def indexes(self, fut):
+        yield self._index[fut]
+        if self._dupes is not None and fut in self._dupes:
+            yield from self._dupes[fut]
+
+    def outcome(self, fut):
+        """Return (result, is_exception) of a terminated future."""
+        if fut.cancelled():
+            return TimeoutError() if fut in self._expired else CancelledError(), True
+        exc = fut.exception()
+        if exc is not None:
+            return exc, True
+        return fut.result(), False
+
+    async def next(self):
+        """Wait for the next terminated future, or return None if all of them were already returned."""
+        ready = self.ready
+        while not ready:
+            if not self._remaining:
+                return None
+            waiter = self._waiter = self._loop.create_future()
+            try:
+                await waiter
+            finally:
+                self._waiter = None
+        return ready.popleft()
+
+    async def close(self):
+        """
+        Cancel all running futures and wait until every one of them terminates. Returns True if the waiting was
+        cancelled meanwhile.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for fut in self._index:
+            fut.cancel()
+        return await _wait_stopped(self, lambda: self._remaining)
+
+    def hand_off(self, futs, race_handler, skip=None):
+        """Pass the results of terminated futures the caller will not receive to the race_handler."""
+        raced = []
+        for fut in futs:
+            if fut is skip or fut.cancelled():
+                continue
+            result, is_exception = self.outcome(fut)
+            _call_race_handler(self._loop, fut, result, is_exception, race_handler)
+            for i in self.indexes(fut):
+                raced.append((i, result, is_exception))
+        return raced
+
+
+async def wait_for_many(futs, timeouts, *, race_handler=None, return_exceptions=False):
+    """
+    Wait for a batch of futures (or coroutines) with per-item timeouts, returning their results in order.
+
+    It behaves like calling wait_for() for each item under asyncio.gather(), but the batch shares a single done
+    callback, one loop timer (armed for the earliest pending deadline) and one waiter per wakeup.
+
+    `timeouts` may be a single value (None for no timeout) applied to every item, or a sequence with one value per
+    item. When an item's timeout is reached it is cancelled and awaited until it terminates. If it still produced a
+    result or raised an exception that is kept, otherwise the item's outcome is a TimeoutError.
+
+    With `return_exceptions` the exceptions (including the TimeoutErrors) are returned in place of results.
+    Otherwise the first exception is raised after all other items have been cancelled and stopped.
+
+    If the waiting is cancelled, every item is cancelled and awaited until it terminates. As none of the results
+    are delivered in this case, each result or exception produced by the items is passed to the `race_handler`.
+    Then a CancelledWithResultError is raised, its `result` holds (index, result, is_exception) tuples of them.
+    The same hand-off applies to the other items' results when an exception is raised without return_exceptions.
+    """
+    batch = _Batch(get_running_loop(), futs, timeouts)
+    error = None
+    try:
+        fut = await batch.next()
+        while fut is not None:
+            if not return_exceptions:
+                result, is_exception = batch.outcome(fut)
+                if is_exception:
+                    error = result
+                    break
+            fut = await batch.next()
+        else:
+            results = [None] * len(batch.futs)
+            for i, fut in enumerate(batch.futs):
+                results[i] = batch.outcome(fut)[0]
+            return results
+    except CancelledError as exc:
+        await batch.close()
+        raced = batch.hand_off(batch._index, race_handler)
+        if raced:
+            raise CancelledWithResultError(raced, False) from exc
+        raise
+    if await batch.close():
+        raced = batch.hand_off(batch._index, race_handler)
+        if raced:
+            raise CancelledWithResultError(raced, False)
+        raise CancelledError()
+    batch.hand_off(batch._index, race_handler, skip=fut)
+    raise error
+
+
+async def iter_wait_for_many(futs, timeouts, *, race_handler=None):
+    """
+    Like wait_for_many() but yields (index, result) pairs as the items complete. The first exception is raised.
+
+    When the iteration stops early (break, aclose(), an item failure or cancellation) the remaining items are
+    cancelled and awaited until they terminate, and every result that was not yielded is passed to the
+    `race_handler`.
+    """
+    batch = _Batch(get_running_loop(), futs, timeouts)
+    try:
+        fut = await batch.next()
+        while fut is not None:
+            result, is_exception = batch.outcome(fut)
+            if is_exception:
+                await _abort(batch, race_handler)
+                raise result
+            for i in batch.indexes(fut):
+                yield i, result
+            fut = await batch.next()
+    except CancelledError as exc:
+        raced = await _abort(batch, race_handler)
+        if raced:
+            raise CancelledWithResultError(raced, False) from exc
+        raise
+    finally:
+        if batch._remaining or batch.ready:
+            await _abort(batch, race_handler)
+
+
+async def _abort(batch, race_handler):
+    await batch.close()
+    raced = batch.hand_off(batch.ready, race_handler)
+    batch.ready.clear()
+    return raced
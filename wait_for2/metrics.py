@@ -0,0 +1,170 @@
+"""
+Optional metrics of wait_for outcomes and latencies.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from bisect import bisect_left
+from weakref import WeakKeyDictionary
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+OUTCOMES = ("completed", "error", "timeout", "cancelled", "race")
+
+# Exponential buckets from 1 microsecond to ~134 seconds.
+DEFAULT_BOUNDS = tuple(1e-6 * 2**i for i in range(28))
+
+
+class Histogram(object):
+    """
+    Fixed-size histogram. Each bucket counts the values up to (and including) its upper bound, the last bucket
+    counts everything above the largest bound.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Return the upper bound of the bucket the `q` quantile falls into (None if it is above all bounds or there
+        are no values recorded).
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": [[bound, count] for bound, count in zip(self.bounds, self.counts) if count],
+            "overflow": self.counts[-1],
+        }
+
+
+class _LabelMetrics(object):
+    __slots__ = ("counters", "wait_time", "cancel_latency")
+
+    def __init__(self, bounds):
+        self.counters = dict.fromkeys(OUTCOMES, 0)
+        self.wait_time = Histogram(bounds)
+        self.cancel_latency = Histogram(bounds)
+
+
+class MetricsCollector(object):
+    """
+    Collects counters of wait_for outcomes and histograms of the time spent waiting and of the time it took the
+    inner future to terminate after being cancelled. The metrics are kept separately for each label passed to
+    wait_for() (None if there was no label).
+
+    Outcomes:
+        - completed: a result was returned
+        - error: the inner future raised an exception
+        - timeout: TimeoutError was raised because of the timeout
+        - cancelled: the waiting was cancelled
+        - race: the waiting was cancelled while the inner future completed (CancelledWithResultError)
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self._bounds = bounds
+        self._labels = {}
+
+    def _get(self, label):
+        metrics = self._labels.get(label)
+        if metrics is None:
+            metrics = self._labels[label] = _LabelMetrics(self._bounds)
+        return metrics
+
+    def record(self, label, outcome, wait_time):
+        metrics = self._get(label)
+        metrics.counters[outcome] += 1
+        metrics.wait_time.record(wait_time)
+
+    def record_cancel(self, label, latency):
+        self._get(label).cancel_latency.record(latency)
+
+    def counters(self, label=None):
+        metrics = self._labels.get(label)
+        return dict(metrics.counters) if metrics else dict.fromkeys(OUTCOMES, 0)
+
+    def wait_time(self, label=None):
+        return self._get(label).wait_time
+
+    def cancel_latency(self, label=None):
+        return self._get(label).cancel_latency
+
+    def labels(self):
+        return list(self._labels)
+
+    def snapshot(self):
+        return {
+            label: {
+                "counters": dict(metrics.counters),
+                "wait_time": metrics.wait_time.as_dict(),
+                "cancel_latency": metrics.cancel_latency.as_dict(),
+            }
+            for label, metrics in self._labels.items()
+        }
+
+    def reset(self):
+        self._labels.clear()
+
+
+class _Installed(object):
+    __slots__ = ("collector", "loops")
+
+    def __init__(self):
+        self.collector = None
+        self.loops = WeakKeyDictionary()
+
+
+_installed = _Installed()
+
+
+def install_metrics(collector=None, *, loop=None):
+    """
+    Install a MetricsCollector (a new one if not given) for every wait_for call, or only for those running on `loop`.
+    A collector installed for a loop takes precedence over the global one. The installed collector is returned.
+    """
+    if collector is None:
+        collector = MetricsCollector()
+    if loop is None:
+        _installed.collector = collector
+    else:
+        _installed.loops[loop] = collector
+    return collector
+
+
+def uninstall_metrics(*, loop=None):
+    if loop is None:
+        _installed.collector = None
+    else:
+        _installed.loops.pop(loop, None)
+
+
+def get_metrics(loop=None):
+    """
+    Return the collector in effect for `loop` (the running loop by default), or None.
+    """
+    if loop is None:
+        loop = get_running_loop()
+    return _installed.loops.get(loop, _installed.collector)
@@ -0,0 +1,247 @@
+"""
+Generic asynchronous resource pool, that never leaks resources when acquisition and cancellation race.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import CancelledError, TimeoutError, ensure_future, wait
+from collections import deque
+from inspect import isawaitable
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .impl import CancelledWithResultError, wait_for
+from .wheel import _get_scheduler
+
+# Handed to a waiter instead of a resource when it may create a new one.
+_CREATE = object()
+
+
+class PoolClosedError(RuntimeError):
+    pass
+
+
+def _expire(fut):
+    if not fut.done():
+        fut.set_exception(TimeoutError())
+
+
+class Pool(object):
+    """
+    Pool of at most `max_size` resources created by the `factory` coroutine function.
+
+    Idle resources are reused in LIFO order, so the most recently used (warmest) one is handed out first. When the
+    pool is exhausted acquirers queue up in FIFO order. Each waiter is a plain future that is resolved directly by
+    release(), so there is no task or wait_for call per waiter.
+
+    If an acquirer is cancelled (or times out) at the same time it is handed a resource, the resource is returned to
+    the pool instead of being lost. The same applies to resources created for an acquirer that was cancelled. In
+    these cases a plain CancelledError is raised, as there is nothing left for the caller to handle.
+
+    The optional `dispose` function is called with resources that are discarded or released after the pool was closed.
+    If it returns an awaitable (e.g. it is a coroutine function), that is run as a task and awaited by close().
+    """
+
+    def __init__(self, factory, *, max_size=10, dispose=None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._factory = factory
+        self._dispose = dispose
+        self._max_size = max_size
+        self._size = 0  # existing resources and those being created
+        self._idle = []
+        self._waiters = deque()
+        self._stale = 0  # approximate number of waiters in the queue that already gave up
+        self._disposing = set()
+        self._closed = False
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def idle(self):
+        return len(self._idle)
+
+    @property
+    def waiting(self):
+        return sum(1 for fut in self._waiters if not fut.done())
+
+    async def acquire(self, timeout=None):
+        """
+        Acquire a resource, waiting at most `timeout` seconds (including its creation). Raises TimeoutError if none
+        became available in time.
+        """
+        if self._closed:
+            raise PoolClosedError("pool is closed")
+        if self._idle:
+            return self._idle.pop()
+        loop = get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        if self._size < self._max_size:
+            self._size += 1
+            return await self._create(loop, deadline)
+
+        fut = loop.create_future()
+        self._waiters.append(fut)
+        handle = None
+        if timeout is not None:
+            scheduler = _get_scheduler(loop)
+            handle = scheduler.call_later(timeout, _expire, fut)
+        try:
+            item = await fut
+        except CancelledError:
+            if fut.done() and not fut.cancelled() and fut.exception() is None:
+                self._hand_back(fut.result())  # handed over while being cancelled
+            else:
+                self._gave_up()
+            raise
+        except BaseException:
+            self._gave_up()
+            raise
+        finally:
+            if handle is not None:
+                handle.cancel()
+        if item is _CREATE:
+            return await self._create(loop, deadline)
+        return item
+
+    def acquired(self, timeout=None, *, discard_on_error=False):
+        """
+        Asynchronous context manager that acquires a resource and releases it at exit.
+
+        The resource is released even if the body raised an exception, the pool can not tell whether the resource
+        was left in a broken state. With `discard_on_error` it is discarded instead if the body raised anything
+        (including CancelledError, which may interrupt the use of the resource half-way).
+        """
+        return _Acquired(self, timeout, discard_on_error)
+
+    def release(self, resource):
+        """
+        Return a resource to the pool, handing it to the first waiter if there is one.
+        """
+        if self._closed:
+            self._size -= 1
+            self._dispose_resource(resource)
+            return
+        waiters = self._waiters
+        while waiters:
+            fut = waiters.popleft()
+            if not fut.done():
+                fut.set_result(resource)
+                return
+            self._stale -= 1
+        self._idle.append(resource)
+
+    def discard(self, resource):
+        """
+        Remove a broken resource from the pool instead of releasing it. A waiter may create a new one in its place.
+        """
+        self._dispose_resource(resource)
+        self._release_slot()
+
+    async def close(self):
+        """
+        Close the pool: waiters fail with PoolClosedError, idle resources are disposed now and the acquired ones
+        when they are released. Waits until the pending dispose coroutines finish.
+        """
+        self._closed = True
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_exception(PoolClosedError("pool is closed"))
+        self._stale = 0
+        idle, self._idle = self._idle, []
+        self._size -= len(idle)
+        for resource in idle:
+            self._dispose_resource(resource)
+        while self._disposing:
+            await wait(list(self._disposing))
+
+    async def _create(self, loop, deadline):
+        timeout = None if deadline is None else max(0, deadline - loop.time())
+        try:
+            return await wait_for(self._factory(), timeout, race_handler=self._created_while_cancelled)
+        except CancelledWithResultError as e:
+            # The created resource was already returned to the pool, the caller shall not handle it again.
+            if e.is_exception:
+                self._release_slot()
+            raise CancelledError() from e
+        except BaseException:
+            self._release_slot()
+            raise
+
+    def _created_while_cancelled(self, result, is_exception):
+        if not is_exception:
+            self.release(result)
+
+    def _hand_back(self, item):
+        if item is _CREATE:
+            self._release_slot()
+        else:
+            self.release(item)
+
+    def _release_slot(self):
+        self._size -= 1
+        if self._closed:
+            return
+        waiters = self._waiters
+        while waiters:
+            fut = waiters.popleft()
+            if not fut.done():
+                self._size += 1
+                fut.set_result(_CREATE)
+                return
+            self._stale -= 1
+
+    def _gave_up(self):
+        if self._closed:
+            return
+        self._stale += 1
+        if self._stale > 64 and self._stale * 2 > len(self._waiters):
+            self._waiters = deque(fut for fut in self._waiters if not fut.done())
+            self._stale = 0
+
+    def _dispose_resource(self, resource):
+        dispose = self._dispose
+        if dispose is None:
+            return
+        loop = get_running_loop()
+        try:
+            disposing = dispose(resource)
+        except Exception as e:
+            loop.call_exception_handler({"message": "wait_for2 pool dispose failed", "exception": e})
+            return
+        if isawaitable(disposing):
+            task = ensure_future(disposing, loop=loop)
+            self._disposing.add(task)
+            task.add_done_callback(self._disposed)
+
+    def _disposed(self, task):
+        self._disposing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            task.get_loop().call_exception_handler(
+                {"message": "wait_for2 pool dispose failed", "exception": task.exception(), "future": task}
+            )
+
+
+class _Acquired(object):
+    def __init__(self, pool, timeout, discard_on_error):
+        self._pool = pool
+        self._timeout = timeout
+        self._discard_on_error = discard_on_error
+        self._resource = None
+
+    async def __aenter__(self):
+        self._resource = await self._pool.acquire(self._timeout)
+        return self._resource
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        resource, self._resource = self._resource, None
+        if exc_type is not None and self._discard_on_error:
+            self._pool.discard(resource)
+        else:
+            self._pool.release(resource)
@@ -0,0 +1,138 @@
+"""
+Queue with a timeout on get(), that never loses or reorders items when the timeout and a cancellation race.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+import asyncio
+from asyncio import TimeoutError
+from collections import deque
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .wheel import _get_scheduler
+
+
+def _expire(getter):
+    if not getter.done():
+        getter.set_exception(TimeoutError())
+
+
+class Queue(asyncio.Queue):
+    """
+    asyncio.Queue whose get() accepts a timeout and which can get a batch of items per wakeup.
+
+    `await wait_for(queue.get(), timeout)` wraps get() in a task, and an item it took off the queue while being
+    cancelled has to be put back by a race_handler, at the end of the queue. Here the waiting getter is a plain
+    future with a timer and the item is only taken off the queue once the caller is certain to receive it, so
+    there is nothing to lose: an item arriving at the same time as the timeout is returned, and if the caller is
+    cancelled the item stays at its place for the next getter.
+
+    This relies on the `_getters` deque and the `_wakeup_next()` method of asyncio.Queue, which are present in every
+    supported Python version (3.8 to 3.13). If they are missing, creating a Queue raises RuntimeError instead of
+    failing on a later get().
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not isinstance(getattr(self, "_getters", None), deque) or not callable(getattr(self, "_wakeup_next", None)):
+            raise RuntimeError("wait_for2.Queue needs asyncio.Queue._getters and _wakeup_next(), missing in this Python")
+
+    async def get(self, timeout=None):
+        """
+        Remove and return an item, waiting at most `timeout` seconds (forever if None) for one to become available.
+        Raises TimeoutError if none did.
+        """
+        if self.empty():
+            await self._wait_for_item(timeout)
+        return self.get_nowait()
+
+    async def get_batch(self, max_items, timeout=None):
+        """
+        Wait at most `timeout` seconds for an item (raising TimeoutError if none arrived), then remove and return
+        all available items, but at most `max_items` of them, as a list.
+        """
+        if max_items < 1:
+            raise ValueError("max_items must be at least 1")
+        if self.empty():
+            await self._wait_for_item(timeout)
+        get_nowait = self.get_nowait
+        items = [get_nowait()]
+        while len(items) < max_items and not self.empty():
+            items.append(get_nowait())
+        return items
+
+    async def _wait_for_item(self, timeout):
+        loop = get_running_loop()
+        if timeout is None:
+            return await _wait_for_item(self, loop, None)
+        expiry = _Expiry(_get_scheduler(loop), loop.time() + timeout)
+        try:
+            await _wait_for_item(self, loop, expiry)
+        finally:
+            expiry.cancel()
+
+
+class _Expiry(object):
+    """
+    Timer of a single get() call, it expires the getter the call is waiting on at the time it fires. The call may
+    wait on several getters in turn (when another getter took the item it was woken up for), they share this timer
+    so the timeout is not restarted.
+    """
+
+    __slots__ = ("_handle", "getter", "expired")
+
+    def __init__(self, scheduler, deadline):
+        self.getter = None
+        self.expired = False
+        self._handle = scheduler.call_at(deadline, self._fire)
+
+    def _fire(self):
+        self.expired = True
+        if self.getter is not None:
+            _expire(self.getter)
+
+    def cancel(self):
+        self._handle.cancel()
+
+
+async def _wait_for_item(queue, loop, expiry):
+    """
+    Wait until the asyncio.Queue is not empty, or raise TimeoutError if the `expiry` expired before.
+    """
+    while queue.empty():
+        if getattr(queue, "_is_shutdown", False):
+            return  # get_nowait() raises QueueShutDown (Python 3.13+)
+        if expiry is not None and expiry.expired:
+            raise TimeoutError()
+        getter = loop.create_future()
+        queue._getters.append(getter)
+        if expiry is not None:
+            expiry.getter = getter
+        try:
+            await getter
+        except TimeoutError:
+            try:
+                queue._getters.remove(getter)
+            except ValueError:
+                pass
+            if queue.empty():
+                raise
+            # An item arrived before this getter could resume, it is prioritized over the timeout.
+        except BaseException:
+            # The same cleanup as in asyncio.Queue.get(), the item this getter was woken up for is left in the
+            # queue and passed on to the next getter.
+            getter.cancel()
+            try:
+                queue._getters.remove(getter)
+            except ValueError:
+                pass
+            if not queue.empty() and not getter.cancelled():
+                queue._wakeup_next(queue._getters)
+            raise
+        finally:
+            if expiry is not None:
+                expiry.getter = None
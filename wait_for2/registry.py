@@ -0,0 +1,184 @@
+"""
+Optional per-loop registry of the wait_for calls in flight, for draining them at shutdown.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from asyncio import iscoroutine, isfuture
+from collections import deque
+from weakref import WeakKeyDictionary, WeakSet
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .wheel import _get_scheduler
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class DrainingError(RuntimeError):
+    """
+    Raised by wait_for() instead of waiting when the registry of the loop is draining.
+    """
+
+
+class ActiveWait(object):
+    """
+    A wait_for call in flight: the `task` waiting, the `fut` it waits for, its `label`, and the loop time it
+    started at and will time out at (`when`, None if it has no timeout).
+    """
+
+    __slots__ = ("task", "fut", "label", "started", "when", "active", "cancelled", "__weakref__")
+
+    def __init__(self, task, fut, label, started, when):
+        self.task = task
+        self.fut = fut
+        self.label = label
+        self.started = started
+        self.when = when
+        self.active = True
+        self.cancelled = False
+
+    def remaining(self, loop=None):
+        """Return the seconds left until the call times out, or None if it has no timeout."""
+        if self.when is None:
+            return None
+        if loop is None:
+            loop = get_running_loop()
+        return self.when - loop.time()
+
+
+class WaitRegistry(object):
+    """
+    Keeps track of the wait_for calls in flight on a loop (see install_wait_registry()). Registering and
+    unregistering a call are O(1), the calls are held in a weak set.
+
+    drain() stops new waits and cancels the remaining ones in batches of `cancel_batch` per loop iteration. The
+    registry keeps rejecting new waits after that until resume() is called, and it can be drained again.
+    """
+
+    def __init__(self, *, cancel_batch=1000):
+        if cancel_batch < 1:
+            raise ValueError("cancel_batch must be at least 1")
+        self._cancel_batch = cancel_batch
+        self._active = WeakSet()
+        self._cancel_queue = deque()
+        self._waiter = None
+        self.draining = False
+        self.raced = []
+
+    def __len__(self):
+        return len(self._active)
+
+    def active(self):
+        """Return the ActiveWait of each call in flight."""
+        return list(self._active)
+
+    async def drain(self, max_wait, *, stop_wait=None):
+        """
+        Stop new wait_for calls (they raise DrainingError) and wait for the ones in flight to finish. The calls
+        that would time out later than `max_wait` seconds from now are cancelled right away, the others are let
+        finish until then, and those still waiting are cancelled after `max_wait` seconds. The cancelled calls are
+        waited for to terminate, at most `stop_wait` seconds (`max_wait` by default), the calls ignoring their
+        cancellation for longer are left in active().
+
+        Returns the (result, is_exception) pairs of the calls that ended with CancelledWithResultError during this
+        drain.
+        """
+        loop = get_running_loop()
+        self.draining = True
+        self.raced = []
+        end = loop.time() + max_wait
+        self._cancel(loop, [entry for entry in self._active if entry.when is None or entry.when > end])
+        await self._wait_idle(loop, end)
+        self._cancel(loop, [entry for entry in self._active if not entry.cancelled])
+        await self._wait_idle(loop, loop.time() + (max_wait if stop_wait is None else stop_wait))
+        return list(self.raced)
+
+    def resume(self):
+        """Accept new wait_for calls again after drain()."""
+        self.draining = False
+
+    async def _wait_idle(self, loop, end):
+        if not self._active:
+            return
+        waiter = self._waiter = loop.create_future()
+        handle = _get_scheduler(loop).call_at(end, _wake, waiter)
+        try:
+            await waiter
+        finally:
+            handle.cancel()
+            self._waiter = None
+
+    def _register(self, task, fut, label, started, when):
+        entry = ActiveWait(task, fut, label, started, when)
+        self._active.add(entry)
+        return entry
+
+    def _unregister(self, entry):
+        entry.active = False
+        self._active.discard(entry)
+        if self._waiter is not None and not self._active:
+            _wake(self._waiter)
+
+    def _reject(self, fut):
+        # the rejected coroutine or future would not be awaited
+        if iscoroutine(fut):
+            fut.close()
+        elif isfuture(fut):
+            fut.cancel()
+        raise DrainingError()
+
+    def _cancel(self, loop, entries):
+        queue = self._cancel_queue
+        start = not queue
+        for entry in entries:
+            entry.cancelled = True
+            queue.append(entry)
+        if start and queue:
+            loop.call_soon(self._cancel_some, loop)
+
+    def _cancel_some(self, loop):
+        queue = self._cancel_queue
+        for _ in range(min(self._cancel_batch, len(queue))):
+            entry = queue.popleft()
+            if entry.active:
+                entry.task.cancel()
+        if queue:
+            loop.call_soon(self._cancel_some, loop)
+
+
+_registries = WeakKeyDictionary()
+
+
+def install_wait_registry(registry=None, *, loop=None):
+    """
+    Install a WaitRegistry (a new one if not given) for the wait_for calls running on `loop` (the running loop by
+    default). The installed registry is returned.
+    """
+    if registry is None:
+        registry = WaitRegistry()
+    if loop is None:
+        loop = get_running_loop()
+    _registries[loop] = registry
+    return registry
+
+
+def uninstall_wait_registry(*, loop=None):
+    if loop is None:
+        loop = get_running_loop()
+    _registries.pop(loop, None)
+
+
+def get_wait_registry(loop=None):
+    """
+    Return the registry installed for `loop` (the running loop by default), or None.
+    """
+    if loop is None:
+        loop = get_running_loop()
+    return _registries.get(loop)
@@ -0,0 +1,114 @@
+"""
+Retrying with per-attempt timeouts, backoff and a total time budget, without losing results of cancelled attempts.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+import random
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .deadlines import Deadline, DeadlineExceeded, _active_deadline, _deadline
+from .impl import _Waiter, wait_for
+from .wheel import _get_scheduler
+
+
+class Backoff(object):
+    """
+    Exponential backoff: the delay before retry number `n` (starting at 1) is `initial * multiplier ** (n - 1)`,
+    at most `maximum`. With `jitter` between 0 and 1, the delay is reduced by a random fraction of at most `jitter`
+    of it (1.0 is "full jitter", a uniformly random delay up to the exponential one).
+    """
+
+    __slots__ = ("initial", "multiplier", "maximum", "jitter")
+
+    def __init__(self, initial=0.1, multiplier=2.0, maximum=10.0, jitter=1.0):
+        if not 0.0 <= jitter <= 1.0:
+            raise ValueError("jitter must be between 0 and 1")
+        self.initial = initial
+        self.multiplier = multiplier
+        self.maximum = maximum
+        self.jitter = jitter
+
+    def __call__(self, retry):
+        delay = min(self.maximum, self.initial * self.multiplier ** (retry - 1))
+        if self.jitter:
+            delay -= delay * self.jitter * random.random()
+        return delay
+
+
+def _should_retry(retry_on, exc):
+    if isinstance(retry_on, (type, tuple)):
+        return isinstance(exc, retry_on)
+    return retry_on(exc)
+
+
+async def _sleep(loop, delay):
+    waiter = _Waiter(loop=loop)
+    scheduler = _get_scheduler(loop)
+    handle = scheduler.call_later(delay, waiter)
+    try:
+        await waiter
+    finally:
+        handle.cancel()
+
+
+async def retry(
+    factory,
+    attempt_timeout,
+    total_timeout=None,
+    *,
+    backoff=None,
+    retry_on=Exception,
+    max_attempts=None,
+    race_handler=None,
+):
+    """
+    Await `factory()` with wait_for() and `attempt_timeout`, and retry it while it fails with an exception matching
+    `retry_on` (exception types, or a function called with the exception), including the TimeoutError of the
+    attempt. Returns the result of the first successful attempt:
+
+        result = await wait_for2.retry(lambda: fetch(key), 1.0, 5.0, race_handler=release)
+
+    The delay before each retry is `backoff(n)` for retry number `n` (a Backoff() with its defaults if None). At
+    most `max_attempts` attempts are made (no limit if None).
+
+    `total_timeout` limits the whole call. It is a single deadline (set like with deadline()) shared by the
+    attempts, each of which waits at most until it expires, and then DeadlineExceeded is raised. It is never slept
+    past: if the deadline would expire during the backoff delay, the last error is raised right away.
+
+    An attempt that produces its result while the call is cancelled passes it to the `race_handler` and
+    CancelledWithResultError is raised, as with wait_for(). A result produced at the same time an attempt times out
+    is returned.
+    """
+    loop = get_running_loop()
+    if backoff is None:
+        backoff = Backoff()
+    token = None
+    if total_timeout is not None:
+        when = loop.time() + total_timeout
+        current = _active_deadline()
+        if current is None or when < current.when:
+            token = _deadline.set(Deadline(when))
+    try:
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return await wait_for(factory(), attempt_timeout, race_handler=race_handler)
+            except DeadlineExceeded:
+                raise
+            except Exception as exc:
+                if not _should_retry(retry_on, exc) or (max_attempts is not None and attempt >= max_attempts):
+                    raise
+                delay = backoff(attempt)
+                budget = _active_deadline()
+                if budget is not None and loop.time() + delay >= budget.when:
+                    raise
+            await _sleep(loop, delay)
+    finally:
+        if token is not None:
+            _deadline.reset(token)
@@ -0,0 +1,118 @@
+"""
+Virtual-time event loop for fast and deterministic testing of timeout, cancellation and race-condition handling.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+import asyncio
+import selectors
+from heapq import heappop, heappush
+from itertools import count
+
+
+class _VirtualSelector(object):
+    """
+    Wraps a real selector. When the loop would block waiting for its next timer, the virtual clock is advanced to
+    that timer instead, unless real I/O (e.g. a call_soon_threadsafe() wakeup) is already pending.
+    """
+
+    def __init__(self, selector):
+        self._selector = selector
+        self.loop = None
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        loop = self.loop
+        if loop is not None:
+            loop._next_iteration()
+            if not events and timeout is not None and timeout > 0:
+                loop._advance(timeout)
+                return events
+        if events or timeout == 0:
+            return events
+        return self._selector.select(timeout)  # nothing is scheduled, wait for real I/O
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class VirtualClockEventLoop(asyncio.SelectorEventLoop):
+    """
+    Event loop whose time() is a virtual clock. It only moves forward when the loop is idle, then it jumps right to
+    the next scheduled timer, so sleeps and timeouts complete instantly while keeping the order of events.
+
+    Each iteration of the loop (one select() call followed by running the ready callbacks) is a step. With
+    inject(step, callback) a callback (like task.cancel) is run right before the callbacks of the given step, which
+    allows enumerating every point where a cancellation can interfere with the code under test.
+    """
+
+    def __init__(self, start=0.0):
+        selector = _VirtualSelector(selectors.DefaultSelector())
+        self._virtual_time = start
+        self._iteration = 0
+        self._injections = []
+        self._injection_order = count()
+        super(VirtualClockEventLoop, self).__init__(selector)
+        selector.loop = self
+
+    def time(self):
+        return self._virtual_time
+
+    @property
+    def iteration(self):
+        """The number of loop iterations (steps) started so far."""
+        return self._iteration
+
+    def advance(self, seconds):
+        """Move the clock forward, the timers that became due run in the next iteration."""
+        self._advance(seconds)
+
+    def _advance(self, seconds):
+        self._virtual_time += seconds
+
+    def inject(self, step, callback, *args):
+        """
+        Run `callback(*args)` at the start of iteration `step` (see `iteration`), before the timers and callbacks
+        of that iteration.
+        """
+        if step < self._iteration:
+            raise ValueError("step %d has already started" % step)
+        heappush(self._injections, (step, next(self._injection_order), callback, args))
+
+    def _next_iteration(self):
+        self._iteration += 1
+        injections = self._injections
+        while injections and injections[0][0] <= self._iteration:
+            _, _, callback, args = heappop(injections)
+            try:
+                callback(*args)
+            except Exception as e:
+                self.call_exception_handler({"message": "wait_for2 injected callback failed", "exception": e})
+
+
+def run(main, *, start=0.0, debug=None):
+    """
+    Run the coroutine on a new VirtualClockEventLoop and return its result, like asyncio.run() does.
+    """
+    loop = VirtualClockEventLoop(start)
+    try:
+        asyncio.set_event_loop(loop)
+        if debug is not None:
+            loop.set_debug(debug)
+        return loop.run_until_complete(main)
+    finally:
+        try:
+            _cancel_all_tasks(loop)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+
+
+def _cancel_all_tasks(loop):
+    tasks = [t for t in asyncio.all_tasks(loop) if not t.done()]
+    if not tasks:
+        return
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
@@ -0,0 +1,157 @@
+"""
+Task-free timeout scope, cancelling the current task in place like asyncio.timeout() does since Python 3.11.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+import sys
+from asyncio import CancelledError, TimeoutError, current_task, isfuture
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .deadlines import Deadline, _active_deadline, _deadline
+from .impl import _handle_cancelling_with_inner_completion
+from .wheel import _get_scheduler
+
+_HAS_UNCANCEL = sys.version_info >= (3, 11)
+
+
+class Timeout(object):
+    """
+    Asynchronous context manager returned by timeout(). See its documentation for details. Like asyncio.Timeout, an
+    instance can only be entered once.
+    """
+
+    def __init__(self, delay, race_handler=None):
+        self._delay = delay
+        self._race_handler = race_handler
+        self._loop = None
+        self._task = None
+        self._handle = None
+        self._expired = False
+        self._cancelling = 0
+        self._token = None
+        self._budget = None
+
+    def expired(self):
+        return self._expired
+
+    async def __aenter__(self):
+        if self._task is not None:
+            raise RuntimeError("Timeout has already been entered")
+        loop = self._loop = get_running_loop()
+        task = self._task = current_task(loop)
+        if task is None:
+            raise RuntimeError("timeout() should be used inside a task")
+        if _HAS_UNCANCEL:
+            self._cancelling = task.cancelling()
+        if self._delay is not None:
+            scheduler = _get_scheduler(loop)
+            self._handle = scheduler.call_later(max(self._delay, 0), self._on_timeout)
+            # wait_for calls inside the scope that would time out later do not need a timer of their own.
+            when = self._handle.when()
+            current = _active_deadline()
+            if current is not None and current.when < when:
+                when = current.when
+            self._budget = Deadline(when, task, current)
+            self._token = _deadline.set(self._budget)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._token is not None:
+            _deadline.reset(self._token)
+            self._token = None
+        if self._expired:
+            if _HAS_UNCANCEL:
+                remaining = self._task.uncancel()
+                if remaining > self._cancelling:
+                    return None  # there is an explicit cancellation as well, that has priority
+            if exc_type is not None and issubclass(exc_type, CancelledError):
+                raise TimeoutError() from exc_val
+        return None
+
+    def _on_timeout(self):
+        self._handle = None
+        self._expired = True
+        if self._budget is not None:
+            self._budget.fired = True
+        self._task.cancel()
+
+    def _explicitly_cancelled(self):
+        # Before Python 3.11 the origin of a cancellation is not tracked, it is assumed to be the timeout if expired.
+        if _HAS_UNCANCEL:
+            return self._task.cancelling() > self._cancelling + (1 if self._expired else 0)
+        return not self._expired
+
+    async def guard(self, aw):
+        """
+        Await `aw` inside the scope, making sure its result is not lost in a simultaneous cancellation.
+
+        If a future is awaited, it may already be completed when the cancellation is delivered to the task. When the
+        cancellation came from the timeout, the result is returned (or the exception raised) instead of the timeout.
+        If it was an explicit cancellation, the result is passed to the `race_handler` and CancelledWithResultError
+        is raised, the same as wait_for() would.
+
+        Coroutines are awaited in place, they receive the cancellation themselves. If one still completes after an
+        explicit cancellation (by suppressing it), its result is handled the same way as above. Python 3.11+ is
+        needed for this, older versions do not track the cancellation requests of a task.
+        """
+        if isfuture(aw):
+            try:
+                return await aw
+            except CancelledError:
+                if not aw.done() or aw.cancelled():
+                    raise
+                fut_result = aw.exception()
+                if fut_result is None:
+                    fut_result = aw.result()
+                    res_exception = False
+                else:
+                    res_exception = True
+                if not self._explicitly_cancelled():
+                    # The timeout's cancellation is consumed here, result is prioritized over it.
+                    if res_exception:
+                        raise fut_result
+                    return fut_result
+                _handle_cancelling_with_inner_completion(self._loop, aw, fut_result, res_exception, self._race_handler)
+        if not _HAS_UNCANCEL:
+            return await aw
+        try:
+            fut_result = await aw
+        except CancelledError:
+            raise
+        except Exception as exc:
+            if not self._explicitly_cancelled():
+                raise
+            _handle_cancelling_with_inner_completion(self._loop, aw, exc, True, self._race_handler)
+        else:
+            if not self._explicitly_cancelled():
+                return fut_result
+            _handle_cancelling_with_inner_completion(self._loop, aw, fut_result, False, self._race_handler)
+
+
+def timeout(delay, *, race_handler=None):
+    """
+    Asynchronous context manager that cancels the current task if the block does not finish within `delay` seconds
+    (no timeout if None). In that case TimeoutError is raised from the block, otherwise it behaves like wait_for().
+
+    Unlike wait_for() it does not wrap anything in a new task, which saves a task and a loop iteration per use:
+
+        async with wait_for2.timeout(5.0, race_handler=process_result) as scope:
+            result = await scope.guard(fut)
+
+    Awaiting through scope.guard() is only necessary where a result must not be lost when it completes
+    simultaneously with a cancellation. Only the cancellation scheduled by the scope is converted to a TimeoutError,
+    explicit cancellations propagate. Before Python 3.11 the two can not be told apart, so an explicit cancellation
+    after the timeout expired will also turn into TimeoutError.
+
+    NOTE: If the inner code suppresses the cancellation of an expired timeout the block will continue, and the
+    scope will not raise TimeoutError.
+    """
+    return Timeout(delay, race_handler=race_handler)
@@ -0,0 +1,226 @@
+"""
+Optional tracing of the paths taken by wait_for calls into a preallocated ring buffer, for post-mortem analysis.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+import json
+import struct
+from array import array
+from weakref import WeakKeyDictionary
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+# The transitions of a wait_for call, a record holds the index of one of them.
+EVENTS = (
+    "start",  # the call started waiting with a timeout (or for a deadline)
+    "start_unbounded",  # the call started waiting without any timeout
+    "done",  # the future was done without waiting (already done, or completed by an eager start)
+    "wait",  # waiting with a timer
+    "wait_no_timer",  # waiting without a timer: there is no timeout, or an enclosing scope cancels the task in time
+    "cancelled_inner_done",  # the waiting was cancelled while the inner future was already done
+    "cancel_and_wait",  # the waiting was cancelled, the inner future is cancelled and waited for (cancelling=True)
+    "timeout_cancel",  # the timeout expired, the inner future is cancelled and waited for (cancelling=False)
+    "completed",
+    "error",
+    "timeout",
+    "cancelled",
+    "race",
+)
+(
+    START,
+    START_UNBOUNDED,
+    DONE,
+    WAIT,
+    WAIT_NO_TIMER,
+    CANCELLED_INNER_DONE,
+    CANCEL_AND_WAIT,
+    TIMEOUT_CANCEL,
+    COMPLETED,
+    ERROR,
+    TIMEOUT,
+    CANCELLED,
+    RACE,
+) = range(len(EVENTS))
+
+# The final events of the outcomes named like in the metrics.
+OUTCOME_EVENTS = {"completed": COMPLETED, "error": ERROR, "timeout": TIMEOUT, "cancelled": CANCELLED, "race": RACE}
+
+_MAGIC = b"WF2T"
+_HEADER = struct.Struct("<4sBQQ")  # magic, version, record count, dropped records
+_RECORD = struct.Struct("<qBdH")  # call id, event, loop time, label length (0xFFFF if there is no label)
+_NO_LABEL = 0xFFFF
+
+
+class TraceBuffer(object):
+    """
+    Fixed-size ring buffer of trace records, each a (call id, event, loop time, label) tuple. The storage is
+    allocated up front, recording only overwrites slots, and the oldest records are dropped when it is full.
+    """
+
+    def __init__(self, capacity=65536):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._ids = array("q", bytes(8 * capacity))
+        self._events = array("B", bytes(capacity))
+        self._times = array("d", bytes(8 * capacity))
+        self._labels = [None] * capacity
+        self._written = 0
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    def dropped(self):
+        """The number of records overwritten since the buffer was created or cleared."""
+        return max(0, self._written - self.capacity)
+
+    def start(self, event, when, label=None):
+        """
+        Record the first event of a new call and return the id of the call. The id is the position of this record
+        (counted from 1), so it is unique within the buffer and costs no separate counter.
+        """
+        written = self._written
+        i = written % self.capacity
+        self._written = call_id = written + 1
+        self._ids[i] = call_id
+        self._events[i] = event
+        self._times[i] = when
+        self._labels[i] = label
+        return call_id
+
+    def record(self, call_id, event, when, label=None):
+        i = self._written % self.capacity
+        self._ids[i] = call_id
+        self._events[i] = event
+        self._times[i] = when
+        self._labels[i] = label
+        self._written += 1
+
+    def records(self):
+        """Return the records from the oldest to the newest, with the names of the events."""
+        capacity = self.capacity
+        start = self._written - len(self)
+        return [
+            (self._ids[i], EVENTS[self._events[i]], self._times[i], self._labels[i])
+            for i in (n % capacity for n in range(start, self._written))
+        ]
+
+    def calls(self):
+        """Return the events of each call id in the buffer, as a dict of lists of (event, loop time) pairs."""
+        calls = {}
+        for call_id, event, when, _ in self.records():
+            calls.setdefault(call_id, []).append((event, when))
+        return calls
+
+    def clear(self):
+        for i in range(self.capacity):
+            self._labels[i] = None
+        self._written = 0
+
+    def dump(self, path, format="json"):
+        """
+        Write the records to a file, either as JSON or in a compact binary format ("binary"). Labels are written as
+        strings. Both formats can be read with load_trace().
+        """
+        records = self.records()
+        if format == "json":
+            data = {
+                "dropped": self.dropped(),
+                "records": [
+                    [call_id, event, when, None if label is None else str(label)]
+                    for call_id, event, when, label in records
+                ],
+            }
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        elif format == "binary":
+            with open(path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, 1, len(records), self.dropped()))
+                for call_id, event, when, label in records:
+                    if label is None:
+                        f.write(_RECORD.pack(call_id, EVENTS.index(event), when, _NO_LABEL))
+                    else:
+                        encoded = _truncate(str(label), _NO_LABEL - 1)
+                        f.write(_RECORD.pack(call_id, EVENTS.index(event), when, len(encoded)))
+                        f.write(encoded)
+        else:
+            raise ValueError("unknown format: %r" % (format,))
+
+
+def _truncate(text, max_bytes):
+    """Return the UTF-8 encoding of the longest prefix of `text` that fits in `max_bytes`."""
+    encoded = text.encode("utf-8")
+    if len(encoded) > max_bytes:
+        # The partial character at the cut is dropped by the decoding, so it is not split.
+        encoded = encoded[:max_bytes].decode("utf-8", "ignore").encode("utf-8")
+    return encoded
+
+
+def load_trace(path):
+    """
+    Read a file written by TraceBuffer.dump() in either format. Returns a dict with the number of "dropped" records
+    and the "records" as lists of [call id, event, loop time, label].
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data.startswith(_MAGIC):
+        return json.loads(data.decode("utf-8"))
+    _, version, count, dropped = _HEADER.unpack_from(data)
+    if version != 1:
+        raise ValueError("unsupported trace version: %d" % version)
+    offset = _HEADER.size
+    records = []
+    for _ in range(count):
+        call_id, event, when, length = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        label = None
+        if length != _NO_LABEL:
+            label = data[offset : offset + length].decode("utf-8", "replace")
+            offset += length
+        records.append([call_id, EVENTS[event], when, label])
+    return {"dropped": dropped, "records": records}
+
+
+class _Installed(object):
+    __slots__ = ("buffer", "loops")
+
+    def __init__(self):
+        self.buffer = None
+        self.loops = WeakKeyDictionary()
+
+
+_installed = _Installed()
+
+
+def install_tracing(buffer=None, *, loop=None):
+    """
+    Install a TraceBuffer (a new one if not given) for every wait_for call, or only for those running on `loop`.
+    A buffer installed for a loop takes precedence over the global one. The installed buffer is returned.
+    """
+    if buffer is None:
+        buffer = TraceBuffer()
+    if loop is None:
+        _installed.buffer = buffer
+    else:
+        _installed.loops[loop] = buffer
+    return buffer
+
+
+def uninstall_tracing(*, loop=None):
+    if loop is None:
+        _installed.buffer = None
+    else:
+        _installed.loops.pop(loop, None)
+
+
+def get_tracing(loop=None):
+    """
+    Return the trace buffer in effect for `loop` (the running loop by default), or None.
+    """
+    if loop is None:
+        loop = get_running_loop()
+    return _installed.loops.get(loop, _installed.buffer)
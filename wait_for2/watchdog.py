@@ -0,0 +1,175 @@
+"""
+Optional watchdog reporting inner futures that are slow to terminate after wait_for cancelled them.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+import traceback
+from weakref import WeakKeyDictionary
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+from .metrics import DEFAULT_BOUNDS, Histogram
+from .wheel import _get_scheduler
+
+
+def _format_stack(fut):
+    get_stack = getattr(fut, "get_stack", None)
+    if get_stack is None:
+        return None
+    frames = get_stack()
+    if not frames:
+        return None
+    summary = traceback.StackSummary.extract((frame, frame.f_lineno) for frame in frames)
+    return "".join(summary.format())
+
+
+class _Guard(object):
+    """
+    Watches one cancelled inner future. It is the done callback of the future and the callback of the timer.
+    """
+
+    __slots__ = ("watchdog", "loop", "fut", "label", "cancelled_at", "stalled", "recancels", "handle")
+
+    def __init__(self, watchdog, loop, fut, label):
+        self.watchdog = watchdog
+        self.loop = loop
+        self.fut = fut
+        self.label = label
+        self.cancelled_at = loop.time()
+        self.stalled = False
+        self.recancels = 0
+        scheduler = _get_scheduler(loop)
+        self.handle = scheduler.call_later(watchdog.threshold, self._expired)
+        fut.add_done_callback(self)
+
+    def __call__(self, fut):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        if self.stalled:
+            self.watchdog._terminated(self, self.loop.time() - self.cancelled_at)
+
+    def _expired(self):
+        self.handle = None
+        if self.fut.done():
+            return  # the done callback is about to run
+        interval = self.watchdog.recancel_interval
+        if self.stalled:
+            self.recancels += 1
+            self.watchdog.recancels += 1
+            self.fut.cancel()
+        else:
+            self.stalled = True
+            self.watchdog._stalled(self)
+        if interval is not None:
+            scheduler = _get_scheduler(self.loop)
+            self.handle = scheduler.call_later(interval, self._expired)
+
+
+class CancelWatchdog(object):
+    """
+    Reports inner futures that did not terminate within `threshold` seconds after wait_for() cancelled them (it
+    waits for them to terminate, so an inner coroutine ignoring or slowly handling the cancellation holds up the
+    caller). The report is a dict with the "future", its "label", the "elapsed" seconds and the "stack" of the
+    inner task (None for other futures). It is passed to `callback`, or to the loop's exception handler (which logs
+    it by default) if there is no callback.
+
+    With `recancel_interval` the stalled future is cancelled again at that interval until it terminates.
+
+    The number of stalls and re-cancellations are counted, and the time the stalled futures took to terminate after
+    the cancellation is recorded in the `durations` histogram.
+    """
+
+    def __init__(self, threshold=1.0, *, callback=None, recancel_interval=None, bounds=DEFAULT_BOUNDS):
+        self.threshold = threshold
+        self.recancel_interval = recancel_interval
+        self._callback = callback
+        self.stalls = 0
+        self.recancels = 0
+        self.durations = Histogram(bounds)
+        self._stalled_guards = set()
+
+    def watch(self, fut, loop, label=None):
+        """Start watching the future, which has just been cancelled."""
+        _Guard(self, loop, fut, label)
+
+    def stalled(self):
+        """Return the futures that are stalled right now, with the seconds elapsed since they were cancelled."""
+        return [(guard.fut, guard.loop.time() - guard.cancelled_at) for guard in self._stalled_guards]
+
+    def stats(self):
+        return {
+            "stalls": self.stalls,
+            "stalled": len(self._stalled_guards),
+            "recancels": self.recancels,
+            "durations": self.durations.as_dict(),
+        }
+
+    def _stalled(self, guard):
+        self.stalls += 1
+        self._stalled_guards.add(guard)
+        report = {
+            "message": "wait_for2 inner future did not terminate %.3f seconds after cancellation" % self.threshold,
+            "future": guard.fut,
+            "label": guard.label,
+            "elapsed": guard.loop.time() - guard.cancelled_at,
+            "stack": _format_stack(guard.fut),
+        }
+        if self._callback is None:
+            guard.loop.call_exception_handler(report)
+            return
+        try:
+            self._callback(report)
+        except Exception as e:
+            guard.loop.call_exception_handler(
+                {"message": "wait_for2 cancel watchdog callback failed", "exception": e, "future": guard.fut}
+            )
+
+    def _terminated(self, guard, duration):
+        self._stalled_guards.discard(guard)
+        self.durations.record(duration)
+
+
+class _Installed(object):
+    __slots__ = ("watchdog", "loops")
+
+    def __init__(self):
+        self.watchdog = None
+        self.loops = WeakKeyDictionary()
+
+
+_installed = _Installed()
+
+
+def install_cancel_watchdog(watchdog=None, *, loop=None):
+    """
+    Install a CancelWatchdog (a new one if not given) for every wait_for call, or only for those running on `loop`.
+    A watchdog installed for a loop takes precedence over the global one. The installed watchdog is returned.
+    """
+    if watchdog is None:
+        watchdog = CancelWatchdog()
+    if loop is None:
+        _installed.watchdog = watchdog
+    else:
+        _installed.loops[loop] = watchdog
+    return watchdog
+
+
+def uninstall_cancel_watchdog(*, loop=None):
+    if loop is None:
+        _installed.watchdog = None
+    else:
+        _installed.loops.pop(loop, None)
+
+
+def get_cancel_watchdog(loop=None):
+    """
+    Return the watchdog in effect for `loop` (the running loop by default), or None.
+    """
+    if loop is None:
+        loop = get_running_loop()
+    return _installed.loops.get(loop, _installed.watchdog)
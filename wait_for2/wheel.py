@@ -0,0 +1,220 @@
+"""
+Hierarchical timing-wheel that can replace loop.call_later() as the timeout scheduler of wait_for.
+
+Each loop.call_later() pushes a TimerHandle onto the loop's heap and cancelling it only marks it, so with many
+concurrent waits that almost always complete in time the heap fills up with cancelled handles. The wheel keeps
+its timers in hashed buckets instead: scheduling and cancelling are O(1) and the loop only sees a single wakeup
+handle per tick that has something to expire.
+
+:copyright: 2025 Nándor Mátravölgyi
+:license: Apache2, see LICENSE for more details.
+"""
+from math import ceil
+from weakref import WeakKeyDictionary
+
+try:
+    from asyncio import get_running_loop
+except ImportError:  # pragma: no cover
+    from asyncio import get_event_loop as get_running_loop
+
+_schedulers = WeakKeyDictionary()
+
+
+class TimerWheelHandle(object):
+    """
+    Returned by TimerWheel.call_later() and TimerWheel.call_at(), it mirrors the relevant parts of TimerHandle.
+    """
+
+    __slots__ = ("_wheel", "_callback", "_args", "_tick", "_bucket")
+
+    def __init__(self, wheel, callback, args, tick):
+        self._wheel = wheel
+        self._callback = callback
+        self._args = args
+        self._tick = tick
+        self._bucket = None
+
+    def when(self):
+        return self._tick * self._wheel._resolution
+
+    def cancel(self):
+        bucket = self._bucket
+        if bucket is not None:
+            self._bucket = None
+            del bucket[self]
+            self._wheel._count -= 1
+        self._callback = self._args = None
+
+
+class TimerWheel(object):
+    """
+    Hierarchical timing-wheel bound to an event loop.
+
+    Time is split into ticks of `resolution` seconds. The first level has `slots` buckets of one tick each, every
+    further level has `slots` buckets each spanning a full rotation of the level below it. Timers far in the future
+    are kept on a higher level and cascaded down as their bucket comes up, so the number of buckets stays fixed
+    regardless of the timeout lengths used.
+
+    Deadlines are rounded up to the next tick, so timers never fire early, but may fire up to `resolution` late.
+    The `slack` parameter rounds deadlines further up to a multiple of `slack` seconds, so nearby deadlines land
+    in the same bucket and share a single wakeup. It can be overridden per call.
+
+    The wheel only schedules a loop callback for ticks that have timers to expire (or need cascading), and none at
+    all while it is empty.
+    """
+
+    def __init__(self, loop, resolution=0.01, slack=0.0, slots=256, levels=4):
+        if resolution <= 0:
+            raise ValueError("resolution must be positive")
+        if slots < 2 or levels < 2:
+            raise ValueError("the wheel needs at least 2 slots and 2 levels")
+        self._loop = loop
+        self._resolution = resolution
+        self._slack_ticks = self._to_ticks(slack)
+        self._slots = slots
+        self._spans = [slots**level for level in range(levels)]
+        self._limit = slots**levels
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._tick = int(loop.time() / resolution)  # last processed tick
+        self._count = 0
+        self._wakeup = None
+        self._wakeup_tick = None
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def resolution(self):
+        return self._resolution
+
+    def _to_ticks(self, slack):
+        if not slack or slack <= 0:
+            return 1
+        return max(1, int(ceil(slack / self._resolution)))
+
+    def call_later(self, delay, callback, *args, slack=None):
+        return self.call_at(self._loop.time() + delay, callback, *args, slack=slack)
+
+    def call_at(self, when, callback, *args, slack=None):
+        step = self._slack_ticks if slack is None else self._to_ticks(slack)
+        tick = int(ceil(when / self._resolution))
+        if step > 1:
+            tick = -(-tick // step) * step
+        if not self._count:
+            # Nothing is pending, so the processed position can be fast-forwarded without walking the buckets.
+            now = int(self._loop.time() / self._resolution)
+            if now > self._tick:
+                self._tick = now
+        if tick <= self._tick:
+            tick = self._tick + 1
+        handle = TimerWheelHandle(self, callback, args, tick)
+        self._insert(handle)
+        self._count += 1
+        if self._wakeup_tick is None or tick < self._wakeup_tick:
+            self._schedule(tick)
+        return handle
+
+    def _insert(self, handle):
+        tick = handle._tick
+        delta = tick - self._tick
+        slots = self._slots
+        if delta < slots:
+            bucket = self._wheels[0][tick % slots]
+        else:
+            if delta >= self._limit:
+                # Beyond the top level: park it in the furthest bucket, it gets re-inserted when that cascades.
+                tick = self._tick + self._limit - 1
+            level = 1
+            while level < len(self._spans) - 1 and delta >= self._spans[level + 1]:
+                level += 1
+            bucket = self._wheels[level][(tick // self._spans[level]) % slots]
+        bucket[handle] = None
+        handle._bucket = bucket
+
+    def _schedule(self, tick):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup_tick = tick
+        self._wakeup = self._loop.call_at(tick * self._resolution, self._run, tick)
+
+    def _next_tick(self):
+        # The next non-empty bucket on the first level, or the next cascade boundary if there is none before it.
+        tick = self._tick
+        slots = self._slots
+        boundary = (tick // slots + 1) * slots
+        first = self._wheels[0]
+        for t in range(tick + 1, boundary):
+            if first[t % slots]:
+                return t
+        return boundary
+
+    def _run(self, target):
+        self._wakeup = self._wakeup_tick = None
+        # The loop may run timers slightly early (within its clock resolution), so trust the scheduled tick.
+        now = max(target, int(self._loop.time() / self._resolution))
+        slots = self._slots
+        spans = self._spans
+        wheels = self._wheels
+        expired = []
+        while self._tick < now and self._count:
+            tick = self._tick = self._tick + 1
+            if tick % slots == 0:
+                for level in range(len(spans) - 1, 0, -1):
+                    span = spans[level]
+                    if tick % span == 0:
+                        bucket = wheels[level][(tick // span) % slots]
+                        if bucket:
+                            handles = list(bucket)
+                            bucket.clear()
+                            for handle in handles:
+                                self._insert(handle)
+            bucket = wheels[0][tick % slots]
+            if bucket:
+                self._count -= len(bucket)
+                expired.extend(bucket)
+                bucket.clear()
+        if not self._count and now > self._tick:
+            self._tick = now
+        for handle in expired:
+            handle._bucket = None
+            callback, args = handle._callback, handle._args
+            handle._callback = handle._args = None
+            try:
+                callback(*args)
+            except Exception as e:
+                self._loop.call_exception_handler(
+                    {"message": "wait_for2 timer wheel callback failed", "exception": e, "handle": handle}
+                )
+        if self._count and self._wakeup is None:
+            self._schedule(self._next_tick())
+
+
+def install_timer_wheel(loop=None, **kwargs):
+    """
+    Make wait_for use a TimerWheel (created with the given keyword arguments) for every timeout on the loop.
+    The installed wheel is returned.
+    """
+    if loop is None:
+        loop = get_running_loop()
+    wheel = _schedulers[loop] = TimerWheel(loop, **kwargs)
+    return wheel
+
+
+def uninstall_timer_wheel(loop=None):
+    """
+    Revert wait_for to loop.call_later() for new timeouts. Timers already on the installed wheel still fire.
+    """
+    if loop is None:
+        loop = get_running_loop()
+    _schedulers.pop(loop, None)
+
+
+def get_timer_wheel(loop=None):
+    if loop is None:
+        loop = get_running_loop()
+    return _schedulers.get(loop)
+
+
+def _get_scheduler(loop):
+    """Return what schedules the timers of the loop: its installed TimerWheel, or the loop itself."""
+    return _schedulers.get(loop, loop) if _schedulers else loop